@@ -0,0 +1,111 @@
+"""
+Benchmark: latency of the local read API (src/api.py) for point and filter
+queries, in-process (CertificateIndex.query) and over HTTP.
+
+    python bench/bench_api.py                 # 50k certificates
+    python bench/bench_api.py --rows 120000 --repeat 500
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import requests
+
+import synthetic
+import scrape
+from api import SnapshotStore, make_server
+from compare import DEFAULT_SHEET
+from snapshot import write_snapshot
+
+
+def build_snapshot(rows, workdir):
+    synthetic.write_gst_workbooks(os.path.join(workdir, "gst"))
+    df = scrape.enrich(synthetic.parsed_rows(rows))
+    path = os.path.join(workdir, "current.xlsx")
+    # Header-only workbook: the API reads the Feather snapshot next to it
+    pd.DataFrame(columns=df.columns).to_excel(path, sheet_name=DEFAULT_SHEET, index=False)
+    write_snapshot(df, path)
+    return path, df
+
+
+def queries(df, n, seed=0):
+    """(name, params) pairs: point lookups and typical dashboard filters."""
+    rnd = random.Random(seed)
+    ids = df["Certificate_ID"].tolist()
+    companies = df["Company_Name"].tolist()
+    assets = df["Asset_Identifier"].tolist()
+    regions = [r for r in df["Region"].unique() if r]
+    return {
+        "point_id": [{"id": [rnd.choice(ids)]} for _ in range(n)],
+        "company": [{"company": [rnd.choice(companies)]} for _ in range(n)],
+        "asset": [{"asset": [rnd.choice(assets)]} for _ in range(n)],
+        "status": [{"status": ["Valid"]} for _ in range(n)],
+        "status_region_scope": [{"status": ["Valid"], "region": [rnd.choice(regions)], "scope": ["HVO"]}
+                                for _ in range(n)],
+        "scope_all_page5": [{"scope": ["CP", "TRS"], "page": 5} for _ in range(n)],
+    }
+
+
+def _stats(samples):
+    ms = np.array(samples) * 1000
+    return f"p50 {np.percentile(ms, 50):7.2f} ms   p95 {np.percentile(ms, 95):7.2f} ms   max {ms.max():7.2f} ms"
+
+
+def bench_in_process(index, cases):
+    for name, params_list in cases.items():
+        samples = []
+        for params in params_list:
+            params = dict(params)
+            page = params.pop("page", 1)
+            t0 = time.perf_counter()
+            index.query(params, page=page, scope_how="all" if name.startswith("scope_all") else "any")
+            samples.append(time.perf_counter() - t0)
+        print(f"  {name:<22}{_stats(samples)}")
+
+
+def bench_http(base_url, cases):
+    session = requests.Session()
+    for name, params_list in cases.items():
+        samples = []
+        for params in params_list:
+            if name == "point_id":
+                url, query = f"{base_url}/certificates/{params['id'][0]}", {}
+            else:
+                url = f"{base_url}/certificates"
+                query = {k: ",".join(v) if isinstance(v, list) else v for k, v in params.items()}
+                if name.startswith("scope_all"):
+                    query["scope_how"] = "all"
+            t0 = time.perf_counter()
+            session.get(url, params=query).raise_for_status()
+            samples.append(time.perf_counter() - t0)
+        print(f"  {name:<22}{_stats(samples)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=200, help="queries per case")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path, df = build_snapshot(args.rows, workdir)
+        store = SnapshotStore(path=path)
+        t0 = time.perf_counter()
+        store.refresh()
+        print(f"Snapshot load + index build: {time.perf_counter() - t0:.2f}s for {len(store.current)} rows")
+
+        cases = queries(df, args.repeat)
+        print("\nin-process")
+        bench_in_process(store.current, cases)
+
+        httpd = make_server(store, port=0)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        host, port = httpd.server_address[:2]
+        print("\nHTTP")
+        bench_http(f"http://{host}:{port}", cases)
+        httpd.shutdown()
@@ -0,0 +1,55 @@
+"""
+Benchmark: whole-frame df.map(clean_excel_string) (previous implementation)
+vs the per-column, unique-value clean_frame. Asserts both give identical output.
+
+    python bench/bench_clean.py [rows]
+"""
+import re
+import sys
+import time
+
+from synthetic import FULL_DB_ROWS, raw_frame
+from scrape import clean_frame
+
+
+def legacy_clean_excel_string(x):
+    _ILLEGAL_CTRL = re.compile(r"[\x00-\x08\x0B-\x0C\x0E-\x1F]")
+    if x is None:
+        return ""
+    s = str(x)
+    s = _ILLEGAL_CTRL.sub("", s)
+    s = (
+        s.replace("\r", "")
+         .replace("\t", " ")
+         .replace(" ", " ")
+         .replace("\xa0", " ")
+         .replace("&nbsp;", " ")
+         .replace("​", "")
+         .replace("‌", "")
+         .replace("‍", "")
+         .replace("﻿", "")
+         .replace("­", "")
+         .replace("\n", " ")
+         .replace("\"", "")
+         .strip()
+    )
+    s = re.sub(r"\s+", " ", s)
+    return s
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else FULL_DB_ROWS
+    df = raw_frame(rows)
+    print(f"{rows} rows x {len(df.columns)} columns")
+
+    t0 = time.perf_counter()
+    expected = df.map(legacy_clean_excel_string)
+    t_old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    result = clean_frame(df)
+    t_new = time.perf_counter() - t0
+
+    assert result.equals(expected), "clean_frame output differs from df.map(clean_excel_string)"
+    print(f"df.map(clean_excel_string): {t_old:.2f}s")
+    print(f"clean_frame:                {t_new:.2f}s  ({t_old / t_new:.1f}x)")
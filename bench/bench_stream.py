@@ -0,0 +1,84 @@
+"""
+Benchmark: memory of reading one large wpDataTables page whole (fetch_page,
+response.json()) vs streamed (stream_page, incremental decode in batches).
+
+The fixture server runs in its own process so only the client side is
+measured; peak Python allocations come from tracemalloc.
+
+    python bench/bench_stream.py                         # 20k and 50k row pages
+    python bench/bench_stream.py --page-sizes 50000 100000 --parse
+"""
+import argparse
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import synthetic  # noqa: F401  (puts src/ on the path)
+import fixture_server
+import scrape
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(url, timeout=30):
+    import requests
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    raise SystemExit(f"fixture server did not come up at {url}")
+
+
+def read_whole(length, parse):
+    rows, _ = scrape.fetch_page(start=0, length=length, nonce="bench-nonce")
+    return len(scrape.parse_rows(rows)) if parse else len(rows)
+
+
+def read_streamed(length, parse):
+    batches, _ = scrape.stream_page(start=0, length=length, nonce="bench-nonce")
+    n = 0
+    for batch in batches:
+        n += len(scrape.parse_rows(batch)) if parse else len(batch)
+    return n
+
+
+def measure(func, length, parse):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    n = func(length, parse)
+    seconds = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return n, seconds, peak / (1024 * 1024)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[20_000, 50_000])
+    parser.add_argument("--parse", action="store_true", help="also run parse_rows on the rows (slow)")
+    args = parser.parse_args()
+
+    port = _free_port()
+    server = subprocess.Popen([sys.executable, fixture_server.__file__, "--rows", str(max(args.page_sizes)),
+                               "--port", str(port)], stdout=subprocess.DEVNULL)
+    try:
+        scrape.BASE_URL = f"http://127.0.0.1:{port}{fixture_server.AJAX_PATH}?action=get_wdtable&table_id=2"
+        _wait_for(f"http://127.0.0.1:{port}{fixture_server.MAIN_PATH}")
+
+        print(f"{'page size':>10}{'mode':>10}{'rows':>9}{'seconds':>10}{'peak MB':>10}")
+        for length in args.page_sizes:
+            for mode, func in (("whole", read_whole), ("streamed", read_streamed)):
+                n, seconds, peak = measure(func, length, args.parse)
+                print(f"{length:>10}{mode:>10}{n:>9}{seconds:>10.2f}{peak:>10.1f}")
+    finally:
+        server.terminate()
+        server.wait()
@@ -0,0 +1,166 @@
+"""
+Local stand-in for the ISCC certificate database endpoints.
+
+Serves the certificate page (with the wdtNonce input) and replays
+wpDataTables JSON pages for POSTs to admin-ajax.php, applying the
+per-column search values and slicing by the start/length form fields
+like the real table.
+
+    python bench/fixture_server.py --rows 50000 --port 8765
+    python bench/fixture_server.py --record bench/fixtures/wdtable_page.json   # capture a live page
+"""
+import argparse
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+RECORDED_PAGE = os.path.join(FIXTURES, "wdtable_page.json")
+RECORDED_MAIN_PAGE = os.path.join(FIXTURES, "main_page.html")
+
+AJAX_PATH = "/wp-admin/admin-ajax.php"
+MAIN_PATH = "/certification/certificate-database/all-certificates/"
+
+
+def load_recorded_rows(path=RECORDED_PAGE):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["data"]
+
+
+def scale_rows(rows, n):
+    """Repeat recorded rows up to n, giving every copy a unique certificate number."""
+    out = []
+    for i in range(n):
+        row = list(rows[i % len(rows)])
+        if i >= len(rows):
+            row[1] = f"{row[1]}-R{i // len(rows)}"
+        out.append(row)
+    return out
+
+
+class FixtureServer:
+    """Threaded HTTP server replaying `rows`; use as a context manager."""
+
+    def __init__(self, rows, nonce="bench-nonce", port=0, latency=0.0):
+        self.rows = rows
+        self.nonce = nonce
+        self.latency = latency
+        self.requests = 0
+        with open(RECORDED_MAIN_PAGE, encoding="utf-8") as f:
+            self.main_page = f.read().replace("{{NONCE}}", nonce)
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def ajax_url(self):
+        return f"{self.base_url}{AJAX_PATH}?action=get_wdtable&table_id=2"
+
+    @property
+    def main_page_url(self):
+        return f"{self.base_url}{MAIN_PATH}"
+
+    def filtered(self, form):
+        """Per-column search: case-insensitive substring match on the cell, like the real table."""
+        searches = []
+        for key, value in form.items():
+            if key.startswith("columns[") and key.endswith("][search][value]") and value:
+                searches.append((int(key[len("columns["):key.index("]")]), value.lower()))
+        if not searches:
+            return self.rows
+        return [row for row in self.rows if all(v in str(row[i]).lower() for i, v in searches)]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type):
+                payload = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                server.requests += 1
+                if urlsplit(self.path).path.rstrip("/") == MAIN_PATH.rstrip("/"):
+                    self._send(200, server.main_page, "text/html; charset=UTF-8")
+                else:
+                    self._send(404, "not found", "text/plain")
+
+            def do_POST(self):
+                server.requests += 1
+                if urlsplit(self.path).path != AJAX_PATH:
+                    self._send(404, "not found", "text/plain")
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8"), keep_blank_values=True).items()}
+                if form.get("wdtNonce") != server.nonce:
+                    self._send(403, "-1", "text/plain")   # what WordPress answers for a bad nonce
+                    return
+                if server.latency:
+                    threading.Event().wait(server.latency)
+                start, size = int(form.get("start", 0)), int(form.get("length", 10))
+                rows = server.filtered(form)
+                body = json.dumps({
+                    "draw": int(form.get("draw", 1)),
+                    "recordsTotal": str(len(server.rows)),
+                    "recordsFiltered": str(len(rows)),
+                    "data": rows[start:start + size],
+                })
+                self._send(200, body, "application/json; charset=UTF-8")
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def point_scraper_at(server):
+    """Make scrape.py talk to the fixture server instead of iscc-system.org."""
+    import scrape
+    scrape.BASE_URL = server.ajax_url
+    scrape.MAIN_PAGE = server.main_page_url
+
+
+def record_page(path=RECORDED_PAGE, length=100):
+    """Capture one live page of the real table as a fixture (needs network access)."""
+    import scrape
+    rows, total = scrape.fetch_page(start=0, length=length)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"recordsTotal": str(total), "recordsFiltered": str(total), "data": rows}, f)
+    print(f"Recorded {len(rows)} rows to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000, help="rows to serve (recorded page repeated)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--record", metavar="PATH", help="record a live page to PATH and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        record_page(args.record)
+    else:
+        with FixtureServer(scale_rows(load_recorded_rows(), args.rows), port=args.port) as srv:
+            print(f"Serving {args.rows} rows at {srv.ajax_url} (main page {srv.main_page_url})")
+            try:
+                srv.thread.join()
+            except KeyboardInterrupt:
+                pass
@@ -0,0 +1,165 @@
+"""
+Offline benchmark of the scrape -> enrich -> match -> compare -> style pipeline.
+
+Network stages (get_fresh_nonce, fetch_page, parse_rows) run against the local
+fixture server replaying the recorded wpDataTables page. Everything after
+parsing runs on synthetic parsed rows at each requested size, each size in its
+own process so peak RSS is per size.
+
+    python bench/run_bench.py                              # 50k rows
+    python bench/run_bench.py --sizes 50000 200000 1000000 --fetch-rows 20000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+import pandas as pd
+import synthetic
+import fixture_server
+import scrape
+import profiling
+from compare import (create_certs_added, create_certs_removed, create_certs_changed, add_row_hash,
+                     DEFAULT_SHEET, DEFAULT_IGNORE_COLS)
+from snapshot import write_snapshot, ROW_HASH_SPEC_KEY
+from styles import apply_styles
+
+# Stages reported (in pipeline order), as named in the run report spans
+STAGES = [
+    "get_fresh_nonce", "fetch_page", "parse_rows",
+    "enrich.scopes", "enrich.owner", "enrich.certificate_type", "enrich.region", "enrich.status",
+    "enrich.coordinates", "enrich.clean", "load_asset_index", "resolve_companies", "match_assets",
+    "write_excel", "row_hash", "write_snapshot", "load_sheet",
+    "create_certs_added", "create_certs_removed", "create_certs_changed", "write_sheet", "apply_styles",
+]
+
+
+def bench_fetch(rows, page_size):
+    """Full fetch + parse of `rows` certificates through the fixture server."""
+    report = profiling.start_run()
+    recorded = fixture_server.load_recorded_rows()
+    with fixture_server.FixtureServer(fixture_server.scale_rows(recorded, rows)) as server:
+        fixture_server.point_scraper_at(server)
+        scrape.fetch_all_rows(page_size=page_size, delay=0)
+    return report
+
+
+def _stub_workbook(df, path):
+    # Header-only main sheet: the compare path reads the Feather snapshot, and the
+    # report sheets still get appended to a real workbook
+    pd.DataFrame(columns=df.columns).to_excel(path, sheet_name=DEFAULT_SHEET, index=False)
+
+
+def bench_pipeline(size, workdir, excel_max):
+    """Enrichment, matching, snapshot writes, comparison and styling at `size` rows."""
+    synthetic.write_gst_workbooks(os.path.join(workdir, "gst"))
+    rows = synthetic.parsed_rows(size)
+
+    report = profiling.start_run()
+    current = scrape.enrich(rows)
+
+    prev_file = os.path.join(workdir, "previous.xlsx")
+    curr_file = os.path.join(workdir, "current.xlsx")
+    previous = synthetic.older_frame(current)
+    _stub_workbook(previous, prev_file)
+    previous, spec = add_row_hash(previous)
+    write_snapshot(previous, prev_file, metadata={ROW_HASH_SPEC_KEY: spec})
+
+    full_excel = size <= excel_max
+    if full_excel:
+        with profiling.span("write_excel", rows=len(current), sheet=DEFAULT_SHEET):
+            current.to_excel(curr_file, index=False, engine="openpyxl", sheet_name=DEFAULT_SHEET)
+    else:
+        _stub_workbook(current, curr_file)
+    with profiling.span("row_hash", rows=len(current)):
+        hashed, spec = add_row_hash(current)
+    with profiling.span("write_snapshot", rows=len(current)):
+        write_snapshot(hashed, curr_file, metadata={ROW_HASH_SPEC_KEY: spec})
+
+    create_certs_added(prev_file, curr_file)
+    create_certs_removed(prev_file, curr_file)
+    create_certs_changed(prev_file, curr_file, ignore_cols=DEFAULT_IGNORE_COLS)
+    if full_excel:
+        apply_styles(curr_file, DEFAULT_SHEET)
+    report.info["full_excel"] = full_excel
+    return report
+
+
+def stage_table(report):
+    """Per stage: calls, seconds, rows, rows/s and the highest peak RSS seen."""
+    table = {}
+    for stage, t in report.summary().items():
+        peaks = [s["peak_rss_mb"] for s in report.spans if s["stage"] == stage and s.get("peak_rss_mb")]
+        table[stage] = {
+            **t,
+            "rows_per_sec": round(t["rows"] / t["seconds"]) if t["rows"] and t["seconds"] else None,
+            "peak_rss_mb": max(peaks) if peaks else None,
+        }
+    return dict(sorted(table.items(), key=lambda kv: STAGES.index(kv[0]) if kv[0] in STAGES else len(STAGES)))
+
+
+def print_table(title, table):
+    print(f"\n{title}")
+    print(f"{'stage':<26}{'calls':>6}{'seconds':>10}{'rows':>11}{'rows/s':>11}{'peak MB':>9}")
+    for stage, t in table.items():
+        print(f"{stage:<26}{t['calls']:>6}{t['seconds']:>10.3f}{t['rows']:>11}"
+              f"{t['rows_per_sec'] or '':>11}{t['peak_rss_mb'] or '':>9}")
+
+
+def run_single(args):
+    """Child process entry point: one stage group, JSON result on stdout."""
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.single == "fetch":
+            report = bench_fetch(args.fetch_rows, args.page_size)
+        else:
+            report = bench_pipeline(int(args.single), workdir, args.excel_max)
+    print("@@RESULT@@" + json.dumps({"stages": stage_table(report), "peak_rss_mb": profiling.peak_rss_mb()}))
+
+
+def run_child(name, args):
+    cmd = [sys.executable, os.path.abspath(__file__), "--single", str(name),
+           "--fetch-rows", str(args.fetch_rows), "--page-size", str(args.page_size),
+           "--excel-max", str(args.excel_max)]
+    out = subprocess.run(cmd, capture_output=True, text=True)
+    if out.returncode != 0:
+        print(out.stdout[-2000:], out.stderr[-4000:])
+        raise SystemExit(f"benchmark '{name}' failed")
+    line = next(l for l in out.stdout.splitlines() if l.startswith("@@RESULT@@"))
+    return json.loads(line[len("@@RESULT@@"):])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50_000], help="certificate counts for the pipeline stages")
+    parser.add_argument("--fetch-rows", type=int, default=20_000, help="rows served for the fetch/parse stages (0 to skip)")
+    parser.add_argument("--page-size", type=int, default=5_000)
+    parser.add_argument("--excel-max", type=int, default=200_000, help="above this size skip the full Excel write/styling")
+    parser.add_argument("--out", default=None, help="JSON results path (default out/bench_<timestamp>.json)")
+    parser.add_argument("--single", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        run_single(args)
+        sys.exit(0)
+
+    results = {"started": datetime.now().isoformat(timespec="seconds"), "runs": {}}
+    if args.fetch_rows:
+        res = run_child("fetch", args)
+        results["runs"][f"fetch_{args.fetch_rows}"] = res
+        print_table(f"fetch + parse, {args.fetch_rows} rows (peak RSS {res['peak_rss_mb']} MB)", res["stages"])
+    for size in args.sizes:
+        res = run_child(size, args)
+        results["runs"][f"pipeline_{size}"] = res
+        print_table(f"pipeline, {size} rows (peak RSS {res['peak_rss_mb']} MB)", res["stages"])
+
+    out_path = args.out or os.path.join("out", f"bench_{datetime.now().strftime('%d.%m.%Y_%H.%M')}.json")
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nBenchmark results saved to {out_path}")
@@ -0,0 +1,151 @@
+"""Synthetic ISCC-like data for the benchmarks (no network, no GST workbooks)."""
+import html
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pandas as pd
+from mappings import SCOPE_DESCRIPTIONS, STATUS_MAP, COLUMN_MAP
+from scrape import COLUMNS
+
+# Roughly the size of the full ISCC "all certificates" table
+FULL_DB_ROWS = 120_000
+
+COUNTRIES = ["Germany", "Netherlands", "France", "Brazil", "Indonesia", "Malaysia", "China", "Spain",
+             "United States", "Republic of", "Viet Nam", "Italy", "Poland", "India", "Argentina"]
+LEGAL = ["GmbH", "B.V.", "Ltd", "S.p.A.", "Inc", "LLC", "SA", ""]
+WORDS = ["Green", "Bio", "Energy", "Oil", "Agro", "Trading", "Recycling", "Fuels", "Nordic", "Pacific",
+         "Global", "Renewables", "Feed", "Chem", "Palm", "Sugar", "Logistics", "Waste"]
+ISSUERS = ["SGS Germany GmbH", "Control Union", "Bureau Veritas", "TUV SUD", "DEKRA"]
+# Dirty fragments seen in the scraped cells
+NOISE = ["", "", "", "", " ", " ", "&nbsp;", "​", "\n", "  ", "\t", '"']
+
+
+def company_name(rnd):
+    return " ".join(rnd.sample(WORDS, rnd.randint(1, 3)) + [rnd.choice(LEGAL)]).strip()
+
+
+def city_name(rnd):
+    return f"{rnd.choice(WORDS)}{rnd.choice(['burg', 'ville', 'stad', 'port', ''])}"
+
+
+def parsed_rows(n, seed=0):
+    """Rows in COLUMNS order, as parse_rows returns them (plain text and extracted links)."""
+    rnd = random.Random(seed)
+    scopes = list(SCOPE_DESCRIPTIONS)
+    statuses = list(STATUS_MAP)
+    companies = [company_name(rnd) for _ in range(max(50, n // 4))]
+    cities = [city_name(rnd) for _ in range(400)]
+    rows = []
+    for i in range(n):
+        noise = rnd.choice(NOISE)
+        rows.append([
+            "",
+            f"EU-ISCC-Cert-DE{i:09d}",
+            f"{rnd.choice(companies)}{noise}, {rnd.choice(cities)}, {rnd.choice(COUNTRIES)}",
+            ", ".join(rnd.sample(scopes, rnd.randint(1, 3))),
+            "",
+            rnd.choice(["Used cooking oil", "Animal fat Cat. 1", "Palm oil mill effluent", ""]).replace(" ", f" {noise}", 1),
+            rnd.choice(["", "GHG", "GHG, CTS"]),
+            rnd.choice(["HVO", "Biodiesel", "UCO", "Ethanol", "SAF"]),
+            f"{rnd.randint(2019, 2026)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+            f"{rnd.randint(2020, 2027)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+            "",
+            rnd.choice(ISSUERS),
+            f"https://maps.google.com/maps?q={rnd.uniform(-60, 60):.5f},{rnd.uniform(-120, 120):.5f}",
+            f"https://www.iscc-system.org/wp-content/uploads/{i}.pdf",
+            f"https://www.iscc-system.org/wp-content/uploads/{i}_audit.pdf",
+            str(rnd.choice(statuses)),
+        ])
+    return rows
+
+
+def _to_cell(column, value):
+    """Wrap a parsed value back into the HTML wpDataTables sends for that column."""
+    if column == "cert_ikon":
+        return '<span class="iscc-icon"></span>'
+    if column in ("cert_map", "cert_file", "cert_audit") and value:
+        return f'<a href="{html.escape(value)}" target="_blank">Link</a>'
+    if column == "cert_issuer":
+        return f'<span class="has-tip top" tabindex="2" title="{html.escape(value)}">{html.escape(value[:8])}</span>'
+    return html.escape(value, quote=False)
+
+
+def table_rows(n, seed=0):
+    """Rows as they appear in the wpDataTables JSON 'data' array (HTML-laden cells)."""
+    return [[_to_cell(c, v) for c, v in zip(COLUMNS, row)] for row in parsed_rows(n, seed)]
+
+
+def older_frame(df, seed=1, changed=0.02, removed=0.01, added=0.01):
+    """
+    An 'older' snapshot of an enriched frame: some certificates missing (added
+    since), some with a different status/expiry (changed since) and some extra
+    ones (removed since).
+    """
+    rnd = random.Random(seed)
+    old = df.copy()
+    n = len(old)
+    old["Status"] = old["Status"].astype(object)
+    old["Valid_Until"] = old["Valid_Until"].astype(object)
+    for i in rnd.sample(range(n), int(n * changed)):
+        old.iat[i, old.columns.get_loc("Status")] = rnd.choice(sorted(set(STATUS_MAP.values())))
+        old.iat[i, old.columns.get_loc("Valid_Until")] = f"20{rnd.randint(20, 27)}-01-01"
+    old = old.drop(index=old.index[rnd.sample(range(n), int(n * removed))])
+    extra = df.sample(int(n * added), random_state=seed).copy()
+    extra["Certificate_ID"] = [f"EU-ISCC-Cert-XX{i:09d}" for i in range(len(extra))]
+    return pd.concat([old, extra], ignore_index=True)
+
+
+def raw_frame(n, seed=0):
+    """Frame with the renamed columns, before cleaning, with realistic noise."""
+    df = pd.DataFrame(parsed_rows(n, seed), columns=COLUMNS)
+    return df.drop(columns=["cert_ikon"]).rename(columns=COLUMN_MAP)
+
+
+def gst_assets_frame(n_assets=3000, seed=0):
+    """Fake GST Assets 'GoldenSource' sheet."""
+    rnd = random.Random(seed + 1)
+    rows = []
+    for _ in range(n_assets):
+        full = company_name(rnd)
+        short = full.rsplit(" ", 1)[0] if " " in full else full
+        city = city_name(rnd)
+        rows.append({
+            "Company/Producer": full,
+            "Company/Producer Short Name": short,
+            "City": city,
+            "Asset Identifier": f"{short} {city}",
+        })
+    return pd.DataFrame(rows)
+
+
+def gst_geo_frame():
+    """Fake GST of Geographies 'GS_LCF_Geographies' sheet."""
+    regions = {"Germany": ("NW Europe", "Europe"), "Netherlands": ("NW Europe", "Europe"),
+               "France": ("NW Europe", "Europe"), "Spain": ("Med", "Europe"), "Italy": ("Med", "Europe"),
+               "Poland": ("CEE", "Europe"), "Brazil": ("South America", "Americas"),
+               "Argentina": ("South America", "Americas"), "United States": ("North America", "Americas"),
+               "Indonesia": ("SE Asia", "Asia Pacific"), "Malaysia": ("SE Asia", "Asia Pacific"),
+               "China": ("NE Asia", "Asia Pacific"), "India": ("South Asia", "Asia Pacific")}
+    return pd.DataFrame([{"Country": c, "LCF SnD region 1": r1, "LCF SnD region 2": r2}
+                         for c, (r1, r2) in regions.items()])
+
+
+def write_gst_workbooks(folder):
+    """
+    Write fake GST workbooks and point scrape.py's defaults at them (paths only, no
+    patching of code). Returns the same paths as scrape_all options.
+    """
+    import scrape
+    os.makedirs(folder, exist_ok=True)
+    assets_path = os.path.join(folder, "gst_assets.xlsx")
+    geo_path = os.path.join(folder, "gst_geo.xlsx")
+    gst_assets_frame().to_excel(assets_path, sheet_name=scrape.GST_ASSETS_SHEET, index=False)
+    gst_geo_frame().to_excel(geo_path, sheet_name=scrape.GST_GEO_SHEET, index=False)
+    scrape.GST_ASSETS_PATH = assets_path
+    scrape.GST_GEO_PATH = geo_path
+    scrape.ASSET_INDEX_CACHE = os.path.join(folder, "asset_index.pkl")
+    scrape._read_region_maps.cache_clear()
+    return {"gst_assets_path": assets_path, "gst_geo_path": geo_path, "asset_index_cache": scrape.ASSET_INDEX_CACHE}
@@ -0,0 +1,266 @@
+"""
+Local read API over the latest certificate snapshot.
+
+Keeps the newest enriched dataset (the workbook src/utils.json points at, read
+through its Feather snapshot) in memory with lookup indexes, and reloads it in
+the background when a new run is published.
+
+    python src/api.py --port 8008
+
+    GET /health
+    GET /certificates/<Certificate_ID>
+    GET /certificates?status=Valid&region=Europe&scope=HVO,HEFA&page=1&page_size=100
+        filters: id, company, asset, status, region, scope (+ scope_how=any|all);
+        comma-separated values within a filter are OR-ed, different filters AND-ed
+"""
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from atomic import load_pointer
+from compare import load_sheet
+from main import UTILS_FILE
+from resolve import normalize_name
+from scopes import scope_indicator_matrix
+from snapshot import snapshot_path, DATE_FORMAT
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+ID_COL = "Certificate_ID"
+# Hash-indexed text columns (looked up by normalize_name key)
+KEY_COLUMNS = {"company": "Company_Name", "asset": "Asset_Identifier"}
+# Secondary indexes on low-cardinality columns (exact value)
+VALUE_COLUMNS = {"status": "Status", "region": "Region"}
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def _positions_by_key(values):
+    """key -> sorted row positions, computing each key once per distinct value."""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    index = {}
+    for i, u in enumerate(uniques):
+        key = normalize_name(u)
+        rows = order[bounds[i]:bounds[i + 1]]
+        index[key] = np.union1d(index[key], rows) if key in index else rows
+    return index
+
+
+class CertificateIndex:
+    """An immutable loaded snapshot plus its lookup indexes."""
+
+    def __init__(self, df: pd.DataFrame, source=None):
+        self.df = df.reset_index(drop=True)
+        self.source = source
+        self.loaded_at = datetime.now().isoformat(timespec="seconds")
+        # Row values as plain Python objects, so building a page is just a take + zip
+        values = self.df.astype(object)
+        for c in self.df.columns:
+            if pd.api.types.is_datetime64_any_dtype(self.df[c]):
+                values[c] = self.df[c].dt.strftime(DATE_FORMAT).astype(object)
+        self._columns = list(self.df.columns)
+        self._values = values.where(values.notna(), None).to_numpy()
+
+        ids = self.df[ID_COL].astype(str).str.strip().to_numpy()
+        # Certificate numbers are unique; keep the first row if a scrape ever repeats one
+        self.by_id = {}
+        for pos, cert_id in enumerate(ids):
+            self.by_id.setdefault(cert_id, pos)
+
+        self.by_key = {name: _positions_by_key(self.df[col].to_numpy(dtype=object))
+                       for name, col in KEY_COLUMNS.items() if col in self.df.columns}
+        self.by_value = {name: {str(k): np.asarray(v) for k, v in
+                                self.df.groupby(col, observed=True, sort=False).indices.items()}
+                         for name, col in VALUE_COLUMNS.items() if col in self.df.columns}
+        indicator = scope_indicator_matrix(self.df["Scope"]) if "Scope" in self.df.columns else pd.DataFrame()
+        self.by_scope = {code: np.flatnonzero(indicator[code].to_numpy(dtype=bool)) for code in indicator.columns}
+
+    def __len__(self):
+        return len(self.df)
+
+    def _filter_rows(self, name, values, how="any"):
+        if name == "id":
+            return np.array(sorted({self.by_id[v] for v in values if v in self.by_id}), dtype=np.int64)
+        if name in self.by_key:
+            index, values = self.by_key[name], [normalize_name(v) for v in values]
+        elif name in self.by_value:
+            index = self.by_value[name]
+        elif name == "scope":
+            index = self.by_scope
+        else:
+            raise KeyError(f"Unknown filter '{name}'")
+        hits = [index.get(v, _EMPTY) for v in values]
+        if how == "all":
+            rows = hits[0]
+            for h in hits[1:]:
+                rows = np.intersect1d(rows, h, assume_unique=True)
+            return rows
+        return np.unique(np.concatenate(hits)) if hits else _EMPTY
+
+    def query(self, filters: dict, page=1, page_size=DEFAULT_PAGE_SIZE, scope_how="any") -> dict:
+        """
+        Row positions matching every filter (each a list of values), returned as
+        one page of records plus paging info.
+        """
+        rows = None
+        for name, values in filters.items():
+            if not values:
+                continue
+            hit = self._filter_rows(name, values, how=scope_how if name == "scope" else "any")
+            rows = hit if rows is None else np.intersect1d(rows, hit, assume_unique=True)
+        if rows is None:
+            rows = np.arange(len(self.df))
+
+        page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+        page = max(1, int(page))
+        chunk = rows[(page - 1) * page_size: page * page_size]
+        return {
+            "total": int(len(rows)),
+            "page": page,
+            "page_size": page_size,
+            "pages": math.ceil(len(rows) / page_size),
+            "data": self.records(chunk),
+        }
+
+    def get(self, cert_id):
+        pos = self.by_id.get(str(cert_id).strip())
+        return None if pos is None else self.records([pos])[0]
+
+    def records(self, positions):
+        return [dict(zip(self._columns, row)) for row in self._values[np.asarray(positions, dtype=np.int64)]]
+
+
+class SnapshotStore:
+    """
+    Holds the CertificateIndex of the workbook the pointer file names, and swaps
+    in a new one (built off the request path) when the pointer or the snapshot
+    file changes. An explicit path pins the store to that workbook.
+    """
+
+    def __init__(self, pointer_file=UTILS_FILE, path=None):
+        self.pointer_file = pointer_file
+        self.pinned = path
+        self.current = None
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _target(self):
+        return self.pinned or load_pointer(self.pointer_file).get("prev_file_name")
+
+    def _signature_of(self, path):
+        sig = [path]
+        for p in (path, snapshot_path(path)):
+            sig.append(os.path.getmtime(p) if os.path.exists(p) else None)
+        return tuple(sig)
+
+    def refresh(self):
+        """Reload if the target changed; returns True when a new index was swapped in."""
+        with self._lock:
+            path = self._target()
+            if not path or not os.path.exists(path):
+                return False
+            signature = self._signature_of(path)
+            if signature == self._signature:
+                return False
+            t0 = time.perf_counter()
+            index = CertificateIndex(load_sheet(path), source=path)
+            self.current, self._signature = index, signature
+            print(f"Loaded {len(index)} certificates from {path} in {time.perf_counter() - t0:.1f}s")
+            return True
+
+    def watch(self, interval=10):
+        """Poll for new snapshots in a daemon thread."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.refresh()
+                except Exception as e:
+                    # Keep serving the previous snapshot
+                    print(f"Reload failed: {e}")
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return thread
+
+
+def _filters_from(params):
+    names = ["id", *KEY_COLUMNS, *VALUE_COLUMNS, "scope"]
+    return {n: [v.strip() for v in ",".join(params[n]).split(",") if v.strip()] for n in names if n in params}
+
+
+def make_server(store: SnapshotStore, host="127.0.0.1", port=8008) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, payload):
+            body = json.dumps(payload, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+            index = store.current
+            if parts == ["health"]:
+                self._send(200, {"rows": len(index) if index else 0, "source": index and index.source,
+                                 "loaded_at": index and index.loaded_at})
+                return
+            if not parts or parts[0] != "certificates":
+                self._send(404, {"error": "not found"})
+                return
+            if index is None:
+                self._send(503, {"error": "no snapshot loaded yet"})
+                return
+            if len(parts) == 2:
+                record = index.get(parts[1])
+                self._send(200 if record else 404, record or {"error": f"certificate '{parts[1]}' not found"})
+                return
+            params = parse_qs(url.query)
+            try:
+                result = index.query(
+                    _filters_from(params),
+                    page=params.get("page", [1])[0],
+                    page_size=params.get("page_size", [DEFAULT_PAGE_SIZE])[0],
+                    scope_how=params.get("scope_how", ["any"])[0],
+                )
+            except (KeyError, ValueError) as e:
+                self._send(400, {"error": str(e)})
+                return
+            self._send(200, result)
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8008)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--file", help="serve this workbook instead of following src/utils.json")
+    parser.add_argument("--reload-interval", type=float, default=10, help="seconds between checks for a new snapshot")
+    args = parser.parse_args()
+
+    store = SnapshotStore(path=args.file)
+    store.refresh()
+    store.watch(args.reload_interval)
+    httpd = make_server(store, args.host, args.port)
+    print(f"Serving certificates at http://{args.host}:{args.port}/certificates")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from snapshot import snapshot_path, snapshot_summary
+
+# Infix of the files a run writes before they are moved into place
+PARTIAL_INFIX = ".partial"
+
+# Integrity manifest written next to every finished run's workbook
+MANIFEST_SUFFIX = ".manifest.json"
+MANIFEST_VERSION = 1
+
+
+def atomic_write_json(path, data):
+    """
+    Write JSON to a temp file in the same folder, fsync it and os.replace it
+    over path, so readers see either the old or the new content, never half.
+    """
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def atomic_write_csv(path, df):
+    """atomic_write_json for a DataFrame written as CSV (no index)."""
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        df.to_csv(f, index=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def partial_path(xlsx_path) -> str:
+    """out/ISCC_Certificates_X.xlsx -> out/ISCC_Certificates_X.partial.xlsx (snapshot follows suit)."""
+    stem, ext = os.path.splitext(str(xlsx_path))
+    return f"{stem}{PARTIAL_INFIX}{ext}"
+
+
+def manifest_path(xlsx_path) -> str:
+    """out/ISCC_Certificates_X.xlsx -> out/ISCC_Certificates_X.manifest.json"""
+    return os.path.splitext(str(xlsx_path))[0] + MANIFEST_SUFFIX
+
+
+def file_sha256(path, chunk_size=1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _file_entry(path, name):
+    return {"file": name, "bytes": os.path.getsize(path), "sha256": file_sha256(path)}
+
+
+def write_manifest(xlsx_path, final_xlsx=None, rows=None) -> dict:
+    """
+    Record the workbook and snapshot of a run (size, sha256, row count and
+    snapshot schema fingerprint) in its manifest. Called on the partial files
+    just before commit_outputs; file names are those under final_xlsx.
+    rows is used when there is no snapshot to count them.
+    """
+    final_xlsx = final_xlsx or xlsx_path
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "written": datetime.now().isoformat(timespec="seconds"),
+        "rows": rows,
+        "workbook": _file_entry(xlsx_path, os.path.basename(str(final_xlsx))),
+        "snapshot": None,
+    }
+    summary = snapshot_summary(xlsx_path)
+    if summary is not None:
+        manifest["rows"] = summary["rows"]
+        manifest["snapshot"] = {**_file_entry(snapshot_path(xlsx_path), os.path.basename(snapshot_path(final_xlsx))),
+                                "schema_fingerprint": summary["schema_fingerprint"], "columns": summary["columns"]}
+    atomic_write_json(manifest_path(xlsx_path), manifest)
+    return manifest
+
+
+def validate_manifest(xlsx_path, deep=False) -> list:
+    """
+    Problems found checking a finished run against its manifest ([] if it is
+    intact): files present with the recorded sizes, and the snapshot footer's
+    row count and schema fingerprint. deep also compares the sha256 of both
+    files. Runs written before manifests existed only need their files present.
+    """
+    path = manifest_path(xlsx_path)
+    if not os.path.exists(path):
+        if not os.path.exists(xlsx_path):
+            return [f"{xlsx_path} is missing"]
+        print(f"No manifest for {xlsx_path} (written before manifests), trusting it as it is")
+        return []
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        return [f"unreadable manifest {path}: {e}"]
+
+    problems = []
+    files = [(str(xlsx_path), manifest["workbook"])]
+    if manifest.get("snapshot"):
+        files.append((snapshot_path(xlsx_path), manifest["snapshot"]))
+    for file, entry in files:
+        if not os.path.exists(file):
+            problems.append(f"{file} is missing")
+        elif os.path.getsize(file) != entry["bytes"]:
+            problems.append(f"{file} has {os.path.getsize(file)} bytes, manifest says {entry['bytes']}")
+        elif deep and file_sha256(file) != entry["sha256"]:
+            problems.append(f"{file} content differs from its manifest (sha256)")
+    if problems or not manifest.get("snapshot"):
+        return problems
+
+    try:
+        summary = snapshot_summary(xlsx_path)
+    except Exception as e:
+        return [f"{snapshot_path(xlsx_path)} cannot be read: {e}"]
+    if summary["rows"] != manifest["rows"]:
+        problems.append(f"snapshot has {summary['rows']} rows, manifest says {manifest['rows']}")
+    if summary["schema_fingerprint"] != manifest["snapshot"]["schema_fingerprint"]:
+        problems.append("snapshot schema differs from its manifest")
+    return problems
+
+
+def commit_outputs(partial_xlsx, final_xlsx):
+    """
+    Move a finished run's manifest, snapshot and workbook from their partial
+    names into place. The manifest goes first: if the moves are interrupted,
+    the files it describes are missing and validate_manifest rejects the run.
+    """
+    if os.path.exists(manifest_path(partial_xlsx)):
+        os.replace(manifest_path(partial_xlsx), manifest_path(final_xlsx))
+    partial_snapshot = snapshot_path(partial_xlsx)
+    if os.path.exists(partial_snapshot):
+        os.replace(partial_snapshot, snapshot_path(final_xlsx))
+    os.replace(partial_xlsx, final_xlsx)
+    return final_xlsx
+
+
+def discard_outputs(partial_xlsx):
+    """Remove what a failed run left under the partial names."""
+    for path in (partial_xlsx, snapshot_path(partial_xlsx), manifest_path(partial_xlsx)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def load_pointer(path):
+    """The JSON pointer file (e.g. src/utils.json) as a dict; {} if missing or empty."""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError:
+        print(f"{path} is empty")
+        return {}
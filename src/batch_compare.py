@@ -0,0 +1,152 @@
+"""
+Batch comparison over a whole folder of runs: sorts the ISCC_Certificates_*.xlsx
+workbooks by their run timestamp, diffs every consecutive pair and writes one
+trend table (one row per pair: certificate counts, added / removed / changed,
+changes per column, status mix).
+
+The sorted runs are split into contiguous chains, one per worker process, that
+overlap by one workbook; inside a chain every snapshot is loaded once and
+reused, first as "current" and then as "previous".
+
+    python src/batch_compare.py out
+    python src/batch_compare.py out --workers 4 -o out/snapshot_trends.csv --log-changes
+"""
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from compare import (load_sheet, prepare_snapshot, find_id_column, diff_snapshots, comparison_rules,
+                     DEFAULT_IGNORE_COLS)
+from snapshot import snapshot_metadata, ROW_HASH_SPEC_KEY
+from atomic import PARTIAL_INFIX
+from changelog import append_changes, CHANGE_LOG_DIR
+
+RUN_FILE_PREFIX = "ISCC_Certificates_"
+RUN_FILE_RE = re.compile(r"ISCC_Certificates_(\d{2}\.\d{2}\.\d{4}_\d{2}\.\d{2})\.xlsx$")
+RUN_TIME_FORMAT = "%d.%m.%Y_%H.%M"
+DEFAULT_TRENDS_FILE = "out/snapshot_trends.xlsx"
+
+
+def find_snapshots(folder):
+    """[(run time, path)] of the finished run workbooks in folder, oldest first."""
+    runs = []
+    for name in os.listdir(folder):
+        if not (name.startswith(RUN_FILE_PREFIX) and name.endswith(".xlsx")) or PARTIAL_INFIX in name:
+            continue
+        path = os.path.join(folder, name)
+        m = RUN_FILE_RE.search(name)
+        if m:
+            run_at = datetime.strptime(m.group(1), RUN_TIME_FORMAT)
+        else:
+            # Renamed copies (e.g. '... - Copy.xlsx'): fall back to when they were written
+            run_at = datetime.fromtimestamp(os.path.getmtime(path)).replace(microsecond=0)
+        runs.append((run_at, path))
+    return sorted(runs)
+
+
+def split_chains(runs, workers):
+    """Contiguous chains of runs, overlapping by one, covering every consecutive pair once."""
+    pairs = len(runs) - 1
+    if pairs < 1:
+        return []
+    n = max(1, min(workers, pairs))
+    bounds = [round(i * pairs / n) for i in range(n + 1)]
+    return [runs[a:b + 1] for a, b in zip(bounds, bounds[1:])]
+
+
+def _load(path):
+    df = prepare_snapshot(load_sheet(path, keep_hash=True))
+    return df, snapshot_metadata(path).get(ROW_HASH_SPEC_KEY)
+
+
+def _ids(df):
+    """Stripped, non-blank certificate IDs, as create_certs_added / _removed count them."""
+    ids = df[find_id_column(df)].astype(str).str.strip()
+    return set(ids[ids != ""])
+
+
+def _diff_chain(runs, ignore_cols, ignore_patterns, rules, log_dir):
+    """Trend rows for the consecutive pairs of one chain (runs in a worker process)."""
+    rows = []
+    prev_at, prev_path = runs[0]
+    prev_df, prev_spec = _load(prev_path)
+    for curr_at, curr_path in runs[1:]:
+        curr_df, curr_spec = _load(curr_path)
+        curr_ids, prev_ids = _ids(curr_df), _ids(prev_df)
+        changed_df, changes = diff_snapshots(curr_df, prev_df, rules, ignore_cols, ignore_patterns,
+                                             hash_specs=(curr_spec, prev_spec))
+        row = {
+            "Previous_Run": prev_at,
+            "Current_Run": curr_at,
+            "Previous_File": os.path.basename(prev_path),
+            "Current_File": os.path.basename(curr_path),
+            "Certificates_Previous": len(prev_ids),
+            "Certificates_Current": len(curr_ids),
+            "Added": len(curr_ids - prev_ids),
+            "Removed": len(prev_ids - curr_ids),
+            "Changed": len(changed_df),
+        }
+        row.update({f"Changed_{col}": n for col, n in changes["Column"].value_counts().items()})
+        if "Status" in curr_df.columns:
+            row.update({f"Status_{s}": n for s, n in
+                        curr_df["Status"].astype(str).value_counts().items() if s})
+        if log_dir:
+            append_changes(changes, curr_at, log_dir=log_dir, source=curr_path)
+        rows.append(row)
+        print(f"{row['Previous_File']} -> {row['Current_File']}: "
+              f"+{row['Added']} -{row['Removed']} ~{row['Changed']}")
+        prev_at, prev_path, prev_df, prev_spec = curr_at, curr_path, curr_df, curr_spec
+    return rows
+
+
+def compare_folder(folder, workers=None, ignore_cols=DEFAULT_IGNORE_COLS, ignore_patterns=None,
+                   log_dir=None, **options) -> pd.DataFrame:
+    """
+    Trend table over all consecutive runs in folder. options are the
+    comparison_rules arguments; log_dir also backfills the change log.
+    """
+    runs = find_snapshots(folder)
+    chains = split_chains(runs, workers or os.cpu_count() or 1)
+    print(f"{len(runs)} snapshots, {max(len(runs) - 1, 0)} comparisons in {len(chains)} chain(s)")
+    rules = comparison_rules(**options)
+    if len(chains) <= 1:
+        results = [_diff_chain(c, ignore_cols, ignore_patterns, rules, log_dir) for c in chains]
+    else:
+        with ProcessPoolExecutor(max_workers=len(chains)) as pool:
+            futures = [pool.submit(_diff_chain, c, ignore_cols, ignore_patterns, rules, log_dir) for c in chains]
+            results = [f.result() for f in futures]
+
+    trends = pd.DataFrame([row for chain in results for row in chain])
+    if trends.empty:
+        return trends
+    fixed = [c for c in trends.columns if not c.startswith(("Changed_", "Status_"))]
+    changed_cols = sorted(c for c in trends.columns if c.startswith("Changed_"))
+    status_cols = sorted(c for c in trends.columns if c.startswith("Status_"))
+    trends = trends[fixed + changed_cols + status_cols]
+    trends[changed_cols + status_cols] = trends[changed_cols + status_cols].fillna(0).astype(int)
+    return trends
+
+
+def write_trends(trends: pd.DataFrame, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.endswith(".csv"):
+        trends.to_csv(path, index=False)
+    else:
+        trends.to_excel(path, sheet_name="Trends", index=False)
+    print(f"Trend table ({len(trends)} comparisons) saved to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder", nargs="?", default="out")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("-o", "--output", default=DEFAULT_TRENDS_FILE, help=".xlsx or .csv")
+    parser.add_argument("--log-changes", nargs="?", const=CHANGE_LOG_DIR, metavar="LOG_DIR",
+                        help="also append each comparison's cell-level changes to the change log")
+    args = parser.parse_args()
+
+    write_trends(compare_folder(args.folder, workers=args.workers, log_dir=args.log_changes), args.output)
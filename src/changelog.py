@@ -0,0 +1,116 @@
+"""
+Long-format change log: one (Certificate_ID, Column, Old_Value, New_Value, Run)
+row per changed cell, appended after every compared run.
+
+Stored as Feather files partitioned by changed column and sorted by certificate:
+
+    out/change_log/Column=Status/20260119_060000_ISCC_Certificates_19.01.2026_06.00.feather
+
+so a question about one column only opens that column's files, one small
+file per run, instead of reopening old workbooks.
+
+    python src/changelog.py --column Status --since 2026-01-01
+    python src/changelog.py --id EU-ISCC-Cert-DE100-12345678 -o out/history.csv
+"""
+import argparse
+import os
+from datetime import datetime
+from urllib.parse import quote
+
+import pandas as pd
+
+CHANGE_LOG_DIR = "out/change_log"
+RUN_TAG_FORMAT = "%Y%m%d_%H%M%S"
+ID_COL = "Certificate_ID"
+
+
+def run_tag(run_at: datetime, source=None) -> str:
+    """File name of one run in every column partition: run time to the second plus the output file stem."""
+    tag = run_at.strftime(RUN_TAG_FORMAT)
+    if source:
+        tag += "_" + os.path.splitext(os.path.basename(str(source)))[0]
+    return tag
+
+
+def append_changes(changes: pd.DataFrame, run_at: datetime, log_dir=CHANGE_LOG_DIR, source=None) -> int:
+    """
+    Add one run's long-form changes (compare.change_table) to the log; source is
+    the run's output file. Re-appending the same run first removes its files
+    from every column partition, so a rerun never leaves rows of two attempts.
+    Returns the number of rows written.
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    tag = run_tag(run_at, source)
+    if os.path.isdir(log_dir):
+        for folder in os.listdir(log_dir):
+            stale = os.path.join(log_dir, folder, f"{tag}.feather")
+            if folder.startswith("Column=") and os.path.exists(stale):
+                os.remove(stale)
+    for column, part in changes.groupby("Column", sort=True):
+        part = part.sort_values(ID_COL, kind="stable")
+        table = pa.table({
+            ID_COL: pa.array(part[ID_COL].astype(str).to_numpy(), pa.string()),
+            "Old_Value": pa.array(part["Old_Value"].astype(str).to_numpy(), pa.string()),
+            "New_Value": pa.array(part["New_Value"].astype(str).to_numpy(), pa.string()),
+            "Run": pa.array([run_at] * len(part), pa.timestamp("s")),
+        })
+        folder = os.path.join(log_dir, f"Column={quote(str(column), safe='')}")
+        os.makedirs(folder, exist_ok=True)
+        # dot-prefixed temp name: dataset discovery skips it if a write is interrupted
+        tmp = os.path.join(folder, f".{tag}.feather.tmp")
+        feather.write_feather(table, tmp)
+        os.replace(tmp, os.path.join(folder, f"{tag}.feather"))
+    return len(changes)
+
+
+def query_changes(column=None, cert_ids=None, since=None, until=None, log_dir=CHANGE_LOG_DIR) -> pd.DataFrame:
+    """
+    Logged changes, filtered by changed column(s), certificate ID(s) and run time
+    range (inclusive), ordered by run then certificate. A column filter only
+    reads that column's partition.
+    """
+    import pyarrow.dataset as ds
+
+    columns_out = [ID_COL, "Column", "Old_Value", "New_Value", "Run"]
+    if not os.path.isdir(log_dir):
+        return pd.DataFrame(columns=columns_out)
+    dataset = ds.dataset(log_dir, format="feather", partitioning="hive", exclude_invalid_files=True)
+
+    def as_list(v):
+        return [v] if isinstance(v, str) else list(v)
+
+    expr = None
+    for cond in (
+        ds.field("Column").isin(as_list(column)) if column is not None else None,
+        ds.field(ID_COL).isin(as_list(cert_ids)) if cert_ids is not None else None,
+        ds.field("Run") >= pd.Timestamp(since).to_pydatetime() if since is not None else None,
+        ds.field("Run") <= pd.Timestamp(until).to_pydatetime() if until is not None else None,
+    ):
+        if cond is not None:
+            expr = cond if expr is None else expr & cond
+    df = dataset.to_table(columns=columns_out, filter=expr).to_pandas()
+    return df.sort_values(["Run", ID_COL, "Column"], kind="stable").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--column", nargs="+", help="changed column(s), e.g. Status Valid_Until")
+    parser.add_argument("--id", nargs="+", help="certificate ID(s)")
+    parser.add_argument("--since", help="first run date/time to include")
+    parser.add_argument("--until", help="last run date/time to include")
+    parser.add_argument("--log-dir", default=CHANGE_LOG_DIR)
+    parser.add_argument("-o", "--output", help="write the result to this .csv/.xlsx instead of printing it")
+    args = parser.parse_args()
+
+    result = query_changes(args.column, args.id, args.since, args.until, log_dir=args.log_dir)
+    if args.output:
+        if args.output.endswith(".xlsx"):
+            result.to_excel(args.output, index=False)
+        else:
+            result.to_csv(args.output, index=False)
+        print(f"{len(result)} changes saved to {args.output}")
+    else:
+        with pd.option_context("display.max_rows", 200, "display.width", 200):
+            print(result)
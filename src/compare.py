@@ -1,13 +1,45 @@
 import os
+import json
+import numpy as np
 import pandas as pd
 import unicodedata
 import re
+from profiling import span, timed
+from snapshot import (read_snapshot, open_snapshot, table_to_frame, snapshot_metadata, fillna_blank,
+                      map_categories, categorical_ne, parse_dates, date_text, ROW_HASH_COL, ROW_HASH_SPEC_KEY,
+                      DATE_COLUMNS, DATE_FORMAT)
 
 
 # Constants (editable if needed)
 EXCEL_ENGINE = "openpyxl"
 DEFAULT_SHEET = "Certificate Database"
 
+# Columns left out of change detection (values that drift between scrapes / are overwritten from the GST)
+DEFAULT_IGNORE_COLS = ["Map", "Company_Name", "City"]
+
+INVISIBLE_CHARS = (
+    "\u200b"  # zero width space
+    "\u200c"  # zero width non-joiner
+    "\u200d"  # zero width joiner
+    "\ufeff"  # BOM
+    "\u00a0"  # non-breaking space
+    "\u2060"  # word joiner
+    "\u202f"  # narrow no-break space
+    "\u00ad"  # soft hyphen
+)
+INVISIBLES_RE = re.compile(f"[{re.escape(INVISIBLE_CHARS)}]")
+
+# Location suffixes stripped before comparing (end-of-string only)
+LOCATION_SUFFIX_PATTERNS = [
+    r",\s*Budapest,\s*Hungary\s*$",   # the case you hit
+    # Add more as needed, e.g.:
+    # r",\s*London,\s*UK\s*$",
+    # r",\s*Singapore\s*$",
+]
+
+# Bump when the normalization below changes, so stored row hashes are not reused
+ROW_HASH_VERSION = 2
+
 def find_id_column(df: pd.DataFrame) -> str:
     """
     Detect the certificate ID column.
@@ -27,47 +59,93 @@ def find_id_column(df: pd.DataFrame) -> str:
         "Expected 'Certificate_ID' or 'Certificate ID'."
     )
 
-def load_sheet(path: str, sheet_name: str = DEFAULT_SHEET) -> pd.DataFrame:
-        """Read a sheet with all columns as strings for consistent comparison."""
+@timed("load_sheet", rows=len)
+def load_sheet(path: str, sheet_name: str = DEFAULT_SHEET, keep_hash: bool = False) -> pd.DataFrame:
+        """
+        Read a sheet with all columns as strings for consistent comparison.
+        The main sheet comes from the Feather snapshot (with categoricals) when one exists;
+        its stored row hashes are dropped unless keep_hash.
+        """
         if not os.path.exists(path):
             raise FileNotFoundError(f"File not found: {path}")
+        if sheet_name == DEFAULT_SHEET:
+            df = read_snapshot(path)
+            if df is not None:
+                if not keep_hash and ROW_HASH_COL in df.columns:
+                    df = df.drop(columns=ROW_HASH_COL)
+                return df
         return pd.read_excel(path, sheet_name=sheet_name, engine=EXCEL_ENGINE, dtype=str)
 
 
 # Normalize to strings (trim whitespace) for reliable comparisons
 def _normalize(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+    df = fillna_blank(df)
     for c in df.columns:
-        df[c] = df[c].fillna("").astype(str).str.strip()
+        if isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = map_categories(df[c], lambda x: x.str.strip())
+        else:
+            df[c] = df[c].astype(str).str.strip()
     return df
 
 
-def create_certs_added(previous_fn, current_fn): 
+def _id_array(table, strip=False):
+    """The snapshot table's ID column as one Arrow string array, nulls as ""."""
+    import pyarrow.compute as pc
+    ids = table[find_id_column(pd.DataFrame(columns=table.column_names))].combine_chunks()
+    if strip:
+        ids = pc.utf8_trim_whitespace(ids)
+    return pc.fill_null(ids, "")
 
-    current_df = load_sheet(current_fn, sheet_name=DEFAULT_SHEET)
-    current_df = _normalize(current_df)
-    id_col = find_id_column(current_df)
-    current_ids = set(current_df[id_col][current_df[id_col] != ""])
 
-    # Try previous snapshot
-    prev_path = previous_fn
-    if not prev_path or not os.path.exists(prev_path):
-        # First run or prev file missing: produce empty "added" report
-        added_df = current_df.iloc[0:0].copy()
-    else:
-        prev_df = load_sheet(prev_path, sheet_name=DEFAULT_SHEET)
-        prev_df = _normalize(prev_df)
-        prev_id_col = find_id_column(prev_df)
-        prev_ids = set(prev_df[prev_id_col][prev_df[prev_id_col] != ""])
+def snapshot_id_difference(left_fn, right_fn):
+    """
+    Rows of left_fn whose certificate ID is not in right_fn, normalized like
+    _normalize, or None when either workbook has no snapshot. The set operation
+    runs on the memory-mapped ID columns; only the resulting rows are loaded.
+    """
+    import pyarrow.compute as pc
+    left, right = open_snapshot(left_fn), open_snapshot(right_fn)
+    if left is None or right is None:
+        return None
+    left_ids, right_ids = _id_array(left, strip=True), _id_array(right, strip=True)
+    keep = pc.and_(pc.not_equal(left_ids, ""), pc.invert(pc.is_in(left_ids, value_set=right_ids)))
+    rows = left.take(np.flatnonzero(keep.to_numpy(zero_copy_only=False)))
+    if ROW_HASH_COL in rows.column_names:
+        rows = rows.drop_columns([ROW_HASH_COL])
+    return _normalize(table_to_frame(rows))
+
+
+@timed("create_certs_added", rows=len)
+def create_certs_added(previous_fn, current_fn): 
 
-        # New IDs present in current, not in previous
-        new_ids = current_ids - prev_ids
-        added_df = current_df[current_df[id_col].isin(new_ids)].copy()
+    # With both snapshots, the ID set difference runs on the memory-mapped ID columns
+    prev_path = previous_fn
+    has_prev = bool(prev_path) and os.path.exists(prev_path)
+    added_df = snapshot_id_difference(current_fn, prev_path) if has_prev else None
+
+    if added_df is None:
+        current_df = load_sheet(current_fn, sheet_name=DEFAULT_SHEET)
+        current_df = _normalize(current_df)
+        id_col = find_id_column(current_df)
+        current_ids = set(current_df[id_col][current_df[id_col] != ""])
+
+        if not has_prev:
+            # First run or prev file missing: produce empty "added" report
+            added_df = current_df.iloc[0:0].copy()
+        else:
+            prev_df = load_sheet(prev_path, sheet_name=DEFAULT_SHEET)
+            prev_df = _normalize(prev_df)
+            prev_id_col = find_id_column(prev_df)
+            prev_ids = set(prev_df[prev_id_col][prev_df[prev_id_col] != ""])
+
+            # New IDs present in current, not in previous
+            new_ids = current_ids - prev_ids
+            added_df = current_df[current_df[id_col].isin(new_ids)].copy()
 
     # Append as new sheet to current workbook
     # NOTE: Excel must be closed to avoid PermissionError.
     try:
-        with pd.ExcelWriter(current_fn, engine=EXCEL_ENGINE, mode="a", if_sheet_exists="new") as writer:
+        with span("write_sheet", rows=len(added_df), sheet="Certificates Added"), pd.ExcelWriter(current_fn, engine=EXCEL_ENGINE, mode="a", if_sheet_exists="new") as writer:
             new_sheet_name = "Certificates Added"
             added_df.to_excel(writer, sheet_name=new_sheet_name, index=False)
     except PermissionError as e:
@@ -79,34 +157,40 @@ def create_certs_added(previous_fn, current_fn):
     # Simple console summary (optional)
     print(f"Compared against: {prev_path or '(no previous snapshot)'}")
     print(f"Added certificates found: {len(added_df)}")
+    return added_df
 
 
+@timed("create_certs_removed", rows=len)
 def create_certs_removed(previous_fn, current_fn):
   
-    current_df = load_sheet(current_fn, sheet_name=DEFAULT_SHEET)
-    current_df = _normalize(current_df)
-    id_col = find_id_column(current_df)
-    current_ids = set(current_df[id_col][current_df[id_col] != ""])
-
-    # Load previous snapshot
+    # With both snapshots, the ID set difference runs on the memory-mapped ID columns
     prev_path = previous_fn
-    if not prev_path or not os.path.exists(prev_path):
-        # No previous file: nothing can be "removed"
-        removed_df = current_df.iloc[0:0].copy()
-    else:
-        prev_df = load_sheet(prev_path, sheet_name=DEFAULT_SHEET)
-        prev_df = _normalize(prev_df)
-        prev_id_col = find_id_column(prev_df)
-        prev_ids = set(prev_df[prev_id_col][prev_df[prev_id_col] != ""])
-
-        # Removed IDs: present in previous, not in current
-        removed_ids = prev_ids - current_ids
-        removed_df = prev_df[prev_df[prev_id_col].isin(removed_ids)].copy()
+    has_prev = bool(prev_path) and os.path.exists(prev_path)
+    removed_df = snapshot_id_difference(prev_path, current_fn) if has_prev else None
+
+    if removed_df is None:
+        current_df = load_sheet(current_fn, sheet_name=DEFAULT_SHEET)
+        current_df = _normalize(current_df)
+        id_col = find_id_column(current_df)
+        current_ids = set(current_df[id_col][current_df[id_col] != ""])
+
+        if not has_prev:
+            # No previous file: nothing can be "removed"
+            removed_df = current_df.iloc[0:0].copy()
+        else:
+            prev_df = load_sheet(prev_path, sheet_name=DEFAULT_SHEET)
+            prev_df = _normalize(prev_df)
+            prev_id_col = find_id_column(prev_df)
+            prev_ids = set(prev_df[prev_id_col][prev_df[prev_id_col] != ""])
+
+            # Removed IDs: present in previous, not in current
+            removed_ids = prev_ids - current_ids
+            removed_df = prev_df[prev_df[prev_id_col].isin(removed_ids)].copy()
 
     # Append as new sheet to current workbook
     # NOTE: Excel must be closed to avoid PermissionError.
     try:
-        with pd.ExcelWriter(current_fn, engine=EXCEL_ENGINE, mode="a", if_sheet_exists="new") as writer:
+        with span("write_sheet", rows=len(removed_df), sheet="Certificates Removed"), pd.ExcelWriter(current_fn, engine=EXCEL_ENGINE, mode="a", if_sheet_exists="new") as writer:
             new_sheet_name = "Certificates Removed"
             removed_df.to_excel(writer, sheet_name=new_sheet_name, index=False)
     except PermissionError as e:
@@ -118,8 +202,258 @@ def create_certs_removed(previous_fn, current_fn):
     # Simple console summary (optional)
     print(f"Compared against: {prev_path or '(no previous snapshot)'}")
     print(f"Removed certificates found: {len(removed_df)}")
+    return removed_df
+
+
+def sanitize_text(s: pd.Series) -> pd.Series:
+    # 1) Unicode normalize
+    s = s.astype(str).map(lambda x: unicodedata.normalize("NFKC", x))
+    # 2) Remove invisible chars
+    s = s.map(lambda x: INVISIBLES_RE.sub("", x))
+    # 3) Trim and collapse whitespace
+    s = s.str.strip().str.replace(r"\s+", " ", regex=True)
+    return s
+
+
+def apply_equivalence_rules(s: pd.Series, custom_equivalence_rules=None, location_suffix_patterns=()) -> pd.Series:
+    # global rules first
+    if custom_equivalence_rules:
+        for pat, repl in custom_equivalence_rules:
+            s = s.str.replace(pat, repl, regex=True)
+    # then suffix rules (end-of-string only)
+    for pat in location_suffix_patterns or ():
+        s = s.str.replace(pat, "", regex=True)
+    return s
+
+
+def normalize_text(s: pd.Series, case_insensitive=True, custom_equivalence_rules=None,
+                   location_suffix_patterns=()) -> pd.Series:
+    s = sanitize_text(s).fillna("")
+    if case_insensitive:
+        s = s.str.lower()
+    return apply_equivalence_rules(s, custom_equivalence_rules, location_suffix_patterns)
+
+
+def normalize_values(df: pd.DataFrame, cols, **rules) -> pd.DataFrame:
+    """
+    Comparison form of df[cols]; rules are normalize_text's keyword arguments.
+    Date columns compare as DATE_FORMAT, whichever way they were spelled (older
+    workbooks hold the site's DD.MM.YYYY); values that are not dates compare as text.
+    """
+    out = df[cols].copy()
+    for c in cols:
+        s = out[c]
+        if pd.api.types.is_datetime64_any_dtype(s):
+            out[c] = s.dt.strftime(DATE_FORMAT).fillna("")
+        elif c in DATE_COLUMNS:
+            s = date_text(s)
+            dates, bad = parse_dates(s)
+            text = normalize_text(s.astype(object), **rules)
+            out[c] = dates.dt.strftime(DATE_FORMAT).where(dates.notna(), text).fillna("")
+        elif isinstance(s.dtype, pd.CategoricalDtype):
+            # normalize each category once, codes are re-broadcast
+            out[c] = map_categories(s, lambda x: normalize_text(x, **rules))
+        else:
+            out[c] = normalize_text(s, **rules)
+    return out
+
+
+def diff_values(curr: pd.DataFrame, prev: pd.DataFrame) -> pd.DataFrame:
+    # categoricals compare on shared category codes, everything else as strings
+    mask = {}
+    for c in curr.columns:
+        a, b = curr[c], prev[c]
+        if isinstance(a.dtype, pd.CategoricalDtype) and isinstance(b.dtype, pd.CategoricalDtype):
+            mask[c] = categorical_ne(a, b)
+        else:
+            mask[c] = a.astype(str).to_numpy() != b.astype(str).to_numpy()
+    return pd.DataFrame(mask, index=curr.index)
+
+
+def drop_volatile_columns(cols, ignore_cols=None, ignore_patterns=None):
+    cols_set = set(cols)
+    if ignore_cols:
+        cols_set -= set(ignore_cols)
+    if ignore_patterns:
+        for pat in ignore_patterns:
+            to_drop = {c for c in cols_set if re.search(pat, c, flags=re.IGNORECASE)}
+            cols_set -= to_drop
+    # keep the given order, so Value_Changed labels list columns the same way every run
+    return [c for c in cols if c in cols_set]
+
+
+def changed_column_labels(diff_mask: pd.DataFrame) -> pd.Series:
+    """
+    ", "-joined names of the changed columns for every row of a diff mask.
+    Rows are bit-packed, each distinct change pattern is labelled once and the
+    labels are broadcast back, instead of joining per row.
+    """
+    cols = np.array(diff_mask.columns, dtype=object)
+    bits = diff_mask.to_numpy(dtype=bool)
+    if not len(bits):
+        return pd.Series([], index=diff_mask.index, dtype=object)
+    packed = np.ascontiguousarray(np.packbits(bits, axis=1))
+    # one opaque bytes key per row, so np.unique sorts a 1-D array
+    keys = packed.view(np.dtype((np.void, packed.shape[1]))).ravel()
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    labels = np.array([", ".join(cols[bits[i]]) for i in first], dtype=object)
+    return pd.Series(labels[inverse.ravel()], index=diff_mask.index)
+
+
+def change_table(diff_mask: pd.DataFrame, curr: pd.DataFrame, prev: pd.DataFrame,
+                 id_name="Certificate_ID") -> pd.DataFrame:
+    """Long form of a diff: one (ID, Column, Old_Value, New_Value) row per changed cell."""
+    rows, cols = np.nonzero(diff_mask.to_numpy(dtype=bool))
+    names = diff_mask.columns
+    old = np.empty(len(rows), dtype=object)
+    new = np.empty(len(rows), dtype=object)
+    for j, c in enumerate(names):
+        sel = cols == j
+        if sel.any():
+            old[sel] = prev[c].to_numpy(dtype=object)[rows[sel]]
+            new[sel] = curr[c].to_numpy(dtype=object)[rows[sel]]
+    return pd.DataFrame({
+        id_name: diff_mask.index.to_numpy()[rows],
+        "Column": names.to_numpy()[cols],
+        "Old_Value": old,
+        "New_Value": new,
+    })
+
+
+def comparison_rules(case_insensitive=True, apply_location_suffix_rule=True,
+                     location_suffix_patterns=None, custom_equivalence_rules=None) -> dict:
+    """create_certs_changed's options as normalize_text keyword arguments."""
+    if location_suffix_patterns is None:
+        location_suffix_patterns = LOCATION_SUFFIX_PATTERNS
+    return {
+        "case_insensitive": case_insensitive,
+        "custom_equivalence_rules": [tuple(r) for r in custom_equivalence_rules or []],
+        "location_suffix_patterns": list(location_suffix_patterns) if apply_location_suffix_rule else [],
+    }
+
 
+def row_hash_spec(cols, rules) -> str:
+    """Identifies how a row hash was computed; hashes are only comparable when specs match."""
+    return json.dumps({"version": ROW_HASH_VERSION, "columns": sorted(cols), **rules}, sort_keys=True)
 
+
+def add_row_hash(df: pd.DataFrame, ignore_cols=DEFAULT_IGNORE_COLS, ignore_patterns=None, **options):
+    """
+    Returns (df with a ROW_HASH_COL column, spec). The hash covers the normalized
+    values of every column create_certs_changed would compare with the same
+    ignores/options, so two rows with equal hashes have no reportable change.
+    options are create_certs_changed's normalization options.
+    """
+    rules = comparison_rules(**options)
+    id_col = find_id_column(df)
+    cols = sorted(drop_volatile_columns([c for c in df.columns if c not in (id_col, ROW_HASH_COL)],
+                                        ignore_cols, ignore_patterns))
+    # blanks as create_certs_changed sees them after fillna_blank
+    values = normalize_values(fillna_blank(df[cols]), cols, **rules)
+    hashed = df.copy()
+    hashed[ROW_HASH_COL] = pd.util.hash_pandas_object(values, index=False).to_numpy()
+    return hashed, row_hash_spec(cols, rules)
+
+
+def prepare_snapshot(df: pd.DataFrame) -> pd.DataFrame:
+    """Stripped column names and blanks instead of NaN, as the comparisons expect."""
+    df.columns = df.columns.str.strip()
+    return fillna_blank(df)
+
+
+def diff_snapshots(current_df: pd.DataFrame, prev_df: pd.DataFrame, rules: dict,
+                   ignore_cols=None, ignore_patterns=None, hash_specs=(None, None)):
+    """
+    Value changes between two prepared snapshots (prepare_snapshot) for the IDs in
+    both: returns (current rows that changed + Value_Changed, long-form change_table).
+    rules come from comparison_rules; hash_specs are the snapshots' row hash specs,
+    used to skip rows whose stored hashes are equal.
+    """
+    id_col_curr = find_id_column(current_df)
+    id_col_prev = find_id_column(prev_df)
+
+    shared_cols = [c for c in current_df.columns
+                   if c in prev_df.columns and c not in (id_col_curr, id_col_prev, ROW_HASH_COL)]
+    shared_cols = drop_volatile_columns(shared_cols, ignore_cols, ignore_patterns)
+    if not shared_cols:
+        raise ValueError("No comparable columns found after applying ignores.")
+
+    # --- index & dedup by ID (take first) ---
+    current_idx = (current_df.set_index(id_col_curr, drop=False)
+                             .groupby(level=0, as_index=True).first())
+    prev_idx    = (prev_df.set_index(id_col_prev, drop=False)
+                           .groupby(level=0, as_index=True).first())
+
+    # --- compare only the common IDs ---
+    common_ids = current_idx.index.intersection(prev_idx.index)
+    curr_common = current_idx.loc[common_ids]
+    prev_common = prev_idx.loc[common_ids]
+
+    # --- row hashes stored at scrape time: only rows whose hash differs can have changed ---
+    if hash_specs[0] is not None and hash_specs[0] == hash_specs[1] == row_hash_spec(shared_cols, rules):
+        candidates = curr_common[ROW_HASH_COL].to_numpy() != prev_common[ROW_HASH_COL].to_numpy()
+        curr_common = curr_common[candidates]
+        prev_common = prev_common[candidates]
+        print(f"Row hashes differ for {len(curr_common)} of {len(common_ids)} common certificates")
+
+    # --- normalize, compare (vectorized) ---
+    curr_norm = normalize_values(curr_common, shared_cols, **rules)
+    prev_norm = normalize_values(prev_common, shared_cols, **rules)
+
+    diff_mask = diff_values(curr_norm, prev_norm)
+    changed_ids = diff_mask.any(axis=1)
+    changed_ids = changed_ids[changed_ids].index
+
+    changed_mask = diff_mask.loc[changed_ids]
+    changes = change_table(changed_mask, curr_common.loc[changed_ids], prev_common.loc[changed_ids], id_col_curr)
+
+    # assemble from current snapshot + annotation
+    changed_df = curr_common.loc[changed_ids].copy()
+    changed_df["Value_Changed"] = changed_column_labels(changed_mask)
+
+    base_cols = [c for c in current_df.columns if c != ROW_HASH_COL]
+    if "Value_Changed" not in base_cols:
+        base_cols.append("Value_Changed")
+    changed_df = changed_df[base_cols]
+    return changed_df, changes
+
+
+def load_hash_candidates(current_fn, previous_fn, rules, ignore_cols=None, ignore_patterns=None):
+    """
+    (current, previous) frames holding only the common certificates whose stored
+    row hashes differ, ready for diff_snapshots; None when the snapshots cannot
+    be used for this (missing, empty, or hashed under other rules).
+    Works on the memory-mapped ID and hash columns; only candidate rows are loaded.
+    """
+    import pyarrow.compute as pc
+    curr, prev = open_snapshot(current_fn), open_snapshot(previous_fn)
+    if curr is None or prev is None or prev.num_rows == 0:
+        return None
+    if ROW_HASH_COL not in curr.column_names or ROW_HASH_COL not in prev.column_names:
+        return None
+    id_curr = find_id_column(pd.DataFrame(columns=curr.column_names))
+    id_prev = find_id_column(pd.DataFrame(columns=prev.column_names))
+    shared_cols = set(curr.column_names).intersection(prev.column_names) - {id_curr, id_prev, ROW_HASH_COL}
+    spec = row_hash_spec(drop_volatile_columns(list(shared_cols), ignore_cols, ignore_patterns), rules)
+    if not (snapshot_metadata(current_fn).get(ROW_HASH_SPEC_KEY)
+            == snapshot_metadata(previous_fn).get(ROW_HASH_SPEC_KEY) == spec):
+        return None
+
+    curr_ids, prev_ids = _id_array(curr), _id_array(prev)
+    # First row per ID (like the groupby-first dedup) and its first match in prev
+    first = pc.equal(pc.index_in(curr_ids, value_set=curr_ids), np.arange(len(curr_ids)))
+    prev_pos = pc.index_in(curr_ids, value_set=prev_ids)
+    common = pc.and_(first, pc.is_valid(prev_pos))
+    differs = pc.not_equal(curr[ROW_HASH_COL].combine_chunks(), pc.take(prev[ROW_HASH_COL].combine_chunks(), prev_pos))
+    rows = np.flatnonzero(pc.and_(common, pc.fill_null(differs, False)).to_numpy(zero_copy_only=False))
+    print(f"Row hashes differ for {len(rows)} of {pc.sum(common).as_py() or 0} common certificates")
+
+    current_df = prepare_snapshot(table_to_frame(curr.take(rows)))
+    prev_df = prepare_snapshot(table_to_frame(prev.take(prev_pos.take(rows))))
+    return current_df, prev_df
+
+
+@timed("create_certs_changed", rows=lambda r: len(r[0]) if isinstance(r, tuple) else len(r))
 def create_certs_changed(
     previous_fn,
     current_fn,
@@ -132,7 +466,11 @@ def create_certs_changed(
     # You can add more suffixes here if you encounter them
     location_suffix_patterns=None,
     # Global text equivalence rules (pattern, replacement)
-    custom_equivalence_rules=None
+    custom_equivalence_rules=None,
+    # Also write the long-form (ID, Column, Old_Value, New_Value) table to this sheet
+    changes_sheet=None,
+    # Return (changed_df, long-form changes) instead of changed_df
+    return_changes=False
 ):
     """
     Compare two snapshots of the 'Certificate Database' and return rows whose values changed.
@@ -147,93 +485,38 @@ def create_certs_changed(
       • Deduping by ID before comparison
       • Ignoring specified columns and/or regex patterns
     Writes directly to 'output_path' (no temp file).
+    With changes_sheet, the cell-level (ID, Column, Old_Value, New_Value) table is
+    written as well, so changes can be filtered by column instead of by Value_Changed.
     """
 
-    # -------- helpers --------
-    INVISIBLE_CHARS = (
-        "\u200b"  # zero width space
-        "\u200c"  # zero width non-joiner
-        "\u200d"  # zero width joiner
-        "\ufeff"  # BOM
-        "\u00a0"  # non-breaking space
-        "\u2060"  # word joiner
-        "\u202f"  # narrow no-break space
-        "\u00ad"  # soft hyphen
-    )
-    INVISIBLES_RE = re.compile(f"[{re.escape(INVISIBLE_CHARS)}]")
-
-    if location_suffix_patterns is None:
-        location_suffix_patterns = [
-            r",\s*Budapest,\s*Hungary\s*$",   # the case you hit
-            # Add more as needed, e.g.:
-            # r",\s*London,\s*UK\s*$",
-            # r",\s*Singapore\s*$",
-        ]
-
-    def sanitize_text(s: pd.Series) -> pd.Series:
-        # 1) Unicode normalize
-        s = s.astype(str).map(lambda x: unicodedata.normalize("NFKC", x))
-        # 2) Remove invisible chars
-        s = s.map(lambda x: INVISIBLES_RE.sub("", x))
-        # 3) Trim and collapse whitespace
-        s = s.str.strip().str.replace(r"\s+", " ", regex=True)
-        return s
-
-    def apply_equivalence_rules(s: pd.Series) -> pd.Series:
-        # global rules first
-        if custom_equivalence_rules:
-            for pat, repl in custom_equivalence_rules:
-                s = s.str.replace(pat, repl, regex=True)
-        # then suffix rules (end-of-string only)
-        if apply_location_suffix_rule and location_suffix_patterns:
-            for pat in location_suffix_patterns:
-                s = s.str.replace(pat, "", regex=True)
-        return s
-
-    def normalize_cols(df):
-        df.columns = df.columns.str.strip()
-        return df
-
-    def normalize_values(df, cols):
-        out = df[cols].copy()
-        for c in cols:
-            s = out[c]
-            if pd.api.types.is_datetime64_any_dtype(s):
-                out[c] = s.dt.strftime("%Y-%m-%d %H:%M:%S").fillna("")
-            else:
-                s = sanitize_text(s).fillna("")
-                if case_insensitive:
-                    s = s.str.lower()
-                s = apply_equivalence_rules(s)
-                out[c] = s
-        return out
-
-    def drop_volatile_columns(cols):
-        cols_set = set(cols)
-        if ignore_cols:
-            cols_set -= set(ignore_cols)
-        if ignore_patterns:
-            for pat in ignore_patterns:
-                to_drop = {c for c in cols_set if re.search(pat, c, flags=re.IGNORECASE)}
-                cols_set -= to_drop
-        return list(cols_set)
+    rules = comparison_rules(case_insensitive, apply_location_suffix_rule,
+                             location_suffix_patterns, custom_equivalence_rules)
 
     # -------- load --------
-    current_df = load_sheet(current_fn, sheet_name=sheet_name)
-    prev_df    = load_sheet(previous_fn, sheet_name=sheet_name)
+    candidates = None
+    if sheet_name == DEFAULT_SHEET and previous_fn and os.path.exists(previous_fn):
+        candidates = load_hash_candidates(current_fn, previous_fn, rules, ignore_cols, ignore_patterns)
+    if candidates is not None:
+        # Already narrowed to rows whose hashes differ
+        current_df, prev_df = candidates
+        hash_specs = (None, None)
+    else:
+        current_df = load_sheet(current_fn, sheet_name=sheet_name, keep_hash=True)
+        prev_df    = load_sheet(previous_fn, sheet_name=sheet_name, keep_hash=True)
+        hash_specs = (snapshot_metadata(current_fn).get(ROW_HASH_SPEC_KEY),
+                      snapshot_metadata(previous_fn).get(ROW_HASH_SPEC_KEY))
 
-    current_df = normalize_cols(current_df).fillna("")
-    prev_df    = normalize_cols(prev_df).fillna("")
+        current_df = prepare_snapshot(current_df)
+        prev_df    = prepare_snapshot(prev_df)
 
     id_col_curr = find_id_column(current_df)
-    id_col_prev = find_id_column(prev_df)
 
-    if prev_df is None or prev_df.empty:
-        empty_cols = list(current_df.columns) + ["Value_Changed"]
+    if candidates is None and (prev_df is None or prev_df.empty):
+        empty_cols = [c for c in current_df.columns if c != ROW_HASH_COL] + ["Value_Changed"]
         changed_df = pd.DataFrame(columns=empty_cols)
         # Write empty sheet (optional but keeps workflow consistent)
         try:
-            with pd.ExcelWriter(current_fn, engine=EXCEL_ENGINE, mode="a", if_sheet_exists="new") as writer:
+            with span("write_sheet", rows=len(changed_df), sheet="Certificates Changed"), pd.ExcelWriter(current_fn, engine=EXCEL_ENGINE, mode="a", if_sheet_exists="new") as writer:
                 changed_df.to_excel(writer, sheet_name="Certificates Changed", index=False)
         except PermissionError as e:
             raise PermissionError(
@@ -241,54 +524,21 @@ def create_certs_changed(
             ) from e
         print(f"Compared against: {previous_fn or '(no previous snapshot)'}")
         print("No previous snapshot found (or empty). No change rows generated.")
+        if return_changes:
+            return changed_df, pd.DataFrame(columns=[id_col_curr, "Column", "Old_Value", "New_Value"])
         return changed_df
 
-    shared_cols = set(current_df.columns).intersection(prev_df.columns)
-    shared_cols.discard(id_col_curr)
-    shared_cols.discard(id_col_prev)
-    shared_cols = drop_volatile_columns(list(shared_cols))
-    if not shared_cols:
-        raise ValueError("No comparable columns found after applying ignores.")
-
-    # --- index & dedup by ID (take first) ---
-    current_idx = (current_df.set_index(id_col_curr, drop=False)
-                             .groupby(level=0, as_index=True).first())
-    prev_idx    = (prev_df.set_index(id_col_prev, drop=False)
-                           .groupby(level=0, as_index=True).first())
-
-    # --- compare only the common IDs ---
-    common_ids = current_idx.index.intersection(prev_idx.index)
-    curr_common = current_idx.loc[common_ids]
-    prev_common = prev_idx.loc[common_ids]
-
-    # --- normalize, compare (vectorized) ---
-    curr_norm = normalize_values(curr_common, shared_cols)
-    prev_norm = normalize_values(prev_common, shared_cols)
-
-    diff_mask = curr_norm.ne(prev_norm)
-    changed_ids = diff_mask.any(axis=1)
-    changed_ids = changed_ids[changed_ids].index
-
-    changed_cols_list = diff_mask.loc[changed_ids].apply(
-        lambda row: ", ".join([col for col, changed in row.items() if changed]),
-        axis=1
-    )
-
-    # assemble from current snapshot + annotation
-    changed_df = curr_common.loc[changed_ids].copy()
-    changed_df["Value_Changed"] = changed_cols_list
-
-    base_cols = list(current_df.columns)
-    if "Value_Changed" not in base_cols:
-        base_cols.append("Value_Changed")
-    changed_df = changed_df[base_cols]
+    changed_df, changes = diff_snapshots(current_df, prev_df, rules, ignore_cols, ignore_patterns, hash_specs)
 
     print(f"Changed certificates found: {len(changed_df)}")
 
     # Append as new sheet to the current workbook
     try:
-        with pd.ExcelWriter(current_fn, engine=EXCEL_ENGINE, mode="a", if_sheet_exists="new") as writer:
+        with span("write_sheet", rows=len(changed_df), sheet="Certificates Changed"), pd.ExcelWriter(current_fn, engine=EXCEL_ENGINE, mode="a", if_sheet_exists="new") as writer:
             changed_df.to_excel(writer, sheet_name="Certificates Changed", index=False)
+        if changes_sheet:
+            with span("write_sheet", rows=len(changes), sheet=changes_sheet), pd.ExcelWriter(current_fn, engine=EXCEL_ENGINE, mode="a", if_sheet_exists="new") as writer:
+                changes.to_excel(writer, sheet_name=changes_sheet, index=False)
     except PermissionError as e:
         raise PermissionError(
             f"Could not write to '{current_fn}'. Is it open in Excel/OneDrive? Close it and retry."
@@ -298,3 +548,4 @@ def create_certs_changed(
     print(f"Compared against: {previous_fn or '(no previous snapshot)'}")
     print(f"Changed certificates found: {len(changed_df)}")
 
+    return (changed_df, changes) if return_changes else changed_df
@@ -0,0 +1,204 @@
+"""
+Pre-aggregated certificate counts for dashboards (Power BI etc.).
+
+Every run leaves small CSV cubes in out/cubes/: certificate counts rolled up
+by Region / Sub_Region, Facility_Grouping, Certificate_Type, Status and by
+validity month (from cert_valid_from / cert_valid_until):
+
+    out/cubes/<cube>.csv            counts as of the latest run
+    out/cubes/<cube>_history.csv    the same counts for every run (Run column)
+    out/cubes/cubes.json            which workbook the current counts describe
+
+After the first run the cubes are not recounted from the full dataset: the
+run's added / removed / changed certificates are applied to the previous
+counts. A full recount happens when the cubes are missing, describe another
+workbook, or any cube's counts per dimension value (e.g. certificates per
+Status) no longer match the current rows.
+
+    python src/cubes.py out/ISCC_Certificates_01.02.2026_06.00.xlsx     # full rebuild
+"""
+import argparse
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from atomic import atomic_write_csv, atomic_write_json, load_pointer
+from compare import find_id_column, load_sheet
+from snapshot import open_snapshot, table_to_frame, to_datetimes
+
+CUBE_DIR = "out/cubes"
+MANIFEST = "cubes.json"
+MEASURE = "Certificates"
+
+# Month dimensions and the date column each one is derived from
+MONTH_COLUMNS = {"Valid_From_Month": "Valid_From", "Valid_Until_Month": "Valid_Until"}
+
+CUBES = {
+    "region_status": ["Region", "Sub_Region", "Status"],
+    "facility_status": ["Facility_Grouping", "Status"],
+    "type_status": ["Certificate_Type", "Status"],
+    "expiry_month": ["Valid_Until_Month", "Region", "Status"],
+    "start_month": ["Valid_From_Month", "Certificate_Type"],
+}
+
+
+def _source_columns():
+    cols = {MONTH_COLUMNS.get(d, d) for dims in CUBES.values() for d in dims}
+    return sorted(cols)
+
+
+def dimension_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """The cube dimensions of df's rows: stripped strings ('' for missing) plus the month columns."""
+    out = pd.DataFrame(index=df.index)
+    dates = to_datetimes(df[[c for c in MONTH_COLUMNS.values() if c in df.columns]].copy())
+    for col in _source_columns():
+        if col in MONTH_COLUMNS.values():
+            continue
+        s = df[col] if col in df.columns else pd.Series("", index=df.index)
+        out[col] = s.astype(object).where(s.notna(), "").astype(str).str.strip()
+    for month, col in MONTH_COLUMNS.items():
+        out[month] = dates[col].dt.strftime("%Y-%m").fillna("") if col in dates.columns else ""
+    return out
+
+
+def count_cube(dims_df: pd.DataFrame, dims) -> pd.DataFrame:
+    if dims_df.empty:
+        return pd.DataFrame(columns=[*dims, MEASURE])
+    counts = dims_df.groupby(dims, sort=True).size()
+    return counts.rename(MEASURE).reset_index()
+
+
+def build_cubes(df: pd.DataFrame, dims_df: pd.DataFrame = None) -> dict:
+    """All cubes counted from a full dataset (or its dimension_frame, when already made)."""
+    dims_df = dimension_frame(df) if dims_df is None else dims_df
+    return {name: count_cube(dims_df, dims) for name, dims in CUBES.items()}
+
+
+def cube_mismatches(cubes: dict, dims_df: pd.DataFrame) -> list:
+    """
+    "cube.dimension" for every cube whose count per value of one of its
+    dimensions differs from the rows in dims_df. Catches certificates moved to
+    the wrong cell, which a grand total alone does not.
+    """
+    counts = {d: dims_df[d].value_counts().to_dict() for d in dims_df.columns}
+    mismatches = []
+    for name, dims in CUBES.items():
+        cube = cubes[name]
+        for d in dims:
+            got = cube.groupby(d)[MEASURE].sum() if not cube.empty else pd.Series(dtype=np.int64)
+            if {k: int(v) for k, v in got.items() if v} != counts[d]:
+                mismatches.append(f"{name}.{d}")
+    return mismatches
+
+
+def apply_delta(cube: pd.DataFrame, dims, plus: pd.DataFrame, minus: pd.DataFrame) -> pd.DataFrame:
+    """cube + counts of the plus rows - counts of the minus rows (dimension frames)."""
+    delta_minus = count_cube(minus, dims)
+    delta_minus[MEASURE] = -delta_minus[MEASURE]
+    parts = [p for p in (cube, count_cube(plus, dims), delta_minus) if not p.empty]
+    if not parts:
+        return cube
+    merged = pd.concat(parts, ignore_index=True)
+    merged[dims] = merged[dims].astype(str)
+    merged = merged.groupby(dims, sort=True)[MEASURE].sum().reset_index()
+    merged = merged[merged[MEASURE] != 0]
+    return merged.astype({MEASURE: np.int64}).reset_index(drop=True)
+
+
+def update_cubes(cubes: dict, added, removed, changed_new, changed_old) -> dict:
+    """
+    Previous cubes moved forward by one run's diff: added certificates counted in,
+    removed ones counted out, changed ones moved from their old to their new cells.
+    """
+    plus = pd.concat([dimension_frame(added), dimension_frame(changed_new)], ignore_index=True)
+    minus = pd.concat([dimension_frame(removed), dimension_frame(changed_old)], ignore_index=True)
+    return {name: apply_delta(cubes[name], dims, plus, minus) for name, dims in CUBES.items()}
+
+
+def rows_by_id(xlsx_path, ids) -> pd.DataFrame:
+    """The rows of a workbook's snapshot (or main sheet) whose certificate ID is in ids."""
+    table = open_snapshot(xlsx_path)
+    if table is not None:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        id_col = find_id_column(pd.DataFrame(columns=table.column_names))
+        keep = pc.is_in(pc.utf8_trim_whitespace(table[id_col]), value_set=pa.array(list(ids), pa.string()))
+        table = table.select([c for c in table.column_names if c in (id_col, *_source_columns())])
+        return table_to_frame(table.filter(keep))
+    df = load_sheet(xlsx_path)
+    id_col = find_id_column(df)
+    return df[df[id_col].astype(str).str.strip().isin(set(ids))]
+
+
+def load_cubes(cube_dir=CUBE_DIR):
+    """(cubes, manifest) as left by the last run, or (None, manifest) when any cube is missing."""
+    manifest = load_pointer(os.path.join(cube_dir, MANIFEST))
+    cubes = {}
+    for name, dims in CUBES.items():
+        path = os.path.join(cube_dir, f"{name}.csv")
+        if not os.path.exists(path):
+            return None, manifest
+        cubes[name] = pd.read_csv(path, dtype={d: str for d in dims}, keep_default_na=False)
+    return cubes, manifest
+
+
+def write_cubes(cubes: dict, source, run_at: datetime, rows, mode, cube_dir=CUBE_DIR):
+    """Current cubes plus this run's rows in the history files (a rerun replaces its own rows)."""
+    run = run_at.isoformat(timespec="seconds")
+    for name, cube in cubes.items():
+        atomic_write_csv(os.path.join(cube_dir, f"{name}.csv"), cube)
+        history_path = os.path.join(cube_dir, f"{name}_history.csv")
+        history = cube.assign(Run=run)[["Run", *cube.columns]]
+        if os.path.exists(history_path):
+            old = pd.read_csv(history_path, dtype=str, keep_default_na=False)
+            history = pd.concat([old[old["Run"] != run], history.astype(str)], ignore_index=True)
+        atomic_write_csv(history_path, history)
+    atomic_write_json(os.path.join(cube_dir, MANIFEST),
+                      {"source": source, "run": run, "rows": int(rows), "mode": mode, "cubes": CUBES})
+
+
+def refresh_cubes(current_file, prev_file=None, added=None, removed=None, changed=None,
+                  run_at=None, cube_dir=CUBE_DIR) -> str:
+    """
+    Bring the cubes up to date with current_file. With the previous run's
+    workbook and its diff (create_certs_added / _removed / _changed results) the
+    previous cubes are updated incrementally; otherwise they are rebuilt.
+    Returns "incremental" or "rebuilt".
+    """
+    run_at = run_at or datetime.now()
+    table = open_snapshot(current_file, columns=_source_columns())
+    dims_df = dimension_frame(load_sheet(current_file) if table is None else table_to_frame(table))
+    rows = len(dims_df)
+    cubes, manifest = load_cubes(cube_dir)
+    incremental = (cubes is not None and prev_file and manifest.get("source") == prev_file
+                   and manifest.get("cubes") == CUBES and added is not None)
+
+    if incremental:
+        changed = changed if changed is not None else pd.DataFrame()
+        changed_old = pd.DataFrame()
+        if not changed.empty:
+            id_col = find_id_column(changed)
+            changed_old = rows_by_id(prev_file, changed[id_col].astype(str).str.strip())
+        cubes = update_cubes(cubes, added, removed, changed, changed_old)
+        mismatches = cube_mismatches(cubes, dims_df)
+        if mismatches:
+            print(f"Cube counts do not match the current rows ({', '.join(mismatches[:5])}), rebuilding.")
+            incremental = False
+    if not incremental:
+        cubes = build_cubes(None, dims_df)
+
+    mode = "incremental" if incremental else "rebuilt"
+    write_cubes(cubes, current_file, run_at, rows, mode, cube_dir)
+    print(f"Cubes {mode} in {cube_dir} ({rows} certificates)")
+    return mode
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("workbook", help="run workbook to count (its Feather snapshot is used when present)")
+    parser.add_argument("--cube-dir", default=CUBE_DIR)
+    args = parser.parse_args()
+    refresh_cubes(args.workbook, run_at=datetime.fromtimestamp(os.path.getmtime(args.workbook)),
+                  cube_dir=args.cube_dir)
@@ -0,0 +1,161 @@
+"""
+Expiry forecasting: which certificates run out in the next N days, overall or
+by region / facility group.
+
+ExpiryIndex keeps the row positions sorted by Valid_Until (overall and per
+group), so a query is two binary searches plus a slice. Every run adds an
+"Expiring Soon" sheet to its workbook and publishes the same list as JSON
+(out/expiring_certificates.json).
+
+    python src/expiry.py out/ISCC_Certificates_01.02.2026_06.00.xlsx --days 60 --region Europe
+"""
+import argparse
+import os
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from atomic import atomic_write_json
+from compare import load_sheet, EXCEL_ENGINE
+from profiling import span
+from snapshot import open_snapshot, table_to_frame, to_datetimes, DATE_FORMAT
+
+EXPIRY_DAYS = 90
+EXPIRY_SHEET = "Expiring Soon"
+EXPIRY_FEED = "expiring_certificates.json"
+# Only certificates in these states can still "expire"
+EXPIRY_STATUSES = ["Valid"]
+
+DATE_COL = "Valid_Until"
+GROUP_COLUMNS = {"region": "Region", "facility": "Facility_Grouping"}
+REPORT_COLUMNS = ["Status", "Certificate_ID", "Company_Name", "Country", "Region", "Sub_Region",
+                  "Facility_Grouping", "Certificate_Type", "Issuing_CB", DATE_COL]
+
+
+def _sorted_by_date(rows, dates):
+    order = np.argsort(dates[rows], kind="stable")
+    rows = rows[order]
+    return dates[rows], rows
+
+
+class ExpiryIndex:
+    """Certificates (in EXPIRY_STATUSES) sorted by expiry date, overall and per region / facility group."""
+
+    def __init__(self, df: pd.DataFrame, statuses=EXPIRY_STATUSES):
+        df = to_datetimes(df.reset_index(drop=True).copy(), columns=[DATE_COL])
+        if statuses and "Status" in df.columns:
+            df = df[df["Status"].astype(str).isin(statuses)].reset_index(drop=True)
+        self.df = df
+        dates = df[DATE_COL].to_numpy(dtype="datetime64[ns]")
+        dated = np.flatnonzero(~np.isnat(dates))
+        self._all = _sorted_by_date(dated, dates)
+        self._groups = {}
+        for name, col in GROUP_COLUMNS.items():
+            if col not in df.columns:
+                continue
+            groups = df.iloc[dated].groupby(df[col].iloc[dated].astype(str), sort=False).indices
+            self._groups[name] = {value: _sorted_by_date(dated[pos], dates) for value, pos in groups.items()}
+
+    def __len__(self):
+        return len(self._all[1])
+
+    def _range(self, index, start, end):
+        dates, rows = index
+        lo = np.searchsorted(dates, start, side="left")
+        hi = np.searchsorted(dates, end, side="right")
+        return rows[lo:hi]
+
+    def expiring(self, days=EXPIRY_DAYS, as_of=None, region=None, facility=None) -> pd.DataFrame:
+        """
+        Certificates expiring between as_of (default today) and as_of + days,
+        soonest first, with a Days_Left column. region / facility narrow it to one group.
+        """
+        start = pd.Timestamp(as_of or date.today()).normalize()
+        end = start + pd.Timedelta(days=days)
+        bounds = (start.to_datetime64(), end.to_datetime64())
+        filters = {"region": region, "facility": facility}
+        picked = [(name, value) for name, value in filters.items() if value is not None and name in self._groups]
+        empty = (np.empty(0, dtype="datetime64[ns]"), np.empty(0, dtype=np.int64))
+        if not picked:
+            rows = self._range(self._all, *bounds)
+        else:
+            name, value = picked[0]
+            rows = self._range(self._groups[name].get(value, empty), *bounds)
+            for name, value in picked[1:]:
+                rows = rows[np.isin(rows, self._groups[name].get(value, empty)[1])]
+        out = self.df.iloc[rows][[c for c in REPORT_COLUMNS if c in self.df.columns]].copy()
+        out["Days_Left"] = (out[DATE_COL] - start).dt.days
+        return out.reset_index(drop=True)
+
+
+def load_expiry_frame(xlsx_path) -> pd.DataFrame:
+    """The columns the expiry report needs, from the snapshot when there is one."""
+    table = open_snapshot(xlsx_path, columns=REPORT_COLUMNS)
+    return load_sheet(xlsx_path) if table is None else table_to_frame(table)
+
+
+def expiry_feed(expiring: pd.DataFrame, days, as_of) -> dict:
+    """JSON-ready summary and list of expiring certificates."""
+    records = expiring.copy()
+    records[DATE_COL] = records[DATE_COL].dt.strftime(DATE_FORMAT)
+    records = records.astype(object).where(records.notna(), None)
+
+    def counts(col):
+        return {str(k): int(v) for k, v in expiring[col].astype(str).value_counts().items()} \
+            if col in expiring.columns else {}
+
+    return {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "as_of": pd.Timestamp(as_of or date.today()).strftime(DATE_FORMAT),
+        "days": days,
+        "total": len(expiring),
+        "by_region": counts(GROUP_COLUMNS["region"]),
+        "by_facility": counts(GROUP_COLUMNS["facility"]),
+        "certificates": records.to_dict(orient="records"),
+    }
+
+
+def add_expiry_sheet(xlsx_path, days=EXPIRY_DAYS, as_of=None) -> dict:
+    """Write the "Expiring Soon" sheet into the workbook; returns the feed for it."""
+    with span("expiry_index"):
+        index = ExpiryIndex(load_expiry_frame(xlsx_path))
+        expiring = index.expiring(days, as_of)
+    try:
+        with span("write_sheet", rows=len(expiring), sheet=EXPIRY_SHEET), \
+                pd.ExcelWriter(xlsx_path, engine=EXCEL_ENGINE, mode="a", if_sheet_exists="replace",
+                               datetime_format="YYYY-MM-DD") as writer:
+            expiring.to_excel(writer, sheet_name=EXPIRY_SHEET, index=False)
+    except PermissionError as e:
+        raise PermissionError(
+            f"Could not write to '{xlsx_path}'. Is it open in Excel/OneDrive? Close it and retry."
+        ) from e
+    print(f"Certificates expiring in the next {days} days: {len(expiring)}")
+    return expiry_feed(expiring, days, as_of)
+
+
+def feed_path(xlsx_path) -> str:
+    """The JSON feed lives next to the run workbooks."""
+    return os.path.join(os.path.dirname(str(xlsx_path)) or ".", EXPIRY_FEED)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("workbook")
+    parser.add_argument("--days", type=int, default=EXPIRY_DAYS)
+    parser.add_argument("--as-of", help="start date (default: today)")
+    parser.add_argument("--region")
+    parser.add_argument("--facility", help="Facility_Grouping value")
+    parser.add_argument("-o", "--output", help="write the result to this .csv/.xlsx/.json instead of printing it")
+    args = parser.parse_args()
+
+    result = ExpiryIndex(load_expiry_frame(args.workbook)).expiring(args.days, args.as_of, args.region, args.facility)
+    if not args.output:
+        with pd.option_context("display.max_rows", 200, "display.width", 200):
+            print(result)
+    elif args.output.endswith(".json"):
+        atomic_write_json(args.output, expiry_feed(result, args.days, args.as_of))
+    elif args.output.endswith(".xlsx"):
+        result.to_excel(args.output, index=False)
+    else:
+        result.to_csv(args.output, index=False)
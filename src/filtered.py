@@ -0,0 +1,137 @@
+"""
+Targeted scrapes: push scope / status / country filters to the ISCC server
+through the wpDataTables per-column search fields instead of pulling every
+certificate.
+
+    python src/filtered.py --group "LCF Trading liquid biofuels assets" --status Valid
+    python src/filtered.py --scope HVO HEFA --country Germany Netherlands -o out/hvo.xlsx
+"""
+import argparse
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from mappings import FACILITY_GROUPING_MAP, STATUS_MAP, MANUAL_COUNTRY_OVERRIDES
+from scopes import split_scope
+from scrape import (COLUMNS, STREAM_BATCH_ROWS, fetch_all_rows, get_fresh_nonce, probe_schema, enrich,
+                    iter_enriched, split_cert_owner, get_country_name, _load_asset_index)
+from sinks import write_outputs
+
+# Filter name -> certificate table column searched on the server
+FILTER_COLUMNS = {
+    "scope": "cert_scope",
+    "status": "cert_status",
+    "country": "cert_owner",
+}
+
+ID_IDX = COLUMNS.index("cert_number")
+SCOPE_IDX = COLUMNS.index("cert_scope")
+STATUS_IDX = COLUMNS.index("cert_status")
+OWNER_IDX = COLUMNS.index("cert_owner")
+
+
+def scopes_for_group(group):
+    """All scope codes in a FACILITY_GROUPING_MAP group, e.g. 'LCF Trading liquid biofuels assets'."""
+    codes = [code for code, g in FACILITY_GROUPING_MAP.items() if g == group]
+    if not codes:
+        raise KeyError(f"Unknown facility grouping '{group}'")
+    return codes
+
+
+def status_codes(statuses):
+    """Accept status names ('Valid', 'Expired') or codes (1, '5'); return the codes as strings."""
+    codes = []
+    for status in statuses:
+        s = str(status).strip()
+        if s.isdigit():
+            codes.append(s)
+        else:
+            matching = [str(code) for code, name in STATUS_MAP.items() if name.lower() == s.lower()]
+            if not matching:
+                raise KeyError(f"Unknown status '{status}'")
+            codes.extend(matching)
+    return list(dict.fromkeys(codes))
+
+
+def _country_of(owner):
+    country = split_cert_owner(owner)[2]
+    return {country.lower(), MANUAL_COUNTRY_OVERRIDES.get(get_country_name(country), get_country_name(country)).lower()}
+
+
+def _row_matches(row, scopes, statuses, countries):
+    """
+    Exact client-side check. The server search is a substring match, so "CP"
+    also returns "CPP"/"COP" and status "1" also returns 12, 13 and 15.
+    """
+    if scopes and not set(scopes) & set(split_scope(row[SCOPE_IDX])):
+        return False
+    if statuses and row[STATUS_IDX].strip() not in statuses:
+        return False
+    if countries and not {c.lower() for c in countries} & _country_of(row[OWNER_IDX]):
+        return False
+    return True
+
+
+def fetch_filtered_rows(scopes=None, statuses=None, countries=None,
+                        page_size=20000, delay=5, max_workers=4):
+    """
+    Run one server-side query per combination of filter values (the table
+    search takes a single value per column), in parallel, and return the
+    de-duplicated union of parsed rows.
+    """
+    statuses = status_codes(statuses) if statuses else []
+    values = {"scope": scopes or [], "status": statuses, "country": countries or []}
+    active = [k for k, v in values.items() if v]
+    if not active:
+        raise ValueError("Give at least one scope, status or country filter (use main.py for a full scrape).")
+
+    queries = [
+        {FILTER_COLUMNS[k]: v for k, v in zip(active, combo)}
+        for combo in itertools.product(*(values[k] for k in active))
+    ]
+    nonce = get_fresh_nonce()
+    print(f"Using nonce: {nonce}; running {len(queries)} filtered queries")
+    probe_schema(nonce)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(lambda f: fetch_all_rows(page_size, delay, filters=f, nonce=nonce), queries))
+
+    union = {}
+    for rows in results:
+        for row in rows:
+            if _row_matches(row, scopes, statuses, countries):
+                union.setdefault(row[ID_IDX], row)
+    print(f"Certificates matching filters: {len(union)} (from {sum(map(len, results))} rows fetched)")
+    return list(union.values())
+
+
+def scrape_filtered(output_file, scopes=None, statuses=None, countries=None,
+                    page_size=20000, delay=5, max_workers=4):
+    """
+    Filtered counterpart of scrape_all: same enrichment and output schema.
+    Returns the number of certificates written.
+    """
+    rows = fetch_filtered_rows(scopes, statuses, countries, page_size, delay, max_workers)
+    asset_index = _load_asset_index()
+    batches = (rows[i:i + STREAM_BATCH_ROWS] for i in range(0, len(rows), STREAM_BATCH_ROWS))
+    total = write_outputs(iter_enriched(batches, asset_index), output_file, empty=enrich([], asset_index))
+    print(f"Scraping complete! Saved {total} rows to {output_file}")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scope", nargs="+", default=[], help="scope codes, e.g. HVO HEFA")
+    parser.add_argument("--group", nargs="+", default=[], help="facility groupings from FACILITY_GROUPING_MAP")
+    parser.add_argument("--status", nargs="+", default=[], help="status names or codes, e.g. Valid 15")
+    parser.add_argument("--country", nargs="+", default=[], help="countries as shown in the certificate holder")
+    parser.add_argument("--page-size", type=int, default=20000)
+    parser.add_argument("--delay", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("-o", "--output", default=None, help="output workbook (default out/ISCC_Certificates_filtered_<timestamp>.xlsx)")
+    args = parser.parse_args()
+
+    scopes = list(dict.fromkeys(args.scope + [c for g in args.group for c in scopes_for_group(g)]))
+    output = args.output or f"out/ISCC_Certificates_filtered_{datetime.now().strftime('%d.%m.%Y_%H.%M')}.xlsx"
+    scrape_filtered(output, scopes=scopes, statuses=args.status, countries=args.country,
+                    page_size=args.page_size, delay=args.delay, max_workers=args.workers)
@@ -2,6 +2,8 @@ import pandas as pd
 from tqdm import tqdm
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
+from resolve import load_asset_index
+from scrape import GST_ASSETS_PATH, GST_ASSETS_SHEET, ASSET_INDEX_CACHE
 
 # ------------------------------------------------------
 # 1) Load ISCC + Assets File
@@ -16,91 +18,47 @@ df_iscc = pd.read_excel(
     sheet_name="Certificate Database"
 )
 
-df_assets = pd.read_excel(
-    r"C:/Users/tashif.ahmed/OneDrive - Shell/T&S LCF - Analytics, Digital, and Economics - Shared Documents/00. LCF Data Lakehouse/GSTs/GST Assets/00. Golden Source File of Asset Capacities.xlsm",
-    sheet_name="GoldenSource"
-)
-
-# ------------------------------------------------------
-# 2) Create Strong Normalization Function
-# ------------------------------------------------------
-def make_key(s):
-    return str(s).lower().replace(" ", "").replace('"', "").replace("'", "")
-
-print("Normalizing company strings...")
-
-# Normalized ISCC company name
-df_iscc["company_norm"] = df_iscc["Company_Name"].apply(make_key)
+asset_index = load_asset_index(GST_ASSETS_PATH, GST_ASSETS_SHEET, ASSET_INDEX_CACHE)
 
-# Normalized asset file keys
-df_assets["prod_norm"]  = df_assets["Company/Producer"].apply(make_key)
-df_assets["short_norm"] = df_assets["Company/Producer Short Name"].apply(make_key)
-
-# We need these columns for matching + overwriting
-assets_min = df_assets[[
-    "Company/Producer",
-    "Company/Producer Short Name",
-    "City",
-    "prod_norm",
-    "short_norm"
-]].copy()
-
-# ------------------------------------------------------
-# 3) Init Match Result Columns
 # ------------------------------------------------------
-df_iscc["matched"] = False
-df_iscc["matched_shortname"] = None
-df_iscc["matched_city"] = None
-
-# ------------------------------------------------------
-# 4) MATCH COMPANIES (with progress bar)
+# 2) MATCH COMPANIES against the compiled asset index
+#    (exact compact key on Company/Producer first, then on Short Name)
+#    Note: the compact key also drops trailing legal-form words (Ltd, GmbH, B.V., ...)
+#    and punctuation, which the old make_key (lowercase, no spaces or quotes)
+#    kept, so e.g. "Foo GmbH" now matches a GST "Foo B.V." and more rows are
+#    overwritten than before.
 # ------------------------------------------------------
 print("Matching ISCC companies to Assets...")
 
-for idx in tqdm(df_iscc.index, desc="Matching companies", unit="row"):
-    norm_name = df_iscc.at[idx, "company_norm"]
-
-    # Try match against full Company/Producer
-    full = assets_min[assets_min["prod_norm"] == norm_name]
-    if not full.empty:
-        df_iscc.at[idx, "matched"] = True
-        df_iscc.at[idx, "matched_shortname"] = full.iloc[0]["Company/Producer Short Name"]
-        df_iscc.at[idx, "matched_city"] = full.iloc[0]["City"]
-        continue
-
-    # Try match against Short Name
-    short = assets_min[assets_min["short_norm"] == norm_name]
-    if not short.empty:
-        df_iscc.at[idx, "matched"] = True
-        df_iscc.at[idx, "matched_shortname"] = short.iloc[0]["Company/Producer Short Name"]
-        df_iscc.at[idx, "matched_city"] = short.iloc[0]["City"]
-        continue
+matches = asset_index.lookup_exact(df_iscc["Company_Name"].tolist())
+
+df_iscc["matched"] = [m is not None for m in matches]
+df_iscc["matched_shortname"] = [m[0] if m else None for m in matches]
+df_iscc["matched_city"] = [m[1] if m else None for m in matches]
 
 # ------------------------------------------------------
-# 5) Apply updates where matched
+# 3) Apply updates where matched
 # ------------------------------------------------------
 print("Applying company & city replacements...")
 
-for idx in tqdm(df_iscc.index, desc="Updating rows", unit="row"):
-    if df_iscc.at[idx, "matched"]:
-        # Overwrite company name with short name
-        df_iscc.at[idx, "Company_Name"] = df_iscc.at[idx, "matched_shortname"]
-        # Overwrite city using asset file city
-        df_iscc.at[idx, "City"] = df_iscc.at[idx, "matched_city"]
+# Overwrite company name with short name and city using asset file city
+matched = df_iscc["matched"]
+df_iscc.loc[matched, "Company_Name"] = df_iscc.loc[matched, "matched_shortname"]
+df_iscc.loc[matched, "City"] = df_iscc.loc[matched, "matched_city"]
 
 # ------------------------------------------------------
-# 6) Construct asset_location column
+# 4) Construct asset_location column
 # ------------------------------------------------------
 df_iscc["asset_location"] = df_iscc["Company_Name"].astype(str) + " " + df_iscc["City"].astype(str)
 
 # ------------------------------------------------------
-# 7) Save Excel before highlighting
+# 5) Save Excel before highlighting
 # ------------------------------------------------------
 output_path = "iscc_company_city_standardised.xlsx"
 df_iscc.to_excel(output_path, index=False)
 
 # ------------------------------------------------------
-# 8) Excel Highlighting (green for matched rows)
+# 6) Excel Highlighting (green for matched rows)
 # ------------------------------------------------------
 print("Applying green highlighting to matched rows...")
 
@@ -0,0 +1,142 @@
+import codecs
+import json
+
+# Drop the consumed part of the buffer once it grows past this many characters
+_COMPACT_AT = 1 << 20
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789.eE+-"
+
+
+class JSONArrayStream:
+    """
+    Incremental reader for a JSON object whose big member is an array, e.g. a
+    wpDataTables response {"draw": .., "recordsTotal": .., "data": [[..], ..]}.
+
+    Items of the `key` array are decoded one at a time from an iterable of
+    byte chunks (such as response.iter_content()), so only the current item
+    and one chunk are held in memory. The other top-level members land in
+    `meta` as they are read; read_meta() parses up to the start of the array.
+    """
+
+    def __init__(self, chunks, key="data"):
+        self.key = key
+        self.meta = {}
+        self.bytes_read = 0
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._exhausted = False
+        self._state = "start"   # start -> members -> array -> after_array -> done
+
+    # -------- buffer handling --------
+    def _fill(self):
+        """Read one more chunk into the buffer; False when the stream is exhausted."""
+        if self._exhausted:
+            return False
+        if self._pos > _COMPACT_AT:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        for chunk in self._chunks:
+            if chunk:
+                self.bytes_read += len(chunk)
+                self._buf += self._decoder.decode(chunk)
+                return True
+        self._buf += self._decoder.decode(b"", final=True)
+        self._exhausted = True
+        return False
+
+    def _peek(self):
+        """Next non-whitespace character (not consumed), or "" at end of input."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, chars):
+        c = self._peek()
+        if c == "" or c not in chars:
+            raise ValueError(f"Malformed JSON stream: expected one of {chars!r}, got {c!r} at char {self._pos}")
+        self._pos += 1
+        return c
+
+    def _value(self):
+        """Decode one complete JSON value at the current position."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buf, self._pos)
+                # A number cut by a chunk boundary ("12" of "12.5e3") still decodes, so only
+                # accept one once the character after it is known not to continue it
+                complete = (not isinstance(value, (int, float)) or isinstance(value, bool)
+                            or (end < len(self._buf) and self._buf[end] not in _NUMBER_CHARS))
+                if complete or self._exhausted:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._exhausted:
+                    raise
+            self._fill()
+
+    # -------- object walking --------
+    def _next_member(self):
+        """Read members until the target array starts (True) or the object ends (False)."""
+        if self._state == "start":
+            self._expect("{")
+            self._state = "members"
+            if self._peek() == "}":
+                self._pos += 1
+                self._state = "done"
+                return False
+        elif self._state == "after_array":
+            if self._expect(",}") == "}":
+                self._state = "done"
+                return False
+        while True:
+            name = self._value()
+            self._expect(":")
+            if name == self.key and self._peek() == "[":
+                self._pos += 1
+                self._state = "array"
+                return True
+            self.meta[name] = self._value()
+            if self._expect(",}") == "}":
+                self._state = "done"
+                return False
+
+    def read_meta(self):
+        """Parse everything before the array (e.g. recordsTotal) and return meta."""
+        if self._state in ("start", "after_array"):
+            self._next_member()
+        return self.meta
+
+    def __iter__(self):
+        while self._state != "done":
+            if self._state != "array" and not self._next_member():
+                break
+            if self._peek() == "]":
+                self._pos += 1
+            else:
+                while True:
+                    yield self._value()
+                    if self._expect(",]") == "]":
+                        break
+            self._state = "after_array"
+        # make sure trailing members (if any) end up in meta
+        while self._state != "done":
+            self._next_member()
+
+    def batches(self, size=1000):
+        """Items grouped into lists of at most `size`."""
+        batch = []
+        for item in self:
+            batch.append(item)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
@@ -1,45 +1,179 @@
+"""
+One scrape-compare-publish run. Settings come from a named profile
+(profiles.py), an optional JSON config file and --set overrides.
+
+    python src/main.py                                  # incremental profile
+    python src/main.py --profile fast --set page_size=30000 delay=2
+    python src/main.py --config my_settings.json
+    python src/main.py --dry                            # replay the last scrape's rows offline, time the stages
+    python src/main.py --show                           # print the resolved settings and exit
+"""
+import argparse
+import json
+import os
 from scrape import scrape_all
 from datetime import datetime
 from styles import apply_styles
-import json
-from compare import create_certs_added, create_certs_removed, create_certs_changed
+from compare import create_certs_added, create_certs_removed, create_certs_changed, DEFAULT_IGNORE_COLS
+from profiling import start_run, span
+from atomic import (atomic_write_json, partial_path, commit_outputs, discard_outputs, load_pointer,
+                    write_manifest, validate_manifest)
+from batch_compare import find_snapshots
+from changelog import append_changes, CHANGE_LOG_DIR
+from cubes import refresh_cubes, CUBE_DIR
+from expiry import add_expiry_sheet, feed_path, EXPIRY_DAYS
+from ratelimit import LIMITER
+from matchstate import write_coverage, coverage_path, MATCH_STATE_FILE
+from profiles import (DEFAULTS, PROFILES, load_settings, parse_overrides, apply_settings, dry_settings,
+                      seed_dry_folder, describe)
+
+# Scrape configuration (defaults of the profiles, see profiles.py)
+DELAY = DEFAULTS["delay"]
+ROWS_LOADED = DEFAULTS["page_size"]  # initial page size, adapted per page from latency/payload (see paging.py)
+
+# Stage to run under cProfile (e.g. "parse_rows", "match_assets"), None to disable
+PROFILE_STAGE = DEFAULTS["profile_stage"]
+
+# Remembers the previous run's workbook for the comparisons
+UTILS_FILE = DEFAULTS["utils_file"]
+
+
+def output_paths(now=None, out_dir="out"):
+    """(workbook, run report) paths for a run started at now."""
+    timestamp = (now or datetime.now()).strftime("%d.%m.%Y_%H.%M")
+    return f"{out_dir}/ISCC_Certificates_{timestamp}.xlsx", f"{out_dir}/run_report_{timestamp}.json"
+
+
+def trusted_previous(prev_filename, deep=False):
+    """
+    The previous run to compare against: prev_filename if its manifest checks
+    out, else the newest earlier run in the same folder that does (None if none).
+    """
+    if not prev_filename:
+        return None
+    problems = validate_manifest(prev_filename, deep)
+    if not problems:
+        return prev_filename
+    print(f"Not comparing against {prev_filename}: {'; '.join(problems)}")
+    runs = [path for _, path in find_snapshots(os.path.dirname(prev_filename) or ".")]
+    earlier = runs[:runs.index(prev_filename)] if prev_filename in runs else runs
+    for path in reversed(earlier):
+        if not validate_manifest(path, deep):
+            print(f"Comparing against {path} instead")
+            return path
+    print("No intact earlier run found, skipping the comparison")
+    return None
 
-# Scrape configuration
-DELAY = 5
-ROWS_LOADED = 20000
 
-now = datetime.now()
-timestamp = now.strftime("%d.%m.%Y_%H.%M")
-filename = f"ISCC_Certificates_{timestamp}.xlsx"
-output_file = f"out/{filename}"
+def run_once(output_file, report_file, delay=DELAY, page_size=ROWS_LOADED,
+             profile_stage=PROFILE_STAGE, utils_file=UTILS_FILE, change_log_dir=CHANGE_LOG_DIR,
+             cube_dir=CUBE_DIR, expiry_days=EXPIRY_DAYS, ignore_cols=DEFAULT_IGNORE_COLS, stream=True,
+             incremental_matching=True, match_state_file=MATCH_STATE_FILE, raw_cache=DEFAULTS["raw_cache"],
+             verify_deep=False, dry=False, scrape_options=None) -> dict:
+    """
+    One full run: scrape, style, compare against the previous workbook, then
+    publish. Everything is written under partial names and only moved into
+    place (and the previous-file pointer updated) once the run has succeeded,
+    so a crash never leaves a half-written workbook or a stale pointer.
+    Cell-level changes are appended to the change log (changelog.py) and the
+    dashboard cubes (cubes.py) are moved forward by the same diff. The
+    certificates expiring within expiry_days get their own sheet and JSON feed,
+    and the Golden Source coverage report is refreshed (matchstate.py).
+    dry replays the cached rows of the last scrape instead of fetching (see
+    profiles.py for the folders a dry run uses). scrape_options are passed on
+    to scrape_all (GST inputs, matching, streaming; see profiles.SCRAPE_OPTIONS).
+    Each run gets a manifest (atomic.write_manifest); the previous run is only
+    compared against if its manifest validates (verify_deep adds the sha256 check).
+    Returns a summary of the run.
+    """
+    report = start_run(profile_stage=profile_stage)
+    report.info.update({"output_file": output_file, "delay": delay, "page_size": page_size, "dry": dry})
+    LIMITER.reset_stats()
+    working_file = partial_path(output_file)
+    summary = {"started": report.started.isoformat(timespec="seconds"), "output_file": output_file,
+               "report_file": report_file}
+
+    try:
+        summary["rows"] = scrape_all(delay=delay, page_size=page_size, output_file=working_file, stream=stream,
+                                     incremental=incremental_matching, match_state_file=match_state_file,
+                                     raw_cache=raw_cache, replay=dry, **(scrape_options or {}))
+        apply_styles(working_file, "Certificate Database")
+
+        with span("validate_previous"):
+            prev_filename = trusted_previous(load_pointer(utils_file).get("prev_file_name"), deep=verify_deep)
+        report.info["prev_file_name"] = prev_filename
+        summary["prev_file_name"] = prev_filename
+
+        added_df = removed_df = changed_df = None
+        if prev_filename:
+            added_df = create_certs_added(prev_filename, working_file)
+            summary["added"] = len(added_df)
+            print()
+            removed_df = create_certs_removed(prev_filename, working_file)
+            summary["removed"] = len(removed_df)
+            print()
+            changed_df, changes = create_certs_changed(prev_filename, working_file, ignore_cols=ignore_cols,
+                                                       changes_sheet="Change Details", return_changes=True)
+            summary["changed"] = len(changed_df)
+            print()
+
+            apply_styles(working_file, "Certificates Added")
+            apply_styles(working_file, "Certificates Removed")
+            apply_styles(working_file, "Certificates Changed")
+
+        feed = add_expiry_sheet(working_file, days=expiry_days, as_of=report.started)
+        apply_styles(working_file, "Expiring Soon")
+        summary["expiring"] = feed["total"]
+
+        with span("manifest"):
+            write_manifest(working_file, output_file, rows=summary["rows"])
+        commit_outputs(working_file, output_file)
+        if prev_filename:
+            summary["changes_logged"] = append_changes(changes, report.started, log_dir=change_log_dir,
+                                                         source=output_file)
+        with span("cubes"):
+            summary["cubes"] = refresh_cubes(output_file, prev_filename, added_df, removed_df, changed_df,
+                                             run_at=report.started, cube_dir=cube_dir)
+        atomic_write_json(feed_path(output_file), {**feed, "source": output_file})
+        with span("coverage"):
+            summary["coverage"] = write_coverage(coverage_path(output_file), match_state_file)
+        atomic_write_json(utils_file, {"prev_file_name": f"{output_file}"})
+        summary["status"] = "ok"
+    except Exception:
+        discard_outputs(working_file)
+        raise
+    finally:
+        # Written even when the run fails, so the slow/failing stage is visible
+        report.info["rate_limit"] = LIMITER.stats()
+        summary["throttled_seconds"] = report.info["rate_limit"]["throttled_seconds"]
+        report.write(report_file)
+    return summary
+
+
+def run_with_settings(settings: dict, dry=False) -> dict:
+    """run_once with resolved profile settings (profiles.load_settings)."""
+    if dry:
+        real, settings = settings, dry_settings(settings)
+        seed_dry_folder(real, settings)
+    kwargs = apply_settings(settings)
+    print(f"Running with {describe(settings)}{' (dry run)' if dry else ''}")
+    output_file, report_file = output_paths(out_dir=settings["out_dir"])
+    summary = run_once(output_file, report_file, dry=dry, **kwargs)
+    summary["profile"] = settings["profile"]
+    return summary
 
 
 if __name__ == "__main__":
-    scrape_all(delay=DELAY, page_size=ROWS_LOADED, output_file=output_file)
-    apply_styles(output_file, "Certificate Database")
-
-    try: 
-        with open("src/utils.json", "r") as f1: 
-            data = json.load(f1)
-    except json.JSONDecodeError:
-        print(f"{f1.name} is empty")
-
-    prev_filename = data.get("prev_file_name")
-    
-    if prev_filename:
-        create_certs_added(prev_filename, output_file)
-        print()
-        create_certs_removed(prev_filename, output_file)
-        print()
-        create_certs_changed(prev_filename, output_file, ignore_cols=["Map", "Company_Name", "City"])
-        print()
-
-        apply_styles(output_file, "Certificates Added")
-        apply_styles(output_file, "Certificates Removed")
-        apply_styles(output_file, "Certificates Changed")
-
-    try: 
-        with open("src/utils.json", "w") as f2:
-            json.dump({"prev_file_name": f"{output_file}"}, f2)
-    except json.JSONDecodeError:
-        print(f"{f2.name} is empty")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=sorted(PROFILES), help="named settings (default: incremental)")
+    parser.add_argument("--config", help="JSON file of settings (may name its profile)")
+    parser.add_argument("--set", nargs="+", default=[], metavar="KEY=VALUE", help="override single settings")
+    parser.add_argument("--dry", action="store_true", help="offline run on the cached rows and asset index")
+    parser.add_argument("--show", action="store_true", help="print the resolved settings and exit")
+    args = parser.parse_args()
+
+    settings = load_settings(args.profile, args.config, parse_overrides(args.set))
+    if args.show:
+        print(json.dumps(dry_settings(settings) if args.dry else settings, indent=2, default=str))
+    else:
+        run_with_settings(settings, dry=args.dry)
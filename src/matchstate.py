@@ -0,0 +1,264 @@
+"""
+Per-certificate match state, so a run only re-matches what changed.
+
+The company resolution (GST short name) and the Golden Source asset match
+(Match_Found) of every certificate are kept in out/match_state.pkl, together
+with the inputs they came from and their evidence: the best GST company key /
+asset and its score. The next run copies a certificate's result from the state
+unless its company name or city changed, or the GST change could alter it:
+
+  - company: its matched key was removed or now maps to another short name,
+    or an added key scores at least as well as the stored match;
+  - asset: its closest GST asset was removed, an added asset scores at
+    least as well as that one, or it shared no token with the old universe
+    (it was matched against every asset).
+
+Those rules give the same result as matching everything again. The coverage
+report (asset_coverage.xlsx, next to the run workbooks) lists matched and
+unmatched GST assets and certificates.
+
+    python src/matchstate.py out/asset_coverage.xlsx      # report from the current state
+"""
+import argparse
+import os
+import pickle
+
+import pandas as pd
+from thefuzz import fuzz, process
+
+from resolve import INDEX_VERSION, normalize_name, company_key
+from profiling import span
+
+MATCH_STATE_FILE = "out/match_state.pkl"
+COVERAGE_FILE = "asset_coverage.xlsx"
+COMPANY_THRESHOLD = 51
+ASSET_THRESHOLD = 80
+
+# Bump whenever the stored layout or the matching rules change
+STATE_VERSION = 1
+
+STATE_COLUMNS = ["Company_Raw", "City", "Company_Name", "Company_Key", "Company_Score",
+                 "Asset_Identifier", "Match_Found", "Matched_Asset", "Asset_Score"]
+# Certificate_IDs listed per asset in the coverage report
+MAX_IDS_PER_ASSET = 20
+
+
+def _same(a, b):
+    return a == b or (pd.isna(a) and pd.isna(b))
+
+
+def _tokens(asset_ids):
+    return {tok for aid in asset_ids for tok in aid.split()}
+
+
+def load_state(path=MATCH_STATE_FILE):
+    """The stored state dict, or None if missing/outdated."""
+    try:
+        with open(path, "rb") as f:
+            version, state = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+        return None
+    if version != STATE_VERSION or state.get("index_version") != INDEX_VERSION:
+        return None
+    return state
+
+
+class MatchState:
+    """
+    Incremental replacement for overwrite_company_with_gst_shortname_exact +
+    add_asset_identifier_and_match: match() each enriched batch, then save().
+    """
+
+    def __init__(self, asset_index, path=MATCH_STATE_FILE, company_threshold=COMPANY_THRESHOLD,
+                 asset_threshold=ASSET_THRESHOLD, fuzzy=True, fresh=False):
+        self.index = asset_index
+        self.path = path
+        self.settings = (company_threshold, asset_threshold, fuzzy)
+        self.stats = {"certificates": 0, "reused": 0, "rematched": 0}
+        self._seen = []
+
+        # fresh: match everything again (the state is still saved for the next run)
+        state = None if fresh else load_state(path)
+        if state is not None and tuple(state.get("settings", ())) != self.settings:
+            state = None
+        self.previous = None if state is None else state["certs"]
+        if state is None:
+            return
+
+        # What changed in the Golden Source since the state was saved
+        old_exact, old_assets = state["exact"], set(state["asset_ids"])
+        exact = asset_index.exact
+        self.stale_keys = {k for k, v in old_exact.items() if k not in exact or not _same(exact[k], v)}
+        self.added_keys = sorted(set(exact) - set(old_exact))
+        self.added_assets = sorted(asset_index.asset_set - old_assets)
+        self.removed_assets = old_assets - asset_index.asset_set
+        self.old_tokens = _tokens(old_assets)
+        self.gst_changed = bool(self.stale_keys or self.added_keys or self.added_assets or self.removed_assets)
+        if self.gst_changed:
+            print(f"Golden Source changed: {len(self.added_keys)} company keys added, "
+                  f"{len(self.stale_keys)} removed/edited; {len(self.added_assets)} asset identifiers added, "
+                  f"{len(self.removed_assets)} removed")
+
+    def _company_affected(self, prev: pd.DataFrame) -> pd.Series:
+        affected = prev["Company_Key"].isin(self.stale_keys)
+        if self.added_keys:
+            # Exact hits cannot be beaten; fuzzy ones can by a new key scoring as well
+            fuzzy = prev.loc[~affected & (prev["Company_Score"] < 100), ["Company_Raw", "Company_Score"]]
+            best = {}
+            for name in fuzzy["Company_Raw"].unique():
+                key = company_key(name)
+                best[name] = process.extractOne(key, self.added_keys, scorer=fuzz.ratio, processor=None)[1] \
+                    if key else -1
+            beaten = fuzzy["Company_Raw"].map(best) >= fuzzy["Company_Score"]
+            affected |= beaten.reindex(prev.index, fill_value=False)
+        return affected
+
+    def _asset_affected(self, prev: pd.DataFrame) -> pd.Series:
+        norms = prev["Asset_Identifier"].map(normalize_name)
+        affected = prev["Matched_Asset"].isin(self.removed_assets)
+        # Matched against every asset (no token in common with the old universe)
+        affected |= norms.map(lambda norm: bool(norm) and not set(norm.split()) & self.old_tokens)
+        if self.added_assets:
+            best = {}
+            for norm in norms[~affected].unique():
+                best[norm] = process.extractOne(norm, self.added_assets, scorer=fuzz.token_set_ratio,
+                                                processor=None)[1] if norm else -1
+            affected |= norms.map(best).fillna(-1) >= prev["Asset_Score"].astype(float)
+        return affected.astype(bool)
+
+    def _reusable(self, ids, raw, cities) -> tuple:
+        """(mask of rows whose stored result still holds, the stored rows aligned to ids)"""
+        if self.previous is None:
+            return pd.Series(False, index=range(len(ids))), None
+        prev = self.previous.reindex(ids).reset_index(drop=True)
+        same = (prev["Company_Raw"] == pd.Series(raw)) & (prev["City"] == pd.Series(cities))
+        if self.gst_changed and same.any():
+            candidates = prev[same]
+            ok = ~(self._company_affected(candidates) | self._asset_affected(candidates))
+            same &= ok.reindex(prev.index, fill_value=False)
+        return same, prev
+
+    def match(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Set Company_Name, Asset_Identifier and Match_Found on an enriched batch."""
+        ids = df["Certificate_ID"].astype(str).tolist()
+        raw = df["Company_Name"].astype(str).tolist()
+        cities = df["City"].astype(str).tolist()
+        reuse, prev = self._reusable(ids, raw, cities)
+
+        state = pd.DataFrame({"Company_Raw": raw, "City": cities}, index=pd.Index(ids, name="Certificate_ID"))
+        columns = STATE_COLUMNS[2:]
+        todo = [i for i, ok in enumerate(reuse) if not ok]
+        results = pd.DataFrame(index=range(len(ids)), columns=columns)
+        if prev is not None:
+            results.loc[reuse.to_numpy(), columns] = prev.loc[reuse, columns]
+        if todo:
+            with span("match_assets", rows=len(todo)):
+                names = [raw[i] for i in todo]
+                company_threshold, asset_threshold, fuzzy = self.settings
+                companies = self.index.company_matches(names, score_threshold=company_threshold, fuzzy=fuzzy)
+                resolved = [short if short is not None else name for (short, _, _), name in zip(companies, names)]
+                identifiers = [f"{str(c).strip()} {cities[i].strip()}".strip() for c, i in zip(resolved, todo)]
+                assets = self.index.asset_matches(identifiers, fuzzy_threshold=asset_threshold, fuzzy=fuzzy)
+                results.loc[todo, columns] = [
+                    [name, key, score, identifier, found, asset, asset_score]
+                    for name, (_, key, score), identifier, (found, asset, asset_score)
+                    in zip(resolved, companies, identifiers, assets)
+                ]
+        for col in columns:
+            state[col] = results[col].to_numpy()
+        self._seen.append(state)
+        self.stats["certificates"] += len(ids)
+        self.stats["rematched"] += len(todo)
+        self.stats["reused"] += len(ids) - len(todo)
+
+        df["Company_Name"] = results["Company_Name"].to_numpy()
+        df["Asset_Identifier"] = results["Asset_Identifier"].to_numpy()
+        df["Match_Found"] = results["Match_Found"].astype(int).to_numpy()
+        return df
+
+    def save(self, prune=True):
+        """
+        Store the state of every certificate matched this run. With prune=False
+        certificates not seen this run are kept (partial/filtered scrapes).
+        """
+        frames = self._seen if prune or self.previous is None else [self.previous, *self._seen]
+        certs = pd.concat(frames) if frames else pd.DataFrame(columns=STATE_COLUMNS)
+        certs = certs[~certs.index.duplicated(keep="last")]
+        state = {
+            "index_version": INDEX_VERSION,
+            "settings": self.settings,
+            "exact": dict(self.index.exact),
+            "asset_ids": list(self.index.asset_ids),
+            "certs": certs,
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump((STATE_VERSION, state), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+        print(f"Matching: {self.stats['rematched']} certificates matched afresh, {self.stats['reused']} reused from {self.path}")
+        return self.stats
+
+
+def coverage_report(state_path=MATCH_STATE_FILE) -> dict:
+    """Summary, Assets and Certificates frames of the coverage report, from the stored state."""
+    state = load_state(state_path)
+    if state is None:
+        raise FileNotFoundError(f"No match state at {state_path} (run a scrape first)")
+    certs = state["certs"].reset_index()
+    certs["Match_Found"] = certs["Match_Found"].astype(int)
+    matched = certs[certs["Match_Found"] == 1]
+
+    by_asset = matched.groupby("Matched_Asset")["Certificate_ID"]
+    assets = pd.DataFrame({"Asset": state["asset_ids"]})
+    assets["Certificates"] = assets["Asset"].map(by_asset.size()).fillna(0).astype(int)
+    assets["Matched"] = (assets["Certificates"] > 0).astype(int)
+    assets["Certificate_IDs"] = assets["Asset"].map(
+        by_asset.agg(lambda ids: ", ".join(sorted(ids)[:MAX_IDS_PER_ASSET]))).fillna("")
+    assets = assets.sort_values(["Matched", "Certificates", "Asset"], ascending=[True, False, True])
+
+    certificates = certs[["Certificate_ID", "Company_Raw", "Company_Name", "City", "Asset_Identifier",
+                          "Match_Found", "Matched_Asset", "Asset_Score"]]
+    certificates = certificates.rename(columns={"Matched_Asset": "Closest_Asset"})
+    certificates = certificates.sort_values(["Match_Found", "Certificate_ID"])
+
+    n_assets, n_certs = len(assets), len(certs)
+    summary = {
+        "assets": n_assets,
+        "assets_matched": int(assets["Matched"].sum()),
+        "certificates": n_certs,
+        "certificates_matched": len(matched),
+    }
+    summary["asset_coverage"] = round(summary["assets_matched"] / n_assets, 4) if n_assets else 0.0
+    summary["certificate_coverage"] = round(len(matched) / n_certs, 4) if n_certs else 0.0
+    return {"summary": summary, "Assets": assets, "Certificates": certificates}
+
+
+def write_coverage(xlsx_path, state_path=MATCH_STATE_FILE) -> dict:
+    """Write the coverage report workbook (via a temp file); returns its summary."""
+    report = coverage_report(state_path)
+    summary = pd.DataFrame(list(report["summary"].items()), columns=["Metric", "Value"])
+    os.makedirs(os.path.dirname(str(xlsx_path)) or ".", exist_ok=True)
+    tmp = f"{xlsx_path}.tmp.xlsx"
+    with pd.ExcelWriter(tmp, engine="openpyxl") as writer:
+        summary.to_excel(writer, sheet_name="Summary", index=False)
+        report["Assets"].to_excel(writer, sheet_name="Assets", index=False)
+        report["Certificates"].to_excel(writer, sheet_name="Certificates", index=False)
+    os.replace(tmp, xlsx_path)
+    s = report["summary"]
+    print(f"Asset coverage: {s['assets_matched']}/{s['assets']} GST assets, "
+          f"{s['certificates_matched']}/{s['certificates']} certificates matched")
+    return s
+
+
+def coverage_path(xlsx_path) -> str:
+    """The coverage report lives next to the run workbooks."""
+    return os.path.join(os.path.dirname(str(xlsx_path)) or ".", COVERAGE_FILE)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", nargs="?", default=os.path.join("out", COVERAGE_FILE))
+    parser.add_argument("--state", default=MATCH_STATE_FILE)
+    args = parser.parse_args()
+    write_coverage(args.output, args.state)
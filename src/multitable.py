@@ -0,0 +1,136 @@
+"""
+Scrape several ISCC wpDataTables listings (see tables.py) concurrently into one
+dataset: one thread per table and one shared connection pool (scrape.SESSION)
+drawing from the politeness budget (ratelimit.LIMITER). Each table's loop waits
+the page delay times the number of loops running, so pages go out about once
+per delay over all tables and adding tables does not multiply the load.
+Batches are enriched and written as they arrive (scrape.iter_enriched and
+sinks.write_outputs, with the row hash spec and incremental matching of
+scrape_all) and tagged with the listing they came from (Source column). The
+workbook is written under a partial name with a manifest and moved into place
+like a main.py run.
+
+    python src/multitable.py --tables eu
+    python src/multitable.py --tables-file src/tables.json --tables eu corsia plus -o out/all_listings.xlsx
+"""
+import argparse
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from atomic import partial_path, write_manifest, commit_outputs, discard_outputs
+from matchstate import MatchState
+from scrape import iter_row_batches, iter_enriched, default_table, _load_asset_index
+from sinks import write_outputs
+from tables import TABLES, get_table, load_tables
+
+SOURCE_COL = "Source"
+# Separate from main.py's state: the listings hold other certificates
+MATCH_STATE_FILE = "out/match_state_listings.pkl"
+
+_DONE = object()
+
+
+def resolve_table(name):
+    """Registered table by name; "eu" follows scrape.BASE_URL / MAIN_PAGE like scrape_all does."""
+    return default_table() if name == "eu" else get_table(name)
+
+
+def iter_table_batches(tables, page_size=20000, delay=5, max_workers=4):
+    """
+    (table name, parsed rows in COLUMNS order) as the pages of all tables arrive,
+    fetched in parallel. A fetch error is raised here once it happens.
+    """
+    workers = max(1, min(max_workers, len(tables)))
+    # delay between two pages of all tables together: each loop waits its share
+    pace = delay * workers
+    batches = queue.Queue(maxsize=workers * 2)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def fetch(table):
+        try:
+            for rows in iter_row_batches(page_size, pace, table=table):
+                if stop.is_set():
+                    return
+                put((table.name, table.to_canonical(rows)))
+        except Exception as e:
+            put((table.name, e))
+        finally:
+            put((table.name, _DONE))
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for table in tables:
+            pool.submit(fetch, table)
+        remaining = len(tables)
+        while remaining:
+            name, rows = batches.get()
+            if rows is _DONE:
+                remaining -= 1
+            elif isinstance(rows, Exception):
+                raise rows
+            else:
+                yield name, rows
+    finally:
+        stop.set()
+        pool.shutdown(wait=True)
+
+
+def scrape_tables(output_file, names=("eu",), page_size=20000, delay=5, max_workers=4, incremental=True,
+                  match_state_file=MATCH_STATE_FILE) -> int:
+    """
+    Multi-table counterpart of scrape_all: same enrichment and output schema, plus
+    SOURCE_COL. Returns the number of certificates written.
+    """
+    tables = [resolve_table(name) for name in names]
+    asset_index = _load_asset_index()
+    match_state = MatchState(asset_index, match_state_file, fresh=not incremental)
+    counts = {name: 0 for name in names}
+
+    def frames():
+        for name, rows in iter_table_batches(tables, page_size, delay, max_workers):
+            counts[name] += len(rows)
+            for df in iter_enriched([rows], asset_index, match_state):
+                yield df.assign(**{SOURCE_COL: name})
+
+    working_file = partial_path(output_file)
+    try:
+        total = write_outputs(frames(), working_file)
+        for name, n in counts.items():
+            print(f"{name}: {n} certificates")
+        if not total:
+            raise ValueError(f"No certificates returned by {', '.join(names)}")
+        write_manifest(working_file, output_file, rows=total)
+        commit_outputs(working_file, output_file)
+    except Exception:
+        discard_outputs(working_file)
+        raise
+    match_state.save()
+    print(f"Scraping complete! Saved {total} rows to {output_file}")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", nargs="+", default=["eu"], help="registered table names")
+    parser.add_argument("--tables-file", help="JSON file with more table descriptors (see tables.py)")
+    parser.add_argument("--page-size", type=int, default=20000)
+    parser.add_argument("--delay", type=float, default=5, help="seconds between pages, across all tables")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("-o", "--output", help="output workbook (default: out/ISCC_Listings_<timestamp>.xlsx)")
+    args = parser.parse_args()
+
+    if args.tables_file:
+        load_tables(args.tables_file)
+    print(f"Known tables: {', '.join(TABLES)}")
+    output = args.output or f"out/ISCC_Listings_{datetime.now().strftime('%d.%m.%Y_%H.%M')}.xlsx"
+    scrape_tables(output, args.tables, args.page_size, args.delay, args.workers)
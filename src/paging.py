@@ -0,0 +1,67 @@
+class AdaptivePager:
+    """
+    Chooses the `length` of each fetch_page call from what the previous pages cost.
+
+    After every page the response time and payload size are compared with the
+    targets: cheap pages grow the next request (x grow), slow or huge pages
+    shrink it (x shrink), always within [min_size, max_size]. Errors shrink the
+    page and add an exponential back-off before the retry. Every decision is
+    kept in `schedule` for the run report.
+    """
+
+    def __init__(self, initial=20000, min_size=1000, max_size=50000,
+                 target_seconds=15.0, max_bytes=60_000_000, timeout=120,
+                 grow=1.5, shrink=0.5, max_retries=4, backoff=5.0):
+        self.size = max(min_size, min(initial, max_size))
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.grow = grow
+        self.shrink = shrink
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.failures = 0
+        self.schedule = []
+
+    @classmethod
+    def fixed(cls, size, **kwargs):
+        """A pager that never changes the page size (the old fixed-size behaviour)."""
+        return cls(initial=size, min_size=size, max_size=size, **kwargs)
+
+    def _resize(self, factor):
+        self.size = int(max(self.min_size, min(self.max_size, self.size * factor)))
+
+    def record_page(self, start, rows, seconds, nbytes):
+        """Register a successful page and pick the next size."""
+        length = self.size
+        self.failures = 0
+        if seconds > self.target_seconds or nbytes > self.max_bytes:
+            action = "shrink"
+            self._resize(self.shrink)
+        elif seconds < self.target_seconds / 2 and nbytes < self.max_bytes / 2:
+            action = "grow"
+            self._resize(self.grow)
+        else:
+            action = "keep"
+        self.schedule.append({
+            "start": start, "length": length, "rows": rows, "seconds": round(seconds, 3),
+            "bytes": nbytes, "action": action, "next_length": self.size,
+        })
+
+    def record_error(self, start, error):
+        """
+        Register a failed page. Returns the back-off to sleep before retrying,
+        or None when the retry budget is used up.
+        """
+        length = self.size
+        self.failures += 1
+        self._resize(self.shrink)
+        give_up = self.failures > self.max_retries
+        wait = None if give_up else self.backoff * 2 ** (self.failures - 1)
+        self.schedule.append({
+            "start": start, "length": length, "error": f"{type(error).__name__}: {error}",
+            "action": "give_up" if give_up else "backoff", "wait": wait, "next_length": self.size,
+        })
+        return wait
@@ -0,0 +1,150 @@
+"""
+Runtime settings for main.py: named profiles, JSON config files and
+command-line overrides instead of editing constants in the code.
+
+Every knob has a default in DEFAULTS (the values the modules ship with). A
+profile overrides some of them; a config file (a JSON object of settings,
+optionally naming its "profile") and --set key=value override the profile.
+
+    fast         bigger pages, shorter delay, faster request budget, exact matching only
+    full         match every certificate again (ignores the stored match state),
+                 hash-check the previous run's files
+    incremental  the default: re-match only new/changed certificates
+
+A dry run replays the rows cached by the last scrape (scrape.RAW_CACHE_FILE)
+with the cached GST asset index, so every stage after the fetch can be timed
+offline. It writes under <out_dir>/dry and never touches the real outputs.
+"""
+import json
+import os
+import shutil
+
+import scrape
+from changelog import CHANGE_LOG_DIR
+from compare import DEFAULT_IGNORE_COLS
+from cubes import CUBE_DIR
+from expiry import EXPIRY_DAYS
+from matchstate import MATCH_STATE_FILE
+from ratelimit import LIMITER, REQUESTS_PER_SECOND, BURST, MAX_CONCURRENCY
+
+DEFAULTS = {
+    # Output locations
+    "out_dir": "out",
+    "utils_file": "src/utils.json",
+    "change_log_dir": CHANGE_LOG_DIR,
+    "cube_dir": CUBE_DIR,
+    "match_state_file": MATCH_STATE_FILE,
+    "raw_cache": scrape.RAW_CACHE_FILE,
+    # Fetching
+    "delay": 5,
+    "page_size": 20000,
+    "stream": True,
+    "stream_batch_rows": scrape.STREAM_BATCH_ROWS,
+    "schema_probe": scrape.SCHEMA_PROBE,
+    "requests_per_second": REQUESTS_PER_SECOND,
+    "burst": BURST,
+    "max_concurrency": MAX_CONCURRENCY,
+    # Golden Source inputs and matching
+    "gst_assets_path": scrape.GST_ASSETS_PATH,
+    "gst_assets_sheet": scrape.GST_ASSETS_SHEET,
+    "gst_geo_path": scrape.GST_GEO_PATH,
+    "gst_geo_sheet": scrape.GST_GEO_SHEET,
+    "asset_index_cache": scrape.ASSET_INDEX_CACHE,
+    "fuzzy_matching": scrape.FUZZY_MATCHING,
+    "company_threshold": scrape.COMPANY_THRESHOLD,
+    "asset_threshold": scrape.ASSET_THRESHOLD,
+    "incremental_matching": True,
+    # Comparison and reports
+    "ignore_cols": list(DEFAULT_IGNORE_COLS),
+    "expiry_days": EXPIRY_DAYS,
+    "profile_stage": None,
+    # Check the previous run's files against the sha256 in its manifest, not just sizes and footer
+    "verify_deep": False,
+}
+
+PROFILES = {
+    "incremental": {},
+    "full": {"incremental_matching": False, "verify_deep": True},
+    "fast": {"page_size": 50000, "delay": 1, "requests_per_second": 4.0, "burst": 8, "fuzzy_matching": False},
+}
+DEFAULT_PROFILE = "incremental"
+
+# Settings passed to scrape.scrape_all (as run_once's scrape_options), same names
+SCRAPE_OPTIONS = ["stream_batch_rows", "schema_probe", "gst_assets_path", "gst_assets_sheet", "gst_geo_path",
+                  "gst_geo_sheet", "asset_index_cache", "fuzzy_matching", "company_threshold", "asset_threshold"]
+
+# Settings that are passed to main.run_once
+RUN_SETTINGS = ["delay", "page_size", "stream", "utils_file", "change_log_dir", "cube_dir", "match_state_file",
+                "raw_cache", "incremental_matching", "ignore_cols", "expiry_days", "profile_stage", "verify_deep"]
+
+DRY_DIR = "dry"
+
+
+def parse_overrides(pairs) -> dict:
+    """["page_size=5000", "fuzzy_matching=false"] -> settings; values are JSON where they parse as JSON."""
+    overrides = {}
+    for pair in pairs or ():
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise ValueError(f"Expected key=value, got '{pair}'")
+        try:
+            overrides[key.strip()] = json.loads(value)
+        except json.JSONDecodeError:
+            overrides[key.strip()] = value
+    return overrides
+
+
+def load_settings(profile=None, config_file=None, overrides=None) -> dict:
+    """DEFAULTS, then the profile, then the config file, then the overrides."""
+    config = {}
+    if config_file:
+        with open(config_file, encoding="utf-8") as f:
+            config = json.load(f)
+    name = profile or config.pop("profile", None) or DEFAULT_PROFILE
+    config.pop("profile", None)
+    if name not in PROFILES:
+        raise KeyError(f"Unknown profile '{name}' (known: {', '.join(PROFILES)})")
+
+    settings = {**DEFAULTS, **PROFILES[name], **config, **(overrides or {})}
+    unknown = set(settings) - set(DEFAULTS)
+    if unknown:
+        raise KeyError(f"Unknown setting(s): {sorted(unknown)} (known: {', '.join(DEFAULTS)})")
+    settings["profile"] = name
+    return settings
+
+
+def dry_settings(settings: dict) -> dict:
+    """The same settings with every output pointed at <out_dir>/dry."""
+    dry_dir = os.path.join(settings["out_dir"], DRY_DIR)
+    return {
+        **settings,
+        "out_dir": dry_dir,
+        "utils_file": os.path.join(dry_dir, "utils.json"),
+        "change_log_dir": os.path.join(dry_dir, "change_log"),
+        "cube_dir": os.path.join(dry_dir, "cubes"),
+        "match_state_file": os.path.join(dry_dir, os.path.basename(settings["match_state_file"])),
+    }
+
+
+def seed_dry_folder(settings: dict, dry: dict):
+    """
+    Start the dry folder from the real previous-run pointer and match state, so
+    compare and matching do the work a real run would.
+    """
+    os.makedirs(dry["out_dir"], exist_ok=True)
+    for key in ("utils_file", "match_state_file"):
+        if not os.path.exists(dry[key]) and os.path.exists(settings[key]):
+            shutil.copyfile(settings[key], dry[key])
+
+
+def apply_settings(settings: dict) -> dict:
+    """Set the shared request budget (ratelimit.LIMITER); returns the run_once kwargs."""
+    LIMITER.configure(settings["requests_per_second"], settings["burst"], settings["max_concurrency"])
+    return {**{key: settings[key] for key in RUN_SETTINGS},
+            "scrape_options": {key: settings[key] for key in SCRAPE_OPTIONS}}
+
+
+def describe(settings: dict) -> str:
+    """Settings that differ from DEFAULTS, for the log."""
+    changed = {k: v for k, v in settings.items() if k in DEFAULTS and DEFAULTS[k] != v}
+    return f"profile '{settings['profile']}'" + (f" with {changed}" if changed else "")
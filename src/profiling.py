@@ -0,0 +1,139 @@
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if it can't be read)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KB on Linux, bytes on macOS
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+class RunReport:
+    """
+    Collects timed spans for one pipeline run and writes them as JSON.
+
+    Every span records its stage name, wall time, optional row count, the
+    process peak RSS when it finished and any extra fields passed in.
+    One stage can additionally be run under cProfile (profile_stage).
+    """
+
+    def __init__(self, profile_stage=None):
+        self.started = datetime.now()
+        self.spans = []
+        self.info = {}
+        self.profile_stage = profile_stage
+        self._profiler = cProfile.Profile() if profile_stage else None
+        # Open spans of the profiled stage: only the outermost one turns the profiler on and off
+        self._profile_depth = 0
+        self._profile_lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage, rows=None, **extra):
+        record = {"stage": stage, "rows": rows, **extra}
+        profiling = self._profiler is not None and stage == self.profile_stage
+        if profiling:
+            with self._profile_lock:
+                self._profile_depth += 1
+                if self._profile_depth == 1:
+                    self._profiler.enable()
+        t0 = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record["seconds"] = round(time.perf_counter() - t0, 4)
+            if profiling:
+                with self._profile_lock:
+                    self._profile_depth -= 1
+                    if self._profile_depth == 0:
+                        self._profiler.disable()
+            record["peak_rss_mb"] = peak_rss_mb()
+            self.spans.append(record)
+
+    def summary(self):
+        """Per-stage totals: calls, seconds and rows."""
+        totals = {}
+        for s in self.spans:
+            t = totals.setdefault(s["stage"], {"calls": 0, "seconds": 0.0, "rows": 0})
+            t["calls"] += 1
+            t["seconds"] = round(t["seconds"] + s["seconds"], 4)
+            t["rows"] += s.get("rows") or 0
+        return totals
+
+    def to_dict(self):
+        return {
+            "started": self.started.isoformat(timespec="seconds"),
+            "total_seconds": round((datetime.now() - self.started).total_seconds(), 2),
+            "peak_rss_mb": peak_rss_mb(),
+            "info": self.info,
+            "summary": self.summary(),
+            "spans": self.spans,
+        }
+
+    def write(self, path):
+        """Write the JSON report (and the cProfile dump next to it, if a stage was profiled)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        if self._profiler is not None:
+            prof_path = os.path.splitext(path)[0] + f"_{self.profile_stage}.prof"
+            self._profiler.dump_stats(prof_path)
+            print(f"cProfile of '{self.profile_stage}' saved to {prof_path}")
+        print(f"Run report saved to {path}")
+
+
+# Report for the current run; main.py replaces it with start_run()
+REPORT = RunReport()
+
+
+def start_run(profile_stage=None) -> RunReport:
+    global REPORT
+    REPORT = RunReport(profile_stage=profile_stage)
+    return REPORT
+
+
+def span(stage, rows=None, **extra):
+    """Timed span on the current run report: `with span("parse_rows", rows=len(rows)): ...`"""
+    return REPORT.span(stage, rows=rows, **extra)
+
+
+def add_info(key, value):
+    """Append value to the list stored under key in the current run report's info."""
+    REPORT.info.setdefault(key, []).append(value)
+
+
+def timed(stage, rows=None):
+    """
+    Decorator form of span(). rows, if given, is called with the function's
+    return value to get the row count (e.g. rows=len).
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage) as record:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    record["rows"] = rows(result)
+                return result
+        return wrapper
+    return decorator
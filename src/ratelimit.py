@@ -0,0 +1,202 @@
+"""
+Politeness budget for every request to the ISCC site, configured in one place.
+
+LIMITER is a token bucket (REQUESTS_PER_SECOND, BURST) plus a cap on requests
+in flight (MAX_CONCURRENCY). scrape.SESSION sends everything through a
+ThrottledAdapter bound to it, so nonce fetches, page fetches, retries and
+concurrent table scrapes all draw from the same budget. A 429 (or a 503 with
+Retry-After) pauses the whole bucket for the time the server asks for and the
+request is retried. Time spent waiting is kept in LIMITER.stats() for the run report.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from requests.adapters import HTTPAdapter
+
+REQUESTS_PER_SECOND = 2.0
+BURST = 4
+MAX_CONCURRENCY = 4
+
+# 429 handling: retries per request, wait when there is no Retry-After, longest wait honoured
+MAX_RATE_LIMIT_RETRIES = 5
+DEFAULT_RETRY_AFTER = 30.0
+MAX_RETRY_AFTER = 600.0
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` requests per second on average, bursts of up
+    to `burst`, at most `max_concurrency` requests in flight (None = no cap).
+    rate 0 disables the rate part. pause() stops everyone until a deadline.
+    """
+
+    def __init__(self, rate=REQUESTS_PER_SECOND, burst=BURST, max_concurrency=MAX_CONCURRENCY):
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self.rate, self.burst, self.max_concurrency, self._slots = None, 1, None, None
+        self.configure(rate, burst, max_concurrency or 0)
+        self.reset_stats()
+
+    def configure(self, rate=None, burst=None, max_concurrency=None):
+        """
+        Change the budget (only the values given; 0 lifts that limit). Waiting
+        callers pick up a new rate on their next check.
+        """
+        with self._lock:
+            if rate is not None:
+                self.rate = rate if rate > 0 else None
+            if burst is not None:
+                self.burst = max(1, burst)
+            self._tokens = float(self.burst)
+            self._updated = time.monotonic()
+            if max_concurrency is not None:
+                self.max_concurrency = max_concurrency if max_concurrency > 0 else None
+                self._slots = threading.BoundedSemaphore(self.max_concurrency) if self.max_concurrency else None
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {"requests": 0, "throttled_seconds": 0.0, "rate_limited": 0, "retry_after_seconds": 0.0}
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["throttled_seconds"] = round(stats["throttled_seconds"], 3)
+        stats["retry_after_seconds"] = round(stats["retry_after_seconds"], 3)
+        stats.update({"rate": self.rate, "burst": self.burst, "max_concurrency": self.max_concurrency})
+        return stats
+
+    def wait(self) -> float:
+        """Take one token, sleeping as long as needed; returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self.rate:
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                delay = self._paused_until - now
+                if delay <= 0:
+                    if not self.rate:
+                        break
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["throttled_seconds"] += waited
+        return waited
+
+    def acquire(self):
+        """
+        One request: a concurrency slot (if capped) and a token. Returns the
+        function that gives the slot back (safe to call more than once).
+        """
+        slots = self._slots
+        if slots is not None:
+            t0 = time.monotonic()
+            slots.acquire()
+            with self._lock:
+                self._stats["throttled_seconds"] += time.monotonic() - t0
+        held = [slots is not None]
+
+        def release():
+            with self._lock:
+                if not held[0]:
+                    return
+                held[0] = False
+            slots.release()
+
+        try:
+            self.wait()
+        except BaseException:
+            release()
+            raise
+        return release
+
+    @contextmanager
+    def slot(self):
+        """acquire() for the duration of a with block."""
+        release = self.acquire()
+        try:
+            yield
+        finally:
+            release()
+
+    def pause(self, seconds):
+        """Hold every request for `seconds` (the server asked us to back off)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._stats["rate_limited"] += 1
+            self._stats["retry_after_seconds"] += seconds
+
+
+def retry_after_seconds(value, default=DEFAULT_RETRY_AFTER) -> float:
+    """Retry-After header (seconds or an HTTP date) -> seconds to wait, capped at MAX_RETRY_AFTER."""
+    if not value:
+        return default
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return default
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+def _closing(close, release):
+    def close_and_release():
+        try:
+            close()
+        finally:
+            release()
+    return close_and_release
+
+
+class ThrottledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that sends through a TokenBucket and retries 429s (and 503s with
+    Retry-After). A request holds its concurrency slot until its body is read: a
+    plain response is read before the slot is given back, a streamed one
+    (stream=True) keeps it until the response is closed, so close streamed
+    responses (e.g. use them as context managers).
+    """
+
+    def __init__(self, limiter, max_rate_limit_retries=MAX_RATE_LIMIT_RETRIES, **kwargs):
+        self.limiter = limiter
+        self.max_rate_limit_retries = max_rate_limit_retries
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        for attempt in range(self.max_rate_limit_retries + 1):
+            release = self.limiter.acquire()
+            try:
+                response = super().send(request, **kwargs)
+                if not kwargs.get("stream"):
+                    response.content  # Session.send would read it right after, outside the slot
+            except BaseException:
+                release()
+                raise
+            if kwargs.get("stream"):
+                response.close = _closing(response.close, release)
+            else:
+                release()
+            retry_after = response.headers.get("Retry-After")
+            limited = response.status_code == 429 or (response.status_code == 503 and retry_after)
+            if not limited or attempt == self.max_rate_limit_retries:
+                return response
+            wait = retry_after_seconds(retry_after)
+            print(f"Rate limited by {request.url.split('?')[0]} ({response.status_code}), waiting {wait:.0f}s")
+            response.close()
+            self.limiter.pause(wait)
+        return response
+
+
+# The one budget for all ISCC traffic
+LIMITER = TokenBucket()
@@ -0,0 +1,223 @@
+import os
+import pickle
+import re
+import unicodedata
+import pandas as pd
+from thefuzz import fuzz, process
+
+# GST of Assets columns used by the index
+CP_COL = "Company/Producer"
+CPSN_COL = "Company/Producer Short Name"
+CITY_COL = "City"
+ASSET_ID_COL = "Asset Identifier"
+
+# Bump whenever the normalisation or index layout changes so stale caches are rebuilt
+INDEX_VERSION = 2
+
+# Legal-form words dropped from the end of company names (whole tokens only)
+LEGAL_SUFFIXES = {
+    "inc", "llc", "lp", "bv", "ltd", "co", "company", "limited", "pte", "gmbh", "ag", "plc", "spa",
+}
+
+# Anything that is not a letter/digit becomes a token separator
+_PUNCT = re.compile(r"[^\w]+")
+
+
+def normalize_name(text) -> str:
+    """Lowercase, unicode-fold, turn punctuation into spaces and collapse whitespace."""
+    if text is None or (isinstance(text, float) and pd.isna(text)):
+        return ""
+    s = unicodedata.normalize("NFKC", str(text)).lower()
+    s = s.replace("'", "").replace('"', "")
+    s = _PUNCT.sub(" ", s.replace("_", " "))
+    return " ".join(s.split())
+
+
+def company_key(text) -> str:
+    """
+    Normalized company name with trailing legal-form tokens (Ltd, GmbH, B.V., ...)
+    removed. Only the tail is stripped, so "Co Energy Trading" keeps its "co",
+    and a name made only of legal words keeps its first one.
+    """
+    # Join dotted abbreviations first so "b.v." and "s.p.a" collapse to "bv" / "spa"
+    s = re.sub(r"\b(\w)\.(?=\w\b|\w\.)", r"\1", str(text or ""))
+    tokens = normalize_name(s).split()
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def compact_key(text) -> str:
+    """Whitespace-free company key, used for strict exact matches."""
+    return company_key(text).replace(" ", "")
+
+
+class AssetIndex:
+    """
+    Compiled view of the GST Assets universe.
+
+    Holds, for the whole Golden Source:
+      - exact: company key (full and short name) -> short name
+      - compact / compact_short: space-free key of the full / short company
+        name -> (short name, city) of its first GST row
+      - universe: distinct company keys for fuzzy company resolution
+      - asset_ids / asset_set: normalized Asset Identifiers
+      - tokens: token -> positions in asset_ids (blocks the fuzzy asset search)
+    """
+
+    def __init__(self, exact, compact, compact_short, universe, asset_ids, tokens, fingerprint=None):
+        self.exact = exact
+        self.compact = compact
+        self.compact_short = compact_short
+        self.universe = universe
+        self.asset_ids = asset_ids
+        self.asset_set = set(asset_ids)
+        self.tokens = tokens
+        self.fingerprint = fingerprint
+
+    # -------- build / persist --------
+    @classmethod
+    def build(cls, gst_df: pd.DataFrame, fingerprint=None) -> "AssetIndex":
+        for col in (CP_COL, CPSN_COL, ASSET_ID_COL):
+            if col not in gst_df.columns:
+                raise KeyError(f"Column '{col}' not found in GST assets DataFrame.")
+
+        cities_col = gst_df[CITY_COL] if CITY_COL in gst_df.columns else pd.Series([""] * len(gst_df))
+
+        exact, compact, compact_short = {}, {}, {}
+        for cp, short, city in zip(gst_df[CP_COL], gst_df[CPSN_COL], cities_col):
+            city = "" if pd.isna(city) else str(city)
+            for name, target in ((cp, compact), (short, compact_short)):
+                key = company_key(name)
+                if not key:
+                    continue
+                # Later rows win, as in the previous per-matcher dictionaries
+                exact[key] = short
+                target.setdefault(key.replace(" ", ""), (short, city))
+
+        asset_ids = sorted({normalize_name(a) for a in gst_df[ASSET_ID_COL].dropna()} - {""})
+        tokens = {}
+        for pos, aid in enumerate(asset_ids):
+            for tok in set(aid.split()):
+                tokens.setdefault(tok, []).append(pos)
+
+        return cls(exact, compact, compact_short, sorted(exact), asset_ids, tokens, fingerprint)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump((INDEX_VERSION, self.__dict__), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path, fingerprint=None):
+        """Return the cached index, or None if missing/outdated."""
+        try:
+            with open(path, "rb") as f:
+                version, state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        if version != INDEX_VERSION or (fingerprint is not None and state.get("fingerprint") != fingerprint):
+            return None
+        index = cls.__new__(cls)
+        index.__dict__.update(state)
+        return index
+
+    # -------- resolution --------
+    def company_matches(self, names, score_threshold: int = 51, fuzzy: bool = True):
+        """
+        resolve_companies with its evidence: (short name or None, matched
+        company key, score) per input. Exact key hits score 100; a name with no
+        key, or an empty universe, gives (None, None, 0). fuzzy=False stops at
+        the exact lookup.
+        """
+        resolved = {}
+        for name in set(names):
+            key = company_key(name)
+            if key in self.exact:
+                resolved[name] = (self.exact[key], key, 100)
+                continue
+            if not key or not self.universe or not fuzzy:
+                resolved[name] = (None, None, 0)
+                continue
+            match, score = process.extractOne(key, self.universe, scorer=fuzz.ratio, processor=None)
+            resolved[name] = (self.exact[match] if score >= score_threshold else None, match, score)
+        return [resolved[n] for n in names]
+
+    def resolve_companies(self, names, score_threshold: int = 51, fuzzy: bool = True):
+        """
+        Batched company resolution: exact company key first, then fuzzy ratio
+        against the universe. Each distinct name is resolved once.
+        Returns the GST short name for each input, or None when unresolved.
+        """
+        return [short for short, _, _ in self.company_matches(names, score_threshold, fuzzy)]
+
+    def lookup_exact(self, names):
+        """
+        Strict compact-key lookup. Returns (short name, city) or None per input.
+        Full Company/Producer names are checked before short names, whatever
+        their row order. The key drops trailing legal-form tokens, so "Foo GmbH"
+        finds a GST "Foo B.V.".
+        """
+        keys = [compact_key(n) for n in names]
+        return [self.compact.get(k) or self.compact_short.get(k) for k in keys]
+
+    def _asset_candidates(self, norm):
+        """GST assets sharing a token with norm (all of them when none does)."""
+        positions = set()
+        for tok in norm.split():
+            positions.update(self.tokens.get(tok, ()))
+        if not positions:
+            return self.asset_ids
+        return [self.asset_ids[p] for p in sorted(positions)]
+
+    def asset_matches(self, asset_ids, fuzzy_threshold: int = 80, fuzzy: bool = True):
+        """
+        match_assets with its evidence: (0/1, best normalized GST asset or None,
+        score) per input. fuzzy=False only counts exact identifiers.
+
+        The fuzzy search first scores the assets sharing a token with the input;
+        when none of them reaches the threshold it scores the whole universe, so
+        a typo in every token ("Rotterdm Refinery") matches as it would unblocked.
+        """
+        matched = {}
+        for aid in set(asset_ids):
+            norm = normalize_name(aid)
+            if norm in self.asset_set:
+                matched[aid] = (1, norm, 100)
+            elif not norm or not self.asset_ids or not fuzzy:
+                matched[aid] = (0, None, 0)
+            else:
+                candidates = self._asset_candidates(norm)
+                best, score = process.extractOne(norm, candidates, scorer=fuzz.token_set_ratio, processor=None)
+                if score < fuzzy_threshold and len(candidates) < len(self.asset_ids):
+                    best, score = process.extractOne(norm, self.asset_ids, scorer=fuzz.token_set_ratio,
+                                                     processor=None)
+                matched[aid] = (1 if score >= fuzzy_threshold else 0, best, score)
+        return [matched[a] for a in asset_ids]
+
+    def match_assets(self, asset_ids, fuzzy_threshold: int = 80, fuzzy: bool = True):
+        """
+        Batched asset matching: 1 if the normalized identifier exists in the GST
+        universe, or fuzzy token_set_ratio >= threshold against the GST assets.
+        """
+        return [found for found, _, _ in self.asset_matches(asset_ids, fuzzy_threshold, fuzzy)]
+
+def file_fingerprint(path) -> str:
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}|{st.st_size}|{int(st.st_mtime)}"
+
+
+def load_asset_index(source_path, sheet_name, cache_path):
+    """
+    Load the compiled index from cache_path if it was built from the current
+    version of source_path, otherwise read the GST workbook, build and cache it.
+    """
+    fingerprint = file_fingerprint(source_path)
+    index = AssetIndex.load(cache_path, fingerprint)
+    if index is not None:
+        return index
+    print("Building GST asset index...")
+    gst_df = pd.read_excel(source_path, sheet_name=sheet_name)
+    index = AssetIndex.build(gst_df, fingerprint)
+    index.save(cache_path)
+    return index
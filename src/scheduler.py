@@ -0,0 +1,182 @@
+"""
+Long-running scheduler: runs main.run_once on a cron-like cadence and pushes
+each run's summary (row count, added / removed / changed certificates, or the
+error) to a file drop folder and/or a webhook.
+
+    python src/scheduler.py --cron "0 6 * * 1-5" --drop out/notifications
+    python src/scheduler.py --cron @daily --webhook http://localhost:9000/iscc --now
+    python src/scheduler.py --once --drop out/notifications     # single run, e.g. from Task Scheduler
+    python src/scheduler.py --cron @daily --profile fast --set page_size=30000
+"""
+import argparse
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+import requests
+
+from atomic import atomic_write_json
+from main import run_once, output_paths
+from profiles import PROFILES, load_settings, parse_overrides, apply_settings, describe
+
+ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 6 * * *",
+    "@weekly": "0 6 * * 1",
+}
+
+# Longest single sleep, so wall-clock jumps (sleep/hibernate) are noticed
+MAX_SLEEP = 60
+
+
+def _parse_field(field, lo, hi):
+    """One cron field (*, */n, a-b, a-b/n, lists) -> set of allowed values."""
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step = part.split("/")
+            step = int(step)
+        if part == "*":
+            first, last = lo, hi
+        elif "-" in part:
+            first, last = map(int, part.split("-"))
+        else:
+            first = last = int(part)
+        if first < lo or last > hi or step < 1:
+            raise ValueError(f"Cron field '{field}' out of range {lo}-{hi}")
+        if first > last:
+            raise ValueError(f"Cron field '{field}' has a reversed range {first}-{last}")
+        values.update(range(first, last + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Standard 5-field cron spec (minute hour day-of-month month day-of-week, Sunday = 0 or 7)."""
+
+    def __init__(self, spec):
+        self.spec = ALIASES.get(spec, spec)
+        fields = self.spec.split()
+        if len(fields) != 5:
+            raise ValueError(f"Expected 5 cron fields, got '{spec}'")
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12)
+        self.weekdays = {d % 7 for d in _parse_field(fields[4], 0, 7)}
+        # Like cron: when both day fields are restricted, either one may match. A
+        # field starting with "*" (also "*/2") counts as unrestricted, so the
+        # other day field then has to match as well
+        self._any_day = fields[2].startswith("*") or fields[4].startswith("*")
+
+    def _day_matches(self, dt):
+        dom = dt.day in self.days
+        dow = (dt.weekday() + 1) % 7 in self.weekdays
+        return (dom and dow) if self._any_day else (dom or dow)
+
+    def next_after(self, dt: datetime) -> datetime:
+        """First matching minute strictly after dt."""
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=366 * 5)
+        while t < limit:
+            if t.month not in self.months or not self._day_matches(t):
+                t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+            elif t.hour not in self.hours:
+                t = (t + timedelta(hours=1)).replace(minute=0)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"Cron spec '{self.spec}' never matches")
+
+
+class FileDropSink:
+    """Writes every run summary as <folder>/iscc_run_<timestamp>.json (atomically)."""
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def send(self, summary):
+        name = f"iscc_run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        atomic_write_json(os.path.join(self.folder, name), summary)
+
+
+class WebhookSink:
+    """POSTs every run summary as JSON to url."""
+
+    def __init__(self, url, timeout=30):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, summary):
+        requests.post(self.url, json=summary, timeout=self.timeout).raise_for_status()
+
+
+def notify(sinks, summary):
+    for sink in sinks:
+        try:
+            sink.send(summary)
+        except Exception as e:
+            # A broken sink must not stop the schedule
+            print(f"Could not notify {type(sink).__name__}: {e}")
+
+
+def run_and_summarise(out_dir="out", **kwargs) -> dict:
+    """One scheduled run; failures come back as a summary instead of an exception."""
+    output_file, report_file = output_paths(out_dir=out_dir)
+    try:
+        return run_once(output_file, report_file, **kwargs)
+    except Exception as e:
+        return {"started": datetime.now().isoformat(timespec="seconds"), "output_file": output_file,
+                "report_file": report_file, "status": "error", "error": f"{type(e).__name__}: {e}"}
+
+
+async def run_forever(schedule: CronSchedule, sinks, run_now=False, **kwargs):
+    """
+    Sleep until the next slot, run the scrape in a worker thread, notify, repeat.
+    Runs never overlap; slots missed while a run was still going are skipped.
+    """
+    if run_now:
+        notify(sinks, await asyncio.to_thread(run_and_summarise, **kwargs))
+    while True:
+        due = schedule.next_after(datetime.now())
+        print(f"Next scrape at {due:%Y-%m-%d %H:%M}")
+        while (remaining := (due - datetime.now()).total_seconds()) > 0:
+            await asyncio.sleep(min(remaining, MAX_SLEEP))
+        summary = await asyncio.to_thread(run_and_summarise, **kwargs)
+        print(f"Run finished: {summary['status']}")
+        notify(sinks, summary)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cron", default="@daily", help="5-field cron spec or @hourly/@daily/@weekly")
+    parser.add_argument("--drop", help="folder that receives one JSON summary per run")
+    parser.add_argument("--webhook", help="URL that receives each run summary as a JSON POST")
+    parser.add_argument("--now", action="store_true", help="run once immediately, then follow the schedule")
+    parser.add_argument("--once", action="store_true", help="run once and exit")
+    parser.add_argument("--profile", choices=sorted(PROFILES), help="named settings (see profiles.py)")
+    parser.add_argument("--config", help="JSON file of settings")
+    parser.add_argument("--set", nargs="+", default=[], metavar="KEY=VALUE", help="override single settings")
+    parser.add_argument("--out-dir")
+    parser.add_argument("--delay", type=float)
+    parser.add_argument("--page-size", type=int)
+    args = parser.parse_args()
+
+    overrides = parse_overrides(args.set)
+    for key in ("out_dir", "delay", "page_size"):
+        if getattr(args, key) is not None:
+            overrides[key] = getattr(args, key)
+    settings = load_settings(args.profile, args.config, overrides)
+    print(f"Scheduling runs with {describe(settings)}")
+
+    sinks = ([FileDropSink(args.drop)] if args.drop else []) + ([WebhookSink(args.webhook)] if args.webhook else [])
+    options = {"out_dir": settings["out_dir"], **apply_settings(settings)}
+    if args.once:
+        summary = run_and_summarise(**options)
+        notify(sinks, summary)
+        raise SystemExit(0 if summary["status"] == "ok" else 1)
+    try:
+        asyncio.run(run_forever(CronSchedule(args.cron), sinks, run_now=args.now, **options))
+    except KeyboardInterrupt:
+        print("Scheduler stopped.")
@@ -0,0 +1,176 @@
+"""
+Schema drift check for the wpDataTables JSON.
+
+parse_rows and enrich rely on the position of every column in COLUMNS. Before
+a bulk scrape, scrape.probe_schema fetches PROBE_ROWS rows and checks them
+against the table's fingerprint: the number of cells and, per column, the shape
+of the cell (link, tooltip, date, number, code, text, ...). A reordered, added
+or removed column fails the run within a second instead of after minutes of
+scraping and matching.
+
+The reviewed fingerprint lives in table_schema.json next to this module and is
+only written by --update. No reviewed fingerprint ships yet (it has to be taken
+from the live table). Until there is one, the first probe still checks the cell
+count against the scraper's columns and records its rows as a provisional
+baseline in out/table_schema.json (LEARNED_SCHEMA_FILE), which later runs are
+checked against. Review it and promote it with --update:
+
+    python src/schemacheck.py --update                                         # record the live table as reviewed
+    python src/schemacheck.py --update --from-page saved_page.json --schema-file /tmp/schema.json
+"""
+import argparse
+import json
+import os
+import re
+import threading
+from datetime import datetime
+
+from atomic import atomic_write_json, load_pointer
+
+# Reviewed fingerprints (tracked with the code) and the ones first probes record
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "table_schema.json")
+LEARNED_SCHEMA_FILE = "out/table_schema.json"
+# Rows fetched by the probe: enough to see the usual shapes of every column
+PROBE_ROWS = 25
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$|^\d{2}\.\d{2}\.\d{4}$")
+_NUMBER_RE = re.compile(r"^-?\d+(\.\d+)?$")
+# Identifiers like EU-ISCC-Cert-DE100-12345678
+_CODE_RE = re.compile(r"^[A-Z][A-Za-z]*(-[A-Za-z0-9]+){2,}$")
+
+# A column recorded as free text may hold these too
+_TEXT_LIKE = {"text", "code", "number", "date"}
+# Value columns (dates, status codes, the issuer tooltip) may also come as plain
+# text: one probe row cannot show every shape their values take
+_ALSO_TEXT = {"date", "number", "tooltip"}
+
+
+# Tables probed concurrently (multitable.py) record their baselines one at a time
+_RECORD_LOCK = threading.Lock()
+
+
+class SchemaDriftError(ValueError):
+    """The live table no longer matches the stored fingerprint."""
+
+
+def cell_kind(cell) -> str:
+    """Coarse shape of one raw cell: empty, link, tooltip, markup, date, number, code or text."""
+    if cell is None:
+        return "empty"
+    cell = str(cell)
+    if "<a " in cell and "href" in cell:
+        return "link"
+    if "has-tip" in cell:
+        return "tooltip"
+    text = _TAG_RE.sub("", cell).strip()
+    if not text:
+        return "markup" if "<" in cell else "empty"
+    if _DATE_RE.match(text):
+        return "date"
+    if _NUMBER_RE.match(text):
+        return "number"
+    if _CODE_RE.match(text):
+        return "code"
+    return "text"
+
+
+def fingerprint(rows) -> dict:
+    """Cell count and the set of cell kinds seen per column in some raw rows."""
+    width = max((len(r) for r in rows), default=0)
+    kinds = [sorted({cell_kind(r[i]) for r in rows if i < len(r)}) for i in range(width)]
+    return {"columns": width, "kinds": kinds}
+
+
+def _compatible(kind, allowed):
+    if kind == "empty" or set(allowed) <= {"empty"}:
+        return True
+    if kind in allowed:
+        return True
+    if kind == "text" and set(allowed) & _ALSO_TEXT:
+        return True
+    return "text" in allowed and kind in _TEXT_LIKE
+
+
+def schema_problems(rows, expected: dict, column_names=None) -> list:
+    """Human-readable differences between raw rows and a stored fingerprint ([] if none)."""
+    problems = []
+    for n, row in enumerate(rows):
+        if len(row) != expected["columns"]:
+            problems.append(f"row {n} has {len(row)} cells, expected {expected['columns']}")
+            continue
+        for i, cell in enumerate(row):
+            kind, allowed = cell_kind(cell), expected["kinds"][i]
+            if not _compatible(kind, allowed):
+                name = column_names[i] if column_names and i < len(column_names) else f"column {i}"
+                problems.append(f"{name}: got a {kind} cell, expected {'/'.join(allowed)} ({str(cell)[:60]!r})")
+    return problems
+
+
+def load_fingerprint(table_name, schema_file=SCHEMA_FILE):
+    return load_pointer(schema_file).get(table_name)
+
+
+def save_fingerprint(table_name, rows, schema_file=SCHEMA_FILE, source=None) -> dict:
+    with _RECORD_LOCK:
+        stored = load_pointer(schema_file)
+        stored[table_name] = {**fingerprint(rows), "rows": len(rows),
+                              "recorded": datetime.now().isoformat(timespec="seconds"), "source": source}
+        atomic_write_json(schema_file, stored)
+    return stored[table_name]
+
+
+def validate_rows(rows, table_name, column_names=None, schema_file=SCHEMA_FILE, learned_file=LEARNED_SCHEMA_FILE):
+    """
+    Raise SchemaDriftError when the probe rows do not match the table's
+    fingerprint: the reviewed one in schema_file, else the one a first probe
+    recorded in learned_file. Without either, rows whose cell count differs
+    from column_names still fail; otherwise they are recorded in learned_file.
+    """
+    expected = load_fingerprint(table_name, schema_file)
+    source = schema_file
+    if expected is None and learned_file:
+        expected, source = load_fingerprint(table_name, learned_file), learned_file
+    if expected is None:
+        widths = {len(r) for r in rows}
+        if column_names and widths - {len(column_names)}:
+            raise SchemaDriftError(f"Table '{table_name}' rows have {sorted(widths)} cells, "
+                                   f"the scraper has {len(column_names)} columns")
+        if learned_file:
+            save_fingerprint(table_name, rows, learned_file, source="first probe")
+            print(f"No reviewed schema fingerprint for '{table_name}': recorded a provisional one from "
+                  f"{len(rows)} rows in {learned_file}. Check it, then run 'python src/schemacheck.py --update'.")
+        return
+    if column_names and expected["columns"] != len(column_names):
+        raise SchemaDriftError(f"{source} expects {expected['columns']} columns for '{table_name}', "
+                               f"the scraper has {len(column_names)}")
+    problems = schema_problems(rows, expected, column_names)
+    if problems:
+        raise SchemaDriftError(
+            f"Table '{table_name}' changed shape: " + "; ".join(problems[:5])
+            + ". Check the columns in tables.py, then run 'python src/schemacheck.py --update'."
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--table", default="eu")
+    parser.add_argument("--update", action="store_true", help="store the current shape as the fingerprint")
+    parser.add_argument("--from-page", help="recorded wdtable JSON page to use instead of the live table")
+    parser.add_argument("--rows", type=int, default=100, help="rows to sample from the live table")
+    parser.add_argument("--schema-file", default=SCHEMA_FILE)
+    args = parser.parse_args()
+
+    if args.from_page:
+        with open(args.from_page, encoding="utf-8") as f:
+            rows = json.load(f)["data"]
+    else:
+        from scrape import fetch_page
+        from tables import get_table
+        rows, _ = fetch_page(0, args.rows, table=get_table(args.table))
+    if args.update:
+        save_fingerprint(args.table, rows, args.schema_file, source=args.from_page or "live")
+        print(f"Saved the fingerprint of '{args.table}' ({len(rows)} rows) to {args.schema_file}")
+    else:
+        validate_rows(rows, args.table, schema_file=args.schema_file)
+        print(f"'{args.table}' matches {args.schema_file}")
@@ -0,0 +1,95 @@
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from mappings import SCOPE_DESCRIPTIONS, FACILITY_GROUPING_MAP
+
+
+# The Scope column only holds a few thousand distinct code combinations across the
+# whole database, so everything here is computed once per distinct string and broadcast.
+
+@lru_cache(maxsize=None)
+def split_scope(scope_value) -> tuple:
+    """'HVO, TRS,BP' -> ('HVO', 'TRS', 'BP')"""
+    if not isinstance(scope_value, str):
+        return ()
+    return tuple(code.strip() for code in scope_value.split(","))
+
+
+@lru_cache(maxsize=None)
+def map_multiple_scopes(scope_value):
+    if not scope_value:
+        return "Unknown"
+    descriptions = [SCOPE_DESCRIPTIONS.get(code, "No Mapping") for code in split_scope(scope_value)]
+    return ", ".join(descriptions)
+
+
+# Define a function to determine the facility grouping based on Scope* codes
+    # It checks each abbreviation and returns the matching group(s)
+@lru_cache(maxsize=None)
+def determine_facility_grouping(scope_text):
+    if not isinstance(scope_text, str):
+        return ""
+    groupings = set()
+    for abbr in split_scope(scope_text):
+        group = FACILITY_GROUPING_MAP.get(abbr)
+        if group:
+            groupings.add(group)
+    return ", ".join(sorted(groupings)) if groupings else "Unclassified"
+
+
+def _per_distinct(scope: pd.Series, func) -> pd.Series:
+    """Apply func to each distinct scope string and broadcast back as a categorical."""
+    codes, uniques = pd.factorize(scope, use_na_sentinel=False)
+    values = [func(u) for u in uniques]
+    categories = pd.Index(pd.unique(np.array(values, dtype=object)))
+    remap = categories.get_indexer(values)
+    result = pd.Categorical.from_codes(remap[codes] if len(remap) else codes, categories=categories)
+    return pd.Series(result, index=scope.index, name=scope.name)
+
+
+def expand_scopes(scope: pd.Series) -> pd.DataFrame:
+    """Scope_Description and Facility_Grouping for a whole Scope column."""
+    return pd.DataFrame({
+        "Scope_Description": _per_distinct(scope, map_multiple_scopes),
+        "Facility_Grouping": _per_distinct(scope, determine_facility_grouping),
+    }, index=scope.index)
+
+
+def scope_indicator_matrix(scope: pd.Series) -> pd.DataFrame:
+    """
+    Sparse certificate x scope-code indicator matrix: one boolean SparseArray column
+    per code seen in the data (e.g. matrix["HVO"] is True for every HVO certificate).
+    """
+    codes, uniques = pd.factorize(scope)
+    combo_codes = [split_scope(u) for u in uniques]
+    all_codes = sorted({c for combo in combo_codes for c in combo if c})
+
+    # code -> which distinct combinations contain it
+    has_code = {c: np.zeros(len(uniques) + 1, dtype=bool) for c in all_codes}
+    for i, combo in enumerate(combo_codes):
+        for c in combo:
+            if c:
+                has_code[c][i] = True
+
+    # codes == -1 (missing scope) lands on the trailing always-False slot
+    return pd.DataFrame(
+        {c: pd.arrays.SparseArray(has_code[c][codes], fill_value=False) for c in all_codes},
+        index=scope.index,
+    )
+
+
+def scope_mask(indicator: pd.DataFrame, codes, how: str = "any") -> np.ndarray:
+    """Boolean row mask for certificates holding any/all of the given scope codes."""
+    codes = list(dict.fromkeys(codes))
+    cols = [c for c in codes if c in indicator.columns]
+    if how == "all" and len(cols) < len(codes):
+        return np.zeros(len(indicator), dtype=bool)
+    hits = np.zeros((len(indicator), 0), dtype=bool)
+    if cols:
+        hits = np.column_stack([indicator[c].to_numpy(dtype=bool) for c in cols])
+    return hits.all(axis=1) if how == "all" else hits.any(axis=1)
+
+
+def filter_by_scope(df: pd.DataFrame, codes, scope_col: str = "Scope", how: str = "any") -> pd.DataFrame:
+    """Certificates whose scope contains any (or all) of codes, e.g. filter_by_scope(df, ["HVO", "HEFA"])."""
+    return df[scope_mask(scope_indicator_matrix(df[scope_col]), codes, how=how)]
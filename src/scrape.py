@@ -1,20 +1,50 @@
+import os
 import requests
 from bs4 import BeautifulSoup
 import time
 import pandas as pd
 import re
+import numpy as np
+import pyarrow as pa
+from functools import lru_cache
 from mappings import *
-from thefuzz import fuzz, process
-
-# URLs
-BASE_URL = "https://www.iscc-system.org/wp-admin/admin-ajax.php?action=get_wdtable&table_id=2"
-MAIN_PAGE = "https://www.iscc-system.org/certification/certificate-database/all-certificates/"
+from scopes import map_multiple_scopes, determine_facility_grouping, expand_scopes
+from profiling import span, timed, add_info
+from paging import AdaptivePager
+from snapshot import to_categorical, to_datetimes, map_categories
+from resolve import AssetIndex, load_asset_index
+from jsonstream import JSONArrayStream
+from tables import TableDescriptor, TABLES, COLUMNS
+from ratelimit import LIMITER, ThrottledAdapter
+from sinks import write_outputs
+from schemacheck import validate_rows, PROBE_ROWS, SCHEMA_FILE
+from matchstate import MatchState, MATCH_STATE_FILE, COMPANY_THRESHOLD, ASSET_THRESHOLD
+
+# URLs (of the main certificate table, see tables.py for the others)
+BASE_URL = TABLES["eu"].url
+MAIN_PAGE = TABLES["eu"].main_page
 
 # GSTs of Geo filepath
-GST_GEO = pd.read_excel("C:/Users/tashif.ahmed/OneDrive - Shell/T&S LCF - Analytics, Digital, and Economics - Shared Documents/00. LCF Data Lakehouse/GSTs/GST Geographies/LCF GST of Geographies.xlsx", sheet_name="GS_LCF_Geographies")
+GST_GEO_PATH = "C:/Users/tashif.ahmed/OneDrive - Shell/T&S LCF - Analytics, Digital, and Economics - Shared Documents/00. LCF Data Lakehouse/GSTs/GST Geographies/LCF GST of Geographies.xlsx"
+GST_GEO_SHEET = "GS_LCF_Geographies"
+
+# GSTs of Assets filepath (read through the compiled asset index, see resolve.py)
+GST_ASSETS_PATH = r"C:/Users/tashif.ahmed/OneDrive - Shell/T&S LCF - Analytics, Digital, and Economics - Shared Documents/00. LCF Data Lakehouse/GSTs/GST Assets/00. Golden Source File of Asset Capacities.xlsm"
+GST_ASSETS_SHEET = "GoldenSource"
+ASSET_INDEX_CACHE = "out/asset_index.pkl"
+
+# Matching: company / asset score thresholds (imported above), fuzzy=False keeps exact lookups only
+FUZZY_MATCHING = True
+
+# Check the table's shape (schemacheck.py) before a bulk scrape
+SCHEMA_PROBE = True
+
+# Parsed rows of the last scrape, replayed by dry runs (see scrape_all)
+RAW_CACHE_FILE = "out/cache/raw_rows.arrow"
 
-# GSTs of Assets filepath
-GST_ASSETS = pd.read_excel(r"C:/Users/tashif.ahmed/OneDrive - Shell/T&S LCF - Analytics, Digital, and Economics - Shared Documents/00. LCF Data Lakehouse/GSTs/GST Assets/00. Golden Source File of Asset Capacities.xlsm", sheet_name="GoldenSource")
+# Streamed page reads: bytes per network read, raw rows per parse_rows batch
+STREAM_CHUNK_BYTES = 64 * 1024
+STREAM_BATCH_ROWS = 2000
 
 # Headers
 HEADERS = {
@@ -22,12 +52,11 @@ HEADERS = {
     "X-Requested-With": "XMLHttpRequest"
 }
 
-# Column names (from table)
-COLUMNS = [
-    "cert_ikon","cert_number","cert_owner","cert_scope","cert_processingunittype","cert_in_put","cert_add_on",
-    "cert_products","cert_valid_from","cert_valid_until","cert_suspended_date",
-    "cert_issuer","cert_map","cert_file","cert_audit","cert_status"
-]
+# One connection pool for every request (main page, table pages, all tables),
+# paced by the shared politeness budget (ratelimit.LIMITER)
+SESSION = requests.Session()
+SESSION.mount("https://", ThrottledAdapter(LIMITER, pool_connections=4, pool_maxsize=16))
+SESSION.mount("http://", ThrottledAdapter(LIMITER, pool_connections=4, pool_maxsize=16))
 
 def _safe(text):
     return "" if text is None else str(text).strip()
@@ -37,16 +66,9 @@ def _asset_identifier_join(company_name, city):
     city = _safe(city)
     return f"{company} {city}".strip()
 
-def _normalize_for_match(s: str) -> str:
-    if not isinstance(s, str):
-        s = "" if s is None else str(s)
-    s = s.lower()
-    s = re.sub(r"[\\.,;:/\\-\\(\\)\\[\\]&]", " ", s)  # remove punctuation
-    s = re.sub(r"\\s+", " ", s).strip()               # collapse spaces
-    return s
-
-def add_asset_identifier_and_match(df_iscc: pd.DataFrame, gst_df: pd.DataFrame,
-                                   fuzzy_threshold: int = 80) -> pd.DataFrame:
+@timed("match_assets", rows=len)
+def add_asset_identifier_and_match(df_iscc: pd.DataFrame, asset_index: AssetIndex,
+                                   fuzzy_threshold: int = 80, fuzzy: bool = True) -> pd.DataFrame:
     """
     Creates:
       - Asset_Identifier = Company_Name + City
@@ -59,95 +81,17 @@ def add_asset_identifier_and_match(df_iscc: pd.DataFrame, gst_df: pd.DataFrame,
         for cn, city in zip(df_iscc["Company_Name"], df_iscc["City"])
     ]
 
-    # GST exact Asset Identifier column
-    GST_ASSET_ID_COL = "Asset Identifier"
-    if GST_ASSET_ID_COL not in gst_df.columns:
-        raise KeyError(f"Column '{GST_ASSET_ID_COL}' not found in GST assets DataFrame.")
-
-    # Prepare GST normalized list and raw list
-    gst_raw_list = gst_df[GST_ASSET_ID_COL].astype(str).tolist()
-    gst_norm_list = [_normalize_for_match(x) for x in gst_raw_list]
-    gst_norm_set = set(gst_norm_list)
-
-    match_results = []
-
-    for asset_id in df_iscc["Asset_Identifier"]:
-        norm = _normalize_for_match(asset_id)
-
-        # --- 1) Exact normalized match ---
-        if norm in gst_norm_set:
-            match_results.append(1)
-            continue
-
-        # --- 2) Partial fuzzy match fallback ---
-        # We compare ISCC asset to all GST asset identifiers
-        # using token_set_ratio (handles missing Phase 1/2 etc.)
-        
-        if norm.strip() == "":
-            match_results.append(0)
-            continue
-
-        best_match, best_score = process.extractOne(
-            asset_id,
-            gst_raw_list,
-            scorer=fuzz.token_set_ratio
-        )
-
-        if best_score >= fuzzy_threshold:
-            match_results.append(1)
-        else:
-            match_results.append(0)
-
-    df_iscc["Match_Found"] = match_results
+    # Exact normalized match first, then token_set_ratio (handles missing Phase 1/2 etc.)
+    df_iscc["Match_Found"] = asset_index.match_assets(
+        df_iscc["Asset_Identifier"].tolist(), fuzzy_threshold=fuzzy_threshold, fuzzy=fuzzy
+    )
     return df_iscc
 
 
-def _normalize(text: str) -> str:
-    """Light normalization to improve fuzzy company matches."""
-    if not isinstance(text, str):
-        return ""
-    text = text.lower()
-    removals = [
-        " inc", " llc", " l.l.c", " lp", " l.p.", " bv", " b.v.", " ltd", " co", " company",
-        " limited", ".", ",", "&", "ltd.", "pte.", "gmbh", "ag", "plc", "s.p.a"
-    ]
-    # pad with space to avoid partial token issues (e.g., 'lp' in 'help')
-    for w in removals:
-        text = text.replace(w, " ")
-    return " ".join(text.split())
-
-def _build_lookup_exact_columns(gst_df: pd.DataFrame):
-    """
-    Build the fuzzy universe and a map of normalized name -> 'Company/Producer Short Name'
-    using the exact columns from your GST of Assets file.
-    """
-    # Use exact headers as shown in your screenshot
-    CP_COL = "Company/Producer"
-    CPSN_COL = "Company/Producer Short Name"
-
-    # Guard rails
-    for col in (CP_COL, CPSN_COL):
-        if col not in gst_df.columns:
-            raise KeyError(f"Column '{col}' not found in GST assets DataFrame.")
-
-    tmp = gst_df[[CP_COL, CPSN_COL]].copy()
-    tmp["__norm_cp__"]   = tmp[CP_COL].apply(_normalize)
-    tmp["__norm_cpsn__"] = tmp[CPSN_COL].apply(_normalize)
-
-    # Universe of strings to match against (both full and short)
-    universe = list(tmp["__norm_cp__"]) + list(tmp["__norm_cpsn__"])
-
-    # Map normalized representation -> short name (original casing)
-    to_short = {}
-    for _, r in tmp.iterrows():
-        to_short[r["__norm_cp__"]]   = r[CPSN_COL]
-        to_short[r["__norm_cpsn__"]] = r[CPSN_COL]
-
-    return universe, to_short
-
+@timed("resolve_companies", rows=len)
 def overwrite_company_with_gst_shortname_exact(iscc_df: pd.DataFrame,
-                                               gst_df: pd.DataFrame,
-                                               score_threshold: int = 70) -> pd.DataFrame:
+                                               asset_index: AssetIndex,
+                                               score_threshold: int = 70, fuzzy: bool = True) -> pd.DataFrame:
     """
     Overwrites iscc_df['Company_Name'] with GST 'Company/Producer Short Name'
     when fuzzy match >= score_threshold, else leaves as-is.
@@ -155,36 +99,12 @@ def overwrite_company_with_gst_shortname_exact(iscc_df: pd.DataFrame,
     if "Company_Name" not in iscc_df.columns:
         raise KeyError("Expected column 'Company_Name' not found in ISCC DataFrame.")
 
-    universe, to_short = _build_lookup_exact_columns(gst_df)
-
-    # Perform matching and overwrite in place
-    new_values = []
-    for original in iscc_df["Company_Name"]:
-        norm = _normalize(original)
-        match, score = process.extractOne(norm, universe, scorer=fuzz.ratio) if universe else (None, 0)
-        if match and score >= score_threshold:
-            new_values.append(to_short.get(match, original))
-        else:
-            new_values.append(original)
-
-    iscc_df["Company_Name"] = new_values
+    originals = iscc_df["Company_Name"].tolist()
+    resolved = asset_index.resolve_companies(originals, score_threshold=score_threshold, fuzzy=fuzzy)
+    iscc_df["Company_Name"] = [r if r is not None else o for r, o in zip(resolved, originals)]
     return iscc_df
 
 
-# Define a function to determine the facility grouping based on Scope* codes
-    # It checks each abbreviation and returns the matching group(s)
-def determine_facility_grouping(scope_text):
-    if not isinstance(scope_text, str):
-        return ""
-    abbreviations = [abbr.strip() for abbr in scope_text.split(",")]
-    groupings = set()
-    for abbr in abbreviations:
-        group = FACILITY_GROUPING_MAP.get(abbr)
-        if group:
-            groupings.add(group)
-    return ", ".join(sorted(groupings)) if groupings else "Unclassified"
-
-
 def get_country_name(c):
     exempt_words = ["of", "the", "and"]
     return " ".join([w.capitalize() if w not in exempt_words else w.lower() for w in c.split()])
@@ -234,15 +154,74 @@ def map_certificate_class(cert_type):
             return key
     return "Unknown"
 
+@lru_cache(maxsize=None)
+def _read_region_maps(path, sheet):
+    geo = pd.read_excel(path, sheet_name=sheet)
+    region = dict(zip(geo["Country"], geo["LCF SnD region 2"]))
+    subregion = dict(zip(geo["Country"], geo["LCF SnD region 1"]))
+    return region, subregion
+
+def _region_maps(path=None, sheet=None):
+    """Read a GST of Geographies once and return (country -> region, country -> sub-region)."""
+    return _read_region_maps(path or GST_GEO_PATH, sheet or GST_GEO_SHEET)
+
 def map_region(country):
-    r_map = GST_GEO[["Country", "LCF SnD region 2"]]
-    r_map_dict = dict(zip(r_map["Country"], r_map["LCF SnD region 2"]))
-    return r_map_dict.get(country, "Unknown")
+    return _region_maps()[0].get(country, "Unknown")
 
 def map_subregion(country):
-    r_map = GST_GEO[["Country", "LCF SnD region 1"]]
-    r_map_dict = dict(zip(r_map["Country"], r_map["LCF SnD region 1"]))
-    return r_map_dict.get(country, "Unknown")
+    return _region_maps()[1].get(country, "Unknown")
+
+# XML-disallowed control characters (except \t, \n, \r which we handle explicitly)
+_ILLEGAL_CTRL = "".join(map(chr, [*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20)]))
+
+# Applied before the "&nbsp;" entity is replaced (same order as the original replace chain)
+_CLEAN_TABLE_PRE = str.maketrans({
+    **{c: None for c in _ILLEGAL_CTRL},
+    "\r": None,         # carriage return
+    "\t": " ",          # tabs -> space
+    "\u00A0": " ",      # NBSP
+    "\n": " ",          # newline -> space
+})
+
+# Removals applied after the entity, so they can't create a new "&nbsp;"
+_CLEAN_TABLE_POST = str.maketrans({
+    "\u200b": None,     # zero-width space
+    "\u200c": None,     # zero-width non-joiner
+    "\u200d": None,     # zero-width joiner
+    "\ufeff": None,     # zero-width no-break space / BOM
+    "\u00ad": None,     # soft hyphen
+    "\"": None,
+})
+
+# Every code point other than " " for which str.isspace() is true (what split() breaks on)
+_OTHER_WHITESPACE = (
+    "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f\x85\xa0\u1680"
+    "\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a"
+    "\u2028\u2029\u202f\u205f\u3000"
+)
+
+# Characters that clean_excel_string would remove or rewrite (incl. every whitespace other
+# than " "); "\x00" is left out as it is the join separator and checked by count instead
+_DIRTY_CHARS = sorted(
+    set(_ILLEGAL_CTRL[1:]) | set('"\u00a0\u00ad\u200b\u200c\u200d\ufeff') | set(_OTHER_WHITESPACE)
+)
+
+def _scan_column(values):
+    """
+    Returns (clean, has_nul): clean is True when every value is a str that
+    clean_excel_string would return unchanged. Done as a few substring scans
+    over the "\x00"-joined column rather than one check per value.
+    """
+    if pd.api.types.infer_dtype(values, skipna=False) != "string":
+        return False, False
+    joined = "\x00".join(values)
+    if joined.count("\x00") != len(values) - 1:
+        return False, True
+    if "  " in joined or "&nbsp;" in joined:
+        return False, False
+    if joined.startswith(" ") or joined.endswith(" ") or " \x00" in joined or "\x00 " in joined:
+        return False, False
+    return not any(c in joined for c in _DIRTY_CHARS), False
 
 def clean_excel_string(x):
     """
@@ -250,46 +229,89 @@ def clean_excel_string(x):
     normalising whitespace, and stripping invisible characters commonly found
     in certificates and scraped data.
     """
-    # XML-disallowed control characters (except \t, \n, \r which we handle explicitly)
-    _ILLEGAL_CTRL = re.compile(r"[\x00-\x08\x0B-\x0C\x0E-\x1F]")
     if x is None:
         return ""
-    s = str(x)
-    s = _ILLEGAL_CTRL.sub("", s)
-    s = (
-        s.replace("\r", "")           # carriage return
-         .replace("\t", " ")          # tabs -> space
-         .replace("\u00A0", " ")      # NBSP (unicode)
-         .replace("\xa0", " ")        # NBSP (python literal)
-         .replace("&nbsp;", " ")      # HTML entity NBSP
-         .replace("\u200b", "")       # zero-width space
-         .replace("\u200c", "")       # zero-width non-joiner
-         .replace("\u200d", "")       # zero-width joiner
-         .replace("\ufeff", "")       # zero-width no-break space / BOM
-         .replace("\u00ad", "")       # soft hyphen
-         .replace("\n", " ") 
-         .replace("\"", "")         # newline -> space
-         .strip()
-    )
-    s = re.sub(r"\s+", " ", s)
-    return s
-
-def get_fresh_nonce():
+    s = str(x).translate(_CLEAN_TABLE_PRE)
+    if "&nbsp;" in s:
+        s = s.replace("&nbsp;", " ")   # HTML entity NBSP
+    s = s.translate(_CLEAN_TABLE_POST)
+    return " ".join(s.split())
+
+def clean_series(s: pd.Series) -> pd.Series:
+    """clean_excel_string over a column, computed once per distinct value."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return map_categories(s, clean_series)
+    if pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+        # numeric-like columns have nothing to clean, only the str() conversion
+        return s.astype(str)
+    clean, has_nul = _scan_column(s.to_numpy(dtype=object))
+    if clean:
+        return s.astype(object)
+    if has_nul:
+        # pandas' string hashing stops at embedded NULs, so don't dedupe these columns
+        return s.map(clean_excel_string).astype(object)
+    codes, uniques = pd.factorize(s)
+    cleaned = np.array([clean_excel_string(u) for u in uniques], dtype=object)
+    values = cleaned.take(codes) if len(cleaned) else np.full(len(s), "", dtype=object)
+    missing = codes < 0
+    if missing.any():
+        values[missing] = [clean_excel_string(v) for v in s.to_numpy()[missing]]
+    return pd.Series(values, index=s.index, name=s.name)
+
+def clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Column-wise equivalent of df.map(clean_excel_string)."""
+    return pd.DataFrame({c: clean_series(df[c]) for c in df.columns}, index=df.index)
+
+def default_table() -> TableDescriptor:
+    """The main certificate table, at the current BASE_URL / MAIN_PAGE."""
+    eu = TABLES["eu"]
+    return TableDescriptor(eu.name, BASE_URL, MAIN_PAGE, COLUMNS, nonce_element=eu.nonce_element)
+
+@timed("get_fresh_nonce")
+def get_fresh_nonce(table: TableDescriptor = None):
     """Fetch the main page and extract the current wdtNonce"""
-    response = requests.get(MAIN_PAGE, verify=False)
+    table = table or default_table()
+    response = SESSION.get(table.main_page, verify=False)
     response.raise_for_status()
 
     soup = BeautifulSoup(response.text, "html.parser")
-    input_tag = soup.find("input", {"id": "wdtNonceFrontendEdit_2"})
+    input_tag = soup.find("input", {"id": table.nonce_element})
     if input_tag and input_tag.has_attr("value"):
         return input_tag["value"]
     else:
         raise ValueError("Could not find wdtNonce on the page")
 
-def fetch_page(start: int, length: int = 10000, nonce: str = None):
-    """Fetch a page of certificates from the server"""
+@timed("fetch_page", rows=lambda result: len(result[0]))
+def fetch_page(start: int, length: int = 10000, nonce: str = None, filters: dict = None,
+               timeout=None, stats: dict = None, table: TableDescriptor = None):
+    """
+    Fetch a page of certificates from the server.
+    filters maps a column name (see COLUMNS) to its server-side search value,
+    e.g. {"cert_scope": "HVO"}; the count returned is then the filtered total.
+    If a stats dict is given it receives the response "seconds" and payload "bytes".
+    table selects another listing (tables.py); rows come back in that table's columns.
+    """
+    table = table or default_table()
+    t0 = time.perf_counter()
+    response = SESSION.post(table.url, headers=HEADERS, data=_page_form(start, length, nonce, filters, table),
+                            verify=False, timeout=timeout)
+    response.raise_for_status()
+    if stats is not None:
+        stats["seconds"] = time.perf_counter() - t0
+        stats["bytes"] = len(response.content)
+
+    js = response.json()
+    return js["data"], int(js.get("recordsFiltered", js["recordsTotal"]))
+
+def _page_form(start, length, nonce=None, filters=None, table: TableDescriptor = None):
+    """Form data for one wpDataTables page request"""
+    table = table or default_table()
+    filters = filters or {}
+    unknown = set(filters) - set(table.columns)
+    if unknown:
+        raise KeyError(f"Unknown filter column(s): {sorted(unknown)}")
     if nonce is None:
-        nonce = get_fresh_nonce()
+        nonce = get_fresh_nonce(table)
 
     form_data = {
         "draw": "5",
@@ -304,20 +326,58 @@ def fetch_page(start: int, length: int = 10000, nonce: str = None):
     }
 
     # Add columns for server-side processing
-    for i, name in enumerate(COLUMNS):
+    for i, name in enumerate(table.columns):
         form_data[f"columns[{i}][data]"] = str(i)
         form_data[f"columns[{i}][name]"] = name
         form_data[f"columns[{i}][searchable]"] = "true"
         form_data[f"columns[{i}][orderable]"] = "true"
-        form_data[f"columns[{i}][search][value]"] = ""
+        form_data[f"columns[{i}][search][value]"] = filters.get(name, "")
         form_data[f"columns[{i}][search][regex]"] = "false"
+    return form_data
 
-    response = requests.post(BASE_URL, headers=HEADERS, data=form_data, verify=False)
-    response.raise_for_status()
-
-    js = response.json()
-    return js["data"], int(js["recordsTotal"])
+def stream_page(start: int, length: int = 10000, nonce: str = None, filters: dict = None,
+                timeout=None, stats: dict = None, batch_size: int = None,
+                table: TableDescriptor = None):
+    """
+    Streaming counterpart of fetch_page: returns (batches, total) where batches
+    yields lists of at most batch_size (default STREAM_BATCH_ROWS) raw rows, decoded incrementally from the
+    response body (see jsonstream.py), so a large page never sits in memory as
+    one JSON document. stats is filled once the batches are exhausted.
+    """
+    table = table or default_table()
+    batch_size = batch_size or STREAM_BATCH_ROWS
+    t0 = time.perf_counter()
+    response = SESSION.post(table.url, headers=HEADERS, data=_page_form(start, length, nonce, filters, table),
+                            verify=False, timeout=timeout, stream=True)
+    try:
+        response.raise_for_status()
+        page = JSONArrayStream(response.iter_content(STREAM_CHUNK_BYTES))
+        meta = page.read_meta()
+        total = int(meta.get("recordsFiltered", meta.get("recordsTotal", 0)))
+    except Exception:
+        response.close()
+        raise
+
+    def batches():
+        with response:
+            yield from page.batches(batch_size)
+        if stats is not None:
+            stats["seconds"] = time.perf_counter() - t0
+            stats["bytes"] = page.bytes_read
+
+    return batches(), total
+
+def probe_schema(nonce: str = None, table: TableDescriptor = None, schema_file=SCHEMA_FILE, timeout=30):
+    """
+    Fetch PROBE_ROWS rows and check their shape against the stored fingerprint
+    (schemacheck.py) before a bulk scrape; raises SchemaDriftError on a mismatch.
+    """
+    table = table or default_table()
+    with span("schema_probe", table=table.name):
+        rows, _ = fetch_page(0, PROBE_ROWS, nonce, table=table, timeout=timeout)
+        validate_rows(rows, table.name, column_names=table.columns, schema_file=schema_file)
 
+@timed("parse_rows", rows=len)
 def parse_rows(rows):
     """Clean HTML in each cell and extract links (PDFs, maps) safely"""
     clean_rows = []
@@ -365,90 +425,283 @@ def split_cert_owner(value):
 
     return "", "", ""
 
-def map_multiple_scopes(scope_value):
-    if not scope_value:
-        return "Unknown"
-    codes = [code.strip() for code in scope_value.split(",")]
-    descriptions = [SCOPE_DESCRIPTIONS.get(code, "No Mapping") for code in codes]
-    return ", ".join(descriptions)
-
-def scrape_all(output_file, page_size, delay):
-    """Scrape all certificates and save to CSV"""
-    nonce = get_fresh_nonce()
-    print("Using nonce:", nonce)
-
-    # First page to get total records
-    rows, total_records = fetch_page(start=0, length=page_size, nonce=nonce)
-    print(f"Total certificates: {total_records}")
-
-    all_rows = parse_rows(rows)
-
-    for start in range(page_size, total_records, page_size):
-        print(f"Fetching rows {start} to {start+page_size}...")
-        try:
-            rows, _ = fetch_page(start=start, length=page_size, nonce=nonce)
-            if not rows:
+def _page_batches(start, length, nonce, filters, timeout, stream, stats, table=None, batch_size=None):
+    """
+    Request one page; returns (total, iterator of raw row batches). For streamed
+    pages the request and every batch decode run in their own fetch_page span and
+    only that time goes into stats["seconds"], not the consumer's time between batches.
+    """
+    if not stream:
+        rows, total = fetch_page(start=start, length=length, nonce=nonce, filters=filters,
+                                 timeout=timeout, stats=stats, table=table)
+        return total, iter([rows])
+
+    body = {}
+    t0 = time.perf_counter()
+    with span("fetch_page", streamed=True):
+        batches, total = stream_page(start=start, length=length, nonce=nonce, filters=filters,
+                                     timeout=timeout, stats=body, table=table, batch_size=batch_size)
+    stats["seconds"] = time.perf_counter() - t0
+
+    def decoded():
+        while True:
+            t0 = time.perf_counter()
+            with span("fetch_page", streamed=True) as record:
+                batch = next(batches, None)
+                record["rows"] = len(batch) if batch else 0
+            stats["seconds"] += time.perf_counter() - t0
+            if batch is None:
+                stats["bytes"] = body.get("bytes", 0)
+                return
+            yield batch
+
+    return total, decoded()
+
+def iter_row_batches(page_size, delay, filters=None, nonce=None, pager=None, stream=True,
+                     table: TableDescriptor = None, batch_rows=None, schema_probe=None):
+    """
+    Fetch and parse every page of the certificate table (optionally server-side
+    filtered), yielding lists of parsed rows as they arrive: one list per page, or
+    per batch_rows (default STREAM_BATCH_ROWS) when streaming (stream_page). Page lengths come from
+    pager, by default an AdaptivePager starting at page_size. A page that fails
+    part-way is retried from the first row not yet yielded; once the pager
+    gives up, the error is raised (run_once then discards the partial files).
+    table selects another listing. Requests are paced by the shared budget
+    (ratelimit.LIMITER, through SESSION) and delay seconds between pages.
+    Without a nonce, one is fetched and the table's schema probed (probe_schema,
+    unless schema_probe is False; default SCHEMA_PROBE) first; callers passing a
+    nonce probe once themselves.
+    """
+    table = table or default_table()
+    if nonce is None:
+        nonce = get_fresh_nonce(table)
+        print("Using nonce:", nonce)
+        if SCHEMA_PROBE if schema_probe is None else schema_probe:
+            probe_schema(nonce, table)
+    if pager is None:
+        pager = AdaptivePager(initial=page_size)
+
+    start, total_records = 0, None
+    try:
+        while total_records is None or start < total_records:
+            if total_records is not None:
+                print(f"Fetching rows {start} to {start + pager.size}...")
+            page_start, stats = start, {}
+            try:
+                total, batches = _page_batches(start, pager.size, nonce, filters, pager.timeout, stream, stats, table,
+                                               batch_rows)
+                if total_records is None:
+                    # First page gives the total records
+                    total_records = total
+                    label = "" if table.name == "eu" else f" in {table.name}"
+                    print(f"Total certificates{label}{f' for {filters}' if filters else ''}: {total_records}")
+                for batch in batches:
+                    rows = parse_rows(batch)
+                    start += len(rows)
+                    yield rows
+            except Exception as e:
+                wait = pager.record_error(start, e)
+                if wait is None:
+                    # Never end early with what was fetched: a short table would be
+                    # published as a complete run and its missing rows reported removed
+                    print(f"Error fetching page starting at {start} of {total_records}: {e}, giving up")
+                    raise
+                print(f"Error fetching page starting at {start}: {e}. Retrying in {wait:.0f}s with {pager.size} rows")
+                with span("backoff", wait=wait):
+                    time.sleep(wait)
+                continue
+
+            pager.record_page(page_start, start - page_start, stats["seconds"], stats.get("bytes", 0))
+            if start == page_start:
                 print("No more rows returned, stopping.")
                 break
-            all_rows.extend(parse_rows(rows))
-            time.sleep(delay) # polite delay
-        except Exception as e:
-            print(f"Error fetching page starting at {start}: {e}")
-            break
-    
-    # Save to XLSX
+            if start < total_records:
+                with span("polite_delay"):
+                    time.sleep(delay) # polite delay
+    finally:
+        add_info("page_schedules", {"table": table.name, "filters": filters, "schedule": pager.schedule})
+
+def fetch_all_rows(page_size, delay, filters=None, nonce=None, pager=None, stream=True,
+                   table: TableDescriptor = None):
+    """Every parsed row of the certificate table in one list (see iter_row_batches)."""
+    all_rows = []
+    for rows in iter_row_batches(page_size, delay, filters=filters, nonce=nonce, pager=pager, stream=stream,
+                                 table=table):
+        all_rows.extend(rows)
+    return all_rows
+
+def enrich(all_rows, asset_index: AssetIndex = None, match_state: MatchState = None, fuzzy=None,
+           company_threshold=COMPANY_THRESHOLD, asset_threshold=ASSET_THRESHOLD,
+           gst_geo_path=None, gst_geo_sheet=None) -> pd.DataFrame:
+    """
+    Build the certificate DataFrame and add all derived/LCF columns.
+    Every step is row-local, so it can run on the whole table or batch by batch.
+    With a match_state (matchstate.py) only new/changed certificates are matched
+    (with its own thresholds); otherwise fuzzy (default FUZZY_MATCHING) and the
+    thresholds apply. Regions come from the GST of Geographies at gst_geo_path /
+    gst_geo_sheet (default GST_GEO_PATH / GST_GEO_SHEET).
+    """
     df = pd.DataFrame(all_rows, columns=COLUMNS)
+    n = len(df)
+
+    with span("enrich.scopes", rows=n):
+        # Scope descriptions and facility grouping, computed once per distinct scope combination
+        scopes = expand_scopes(df["cert_scope"])
 
-    # Insert "scope_description" after "scope"
-    scope_index = df.columns.get_loc("cert_scope") + 1
-    df.insert(scope_index, "Scope_Description", df["cert_scope"].apply(map_multiple_scopes))
+        # Insert "scope_description" after "scope"
+        scope_index = df.columns.get_loc("cert_scope") + 1
+        df.insert(scope_index, "Scope_Description", scopes["Scope_Description"])
 
-    # Insert "Processing_Unit_Type_Description"
-    df.insert(scope_index + 2, "Processing_Unit_Type_Description", df["cert_scope"].apply(map_multiple_scopes))
+        # Insert "Processing_Unit_Type_Description"
+        df.insert(scope_index + 2, "Processing_Unit_Type_Description", scopes["Scope_Description"].copy())
 
-    # Extract new cert_owner fields
-    company_series, city_series, country_series = zip(*df["cert_owner"].apply(split_cert_owner))
+    with span("enrich.owner", rows=n):
+        # Extract new cert_owner fields
+        company_series, city_series, country_series = zip(*df["cert_owner"].apply(split_cert_owner)) if n else ((), (), ())
 
-    # Add the manual country overrides to the countries list
-    country_series = [MANUAL_COUNTRY_OVERRIDES.get(get_country_name(c), get_country_name(c)) for c in country_series]
+        # Add the manual country overrides to the countries list
+        country_series = [MANUAL_COUNTRY_OVERRIDES.get(get_country_name(c), get_country_name(c)) for c in country_series]
 
-    # Insert company, city, country directly after cert_owner
-    owner_index = df.columns.get_loc("cert_owner") + 1
-    df.insert(owner_index, "Company_Name", company_series)
-    df.insert(owner_index + 1, "City", [c.capitalize() for c in city_series])
-    df.insert(owner_index + 2, "Country", country_series)
+        # Insert company, city, country directly after cert_owner
+        owner_index = df.columns.get_loc("cert_owner") + 1
+        df.insert(owner_index, "Company_Name", company_series)
+        df.insert(owner_index + 1, "City", [c.capitalize() for c in city_series])
+        df.insert(owner_index + 2, "Country", pd.Categorical(country_series))
 
     # Add the facility grouping column
     df.insert(
         df.columns.get_loc("Scope_Description") + 1,
         "Facility_Grouping",
-        df["cert_scope"].apply(determine_facility_grouping)
+        scopes["Facility_Grouping"]
     )
 
     columns_to_remove = ["cert_ikon"]  # Add more if needed
     df = df.drop(columns=columns_to_remove)
 
-    df.insert(df.columns.get_loc("cert_number") + 1, "Certificate_Type", df["cert_number"].apply(map_certificate_type))
-    df.insert(df.columns.get_loc("Country") + 1, "Region", df["Country"].apply(map_region))
-    df.insert(df.columns.get_loc("Country") + 2, "Sub_Region", df["Country"].apply(map_subregion))
-    df.insert(0, "Status", df["cert_status"].apply(map_status))
-    df.insert(df.columns.get_loc("cert_number") + 2, "Certificate_Class", df["Certificate_Type"].apply(map_certificate_class))
-    df.insert(df.columns.get_loc("cert_map") + 1, "Latitude", df["cert_map"].apply(get_latitude))
-    df.insert(df.columns.get_loc("cert_map") + 2, "Longitude", df["cert_map"].apply(get_longitude))
+    with span("enrich.certificate_type", rows=n):
+        df.insert(df.columns.get_loc("cert_number") + 1, "Certificate_Type", df["cert_number"].apply(map_certificate_type))
+    with span("enrich.region", rows=n):
+        # Country is categorical, so the region lookups run once per distinct country
+        region, subregion = _region_maps(gst_geo_path, gst_geo_sheet)
+        df.insert(df.columns.get_loc("Country") + 1, "Region", df["Country"].map(lambda c: region.get(c, "Unknown")))
+        df.insert(df.columns.get_loc("Country") + 2, "Sub_Region",
+                  df["Country"].map(lambda c: subregion.get(c, "Unknown")))
+    with span("enrich.status", rows=n):
+        df.insert(0, "Status", df["cert_status"].apply(map_status))
+        df.insert(df.columns.get_loc("cert_number") + 2, "Certificate_Class", df["Certificate_Type"].apply(map_certificate_class))
+    with span("enrich.coordinates", rows=n):
+        df.insert(df.columns.get_loc("cert_map") + 1, "Latitude", df["cert_map"].apply(get_latitude))
+        df.insert(df.columns.get_loc("cert_map") + 2, "Longitude", df["cert_map"].apply(get_longitude))
 
     df = df.rename(columns=COLUMN_MAP)
 
-    # Normalise to remove whitespaces and invisible characters that could break further logic
-    df = df.map(clean_excel_string)
+    with span("enrich.clean", rows=n):
+        # Normalise to remove whitespaces and invisible characters that could break further logic
+        df = clean_frame(df)
 
-    df = overwrite_company_with_gst_shortname_exact(df, GST_ASSETS, score_threshold=51)
+        # Carry the low-cardinality columns as categoricals from here on (compare + snapshot)
+        df = to_categorical(df)
 
-    df = add_asset_identifier_and_match(df, GST_ASSETS, fuzzy_threshold=80)
+    with span("enrich.dates", rows=n):
+        # Typed dates from here on (expiry index, Excel date cells); a value that is not
+        # a date stays text on its own, so the snapshot keeps it as the site sent it
+        df = to_datetimes(df, keep_text=True)
 
-    # Save and add styles
-    df.to_excel(output_file, index=False, engine="openpyxl", sheet_name="Certificate Database")
+    if asset_index is None:
+        asset_index = _load_asset_index()
 
-    print(f"Scraping complete! Saved {len(df)} rows to {output_file}")
+    if match_state is not None:
+        return match_state.match(df)
+
+    fuzzy = FUZZY_MATCHING if fuzzy is None else fuzzy
+    df = overwrite_company_with_gst_shortname_exact(df, asset_index, score_threshold=company_threshold, fuzzy=fuzzy)
+
+    df = add_asset_identifier_and_match(df, asset_index, fuzzy_threshold=asset_threshold, fuzzy=fuzzy)
+    return df
+
+def _load_asset_index(offline=False, gst_assets_path=None, gst_assets_sheet=None, asset_index_cache=None):
+    """
+    The compiled GST asset index (paths default to GST_ASSETS_PATH / _SHEET and
+    ASSET_INDEX_CACHE); offline takes the cached one as it is (no GST workbook needed).
+    """
+    cache = asset_index_cache or ASSET_INDEX_CACHE
+    with span("load_asset_index"):
+        if not offline:
+            return load_asset_index(gst_assets_path or GST_ASSETS_PATH, gst_assets_sheet or GST_ASSETS_SHEET, cache)
+        index = AssetIndex.load(cache)
+        if index is None:
+            raise FileNotFoundError(f"No cached asset index at {cache} (run a normal scrape first)")
+        return index
+
+def cache_raw_rows(row_batches, path=RAW_CACHE_FILE):
+    """
+    Pass parsed row batches through while writing them to an Arrow file
+    (temp name, renamed when the last batch is in) for replay_raw_rows.
+    """
+    schema = pa.schema([(c, pa.string()) for c in COLUMNS])
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for rows in row_batches:
+            if rows:
+                columns = list(zip(*rows))
+                writer.write_batch(pa.record_batch([pa.array(col, pa.string()) for col in columns], schema=schema))
+            yield rows
+    os.replace(tmp, path)
+
+def replay_raw_rows(path=RAW_CACHE_FILE, batch_rows=None):
+    """Parsed row batches from cache_raw_rows' file, as iter_row_batches would yield them."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No cached rows at {path} (run a normal scrape first)")
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    print(f"Replaying {table.num_rows} cached rows from {path}")
+    for batch in table.to_batches(max_chunksize=batch_rows or STREAM_BATCH_ROWS):
+        yield [list(row) for row in zip(*(col.to_pylist() for col in batch.columns))]
+
+def iter_enriched(row_batches, asset_index: AssetIndex = None, match_state: MatchState = None, **options):
+    """
+    Enrich each batch of parsed rows as it arrives (one asset index load for all
+    batches); options are enrich's keyword arguments.
+    """
+    if asset_index is None:
+        asset_index = _load_asset_index()
+    for rows in row_batches:
+        if rows:
+            yield enrich(rows, asset_index, match_state, **options)
+
+def scrape_all(output_file, page_size, delay, stream=True, incremental=True, match_state_file=MATCH_STATE_FILE,
+               raw_cache=RAW_CACHE_FILE, replay=False, stream_batch_rows=None, schema_probe=None,
+               gst_assets_path=None, gst_assets_sheet=None, gst_geo_path=None, gst_geo_sheet=None,
+               asset_index_cache=None, fuzzy_matching=None, company_threshold=COMPANY_THRESHOLD,
+               asset_threshold=ASSET_THRESHOLD):
+    """
+    Scrape all certificates and save to XLSX + snapshot. Rows flow through fetch,
+    parse, enrich and the writers in batches, so the full table is never held in memory.
+    Matching is incremental against the stored match state (matchstate.py);
+    incremental=False matches every certificate again.
+    The parsed rows are also kept in raw_cache; replay=True reads them from
+    there instead of the site and uses the cached asset index (offline dry run).
+    The remaining arguments override the module settings of the same name
+    (None keeps STREAM_BATCH_ROWS, SCHEMA_PROBE, the GST paths, FUZZY_MATCHING).
+    Returns the number of certificates written.
+    """
+    fuzzy = FUZZY_MATCHING if fuzzy_matching is None else fuzzy_matching
+    asset_index = _load_asset_index(replay, gst_assets_path, gst_assets_sheet, asset_index_cache)
+    match_state = MatchState(asset_index, match_state_file, company_threshold, asset_threshold,
+                             fuzzy=fuzzy, fresh=not incremental)
+    if replay:
+        batches = replay_raw_rows(raw_cache, stream_batch_rows)
+    else:
+        batches = iter_row_batches(page_size, delay, stream=stream, batch_rows=stream_batch_rows,
+                                   schema_probe=schema_probe)
+        if raw_cache:
+            batches = cache_raw_rows(batches, raw_cache)
+    geo = dict(gst_geo_path=gst_geo_path, gst_geo_sheet=gst_geo_sheet)
+    enriched = iter_enriched(batches, asset_index, match_state, **geo)
+    total = write_outputs(enriched, output_file, empty=enrich([], asset_index, **geo))
+    add_info("matching", match_state.save())
+    print(f"Scraping complete! Saved {total} rows to {output_file}")
+    return total
 
 # TODO: clean up this file from a commenting POV
 # TODO: create a new column called assest identifier and match certificate to an asset via the golden source of assests
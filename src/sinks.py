@@ -0,0 +1,100 @@
+import os
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+from compare import DEFAULT_SHEET, add_row_hash
+from profiling import span
+from snapshot import SnapshotWriter, ROW_HASH_SPEC_KEY, DATE_COLUMNS
+
+# Date cells as DataFrame.to_excel(datetime_format="YYYY-MM-DD") writes them
+_DATE_FORMAT = "YYYY-MM-DD"
+
+# Same header look as DataFrame.to_excel
+_THIN = Side(style="thin")
+_HEADER_FONT = Font(bold=True)
+_HEADER_BORDER = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+_HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="top")
+
+
+class ExcelSink:
+    """
+    Writes DataFrame batches to a single-sheet workbook with openpyxl's
+    write-only mode, so rows go to disk as they are appended instead of
+    being kept as cell objects. Same cells as df.to_excel(index=False).
+    """
+
+    def __init__(self, path, sheet_name=DEFAULT_SHEET):
+        self.path = path
+        self.rows = 0
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet(sheet_name)
+        self._columns = None
+
+    def _header(self, columns):
+        cells = []
+        for name in columns:
+            cell = WriteOnlyCell(self._ws, value=name)
+            cell.font, cell.border, cell.alignment = _HEADER_FONT, _HEADER_BORDER, _HEADER_ALIGNMENT
+            cells.append(cell)
+        self._ws.append(cells)
+
+    def append(self, df: pd.DataFrame):
+        if self._columns is None:
+            self._columns = list(df.columns)
+            self._header(self._columns)
+        values = df[self._columns].astype(object)
+        values = values.where(values.notna(), None)
+        # Date columns may hold text next to their dates (to_datetimes keep_text)
+        date_cols = [i for i, c in enumerate(self._columns)
+                     if pd.api.types.is_datetime64_any_dtype(df[c]) or c in DATE_COLUMNS]
+        for row in values.itertuples(index=False, name=None):
+            if date_cols:
+                row = list(row)
+                for i in date_cols:
+                    if isinstance(row[i], pd.Timestamp):
+                        row[i] = WriteOnlyCell(self._ws, value=row[i].to_pydatetime())
+                        row[i].number_format = _DATE_FORMAT
+            self._ws.append(row)
+        self.rows += len(df)
+
+    def close(self):
+        # Saved under a temp name and renamed, so the workbook is never seen half-written
+        stem, ext = os.path.splitext(str(self.path))
+        tmp = f"{stem}.tmp{ext}"
+        self._wb.save(tmp)
+        os.replace(tmp, self.path)
+        return self.path
+
+
+def _append(excel, snapshot, df, sheet_name):
+    with span("write_excel", rows=len(df), sheet=sheet_name):
+        excel.append(df)
+    # Row hashes go to the snapshot only; the workbook keeps its schema
+    with span("row_hash", rows=len(df)):
+        hashed, spec = add_row_hash(df)
+    snapshot.metadata.setdefault(ROW_HASH_SPEC_KEY, spec)
+    with span("write_snapshot", rows=len(df)):
+        snapshot.append(hashed)
+
+
+def write_outputs(frames, output_file, sheet_name=DEFAULT_SHEET, empty=None) -> int:
+    """
+    Stream enriched DataFrame batches into the workbook sheet and its Feather
+    snapshot. empty is a zero-row frame with the output columns, written when
+    frames yields nothing, so the sheet still has its header and the snapshot
+    its schema. Returns the row count.
+    """
+    excel = ExcelSink(output_file, sheet_name)
+    with SnapshotWriter(output_file) as snapshot:
+        batches = 0
+        for df in frames:
+            _append(excel, snapshot, df, sheet_name)
+            batches += 1
+        if not batches and empty is not None:
+            _append(excel, snapshot, empty, sheet_name)
+    with span("write_excel", sheet=sheet_name, step="save"):
+        excel.close()
+    return excel.rows
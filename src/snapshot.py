@@ -0,0 +1,327 @@
+import hashlib
+import os
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (needed by pandas for Feather IO)
+    HAVE_ARROW = True
+except ImportError:
+    HAVE_ARROW = False
+
+# Low-cardinality columns carried as pandas categoricals (dictionary arrays on disk)
+CATEGORICAL_COLUMNS = [
+    "Status", "Status_Code", "Certificate_Type", "Certificate_Class", "Region", "Sub_Region",
+    "Country", "Facility_Grouping", "Scope_Description", "Processing_Unit_Type_Description",
+    "Issuing_CB",
+]
+
+# Date columns, parsed to datetime64 at enrichment (date cells in the workbook).
+# A value that is not a date is kept as the site's text in its own cell, next to
+# the parsed dates of the same column (to_datetimes keep_text). The snapshot stores
+# every date as a DATE_FORMAT string (date_text); comparisons and hashes see the
+# same strings (fillna_blank) and normalize other date spellings (compare.normalize_values).
+DATE_COLUMNS = ["Valid_From", "Valid_Until"]
+DATE_FORMAT = "%Y-%m-%d"
+
+# Columnar copy of the "Certificate Database" sheet, stored next to the workbook
+SNAPSHOT_SUFFIX = ".feather"
+# Written uncompressed so reads can memory-map the file instead of decoding it
+# (older lz4 snapshots still load, just without the zero-copy)
+SNAPSHOT_COMPRESSION = "uncompressed"
+
+# Per-row hash of the compared values (see compare.add_row_hash), stored as uint64;
+# the schema metadata entry records how it was computed
+ROW_HASH_COL = "Row_Hash"
+ROW_HASH_SPEC_KEY = "row_hash_spec"
+
+
+def snapshot_path(xlsx_path) -> str:
+    return os.path.splitext(str(xlsx_path))[0] + SNAPSHOT_SUFFIX
+
+
+def to_categorical(df: pd.DataFrame, columns=CATEGORICAL_COLUMNS) -> pd.DataFrame:
+    """Convert the known low-cardinality columns (when present) to categoricals in place."""
+    for c in columns:
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
+    return df
+
+
+def parse_dates(values: pd.Series):
+    """
+    (datetime64 series, mask of the non-blank values that are not dates) for one
+    column, in one vectorized pass: DATE_FORMAT first, anything else as a day-first date.
+    """
+    text = values.astype(object).where(values.notna(), "").astype(str).str.strip()
+    dates = pd.to_datetime(text, format=DATE_FORMAT, errors="coerce")
+    retry = dates.isna() & (text != "")
+    if retry.any():
+        dates[retry] = pd.to_datetime(text[retry], format="mixed", dayfirst=True, errors="coerce")
+    return dates, dates.isna() & (text != "")
+
+
+def to_datetimes(df: pd.DataFrame, columns=DATE_COLUMNS, keep_text=False) -> pd.DataFrame:
+    """
+    Parse the known date columns (when present) to datetime64 in place. Values
+    that are not dates at all are reported and become NaT; with keep_text only
+    those values stay as their original text (the column turns object, the parsed
+    values remain Timestamps), so every date is typed the same way whichever batch
+    it arrives in and what gets written keeps the site's other values.
+    """
+    for c in columns:
+        if c not in df.columns or pd.api.types.is_datetime64_any_dtype(df[c]):
+            continue
+        dates, bad = parse_dates(df[c])
+        if bad.any():
+            example = str(df[c][bad].iloc[0]).strip()
+            if keep_text:
+                print(f"{c}: {bad.sum()} value(s) are not dates, e.g. '{example}'; kept as text")
+                text = df[c].astype(str).str.strip()
+                df[c] = dates.astype(object).where(~bad, text).where(dates.notna() | bad, None)
+                continue
+            print(f"{c}: {bad.sum()} value(s) are not dates, e.g. '{example}'")
+        df[c] = dates
+    return df
+
+
+def date_text(s: pd.Series) -> pd.Series:
+    """
+    DATE_FORMAT strings for a date column, whether it is datetime64 or text with
+    parsed dates among it (to_datetimes keep_text). Other values are left as they are.
+    """
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s.dt.strftime(DATE_FORMAT)
+    if s.dtype != object:
+        return s
+    return s.map(lambda v: v.strftime(DATE_FORMAT) if isinstance(v, datetime) and pd.notna(v) else v)
+
+
+def fillna_blank(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    fillna("") that also works on categoricals (adds the "" category only where
+    needed). Date columns come back as DATE_FORMAT strings.
+    """
+    df = df.copy()
+    for c in df.columns:
+        s = df[c]
+        if pd.api.types.is_datetime64_any_dtype(s) or c in DATE_COLUMNS:
+            df[c] = date_text(s).fillna("")
+        elif isinstance(s.dtype, pd.CategoricalDtype):
+            if s.isna().any():
+                if "" not in s.cat.categories:
+                    s = s.cat.add_categories([""])
+                df[c] = s.fillna("")
+        else:
+            df[c] = s.fillna("")
+    return df
+
+
+def map_categories(s: pd.Series, func) -> pd.Series:
+    """
+    Apply a Series -> Series string transform to the distinct values of a
+    categorical only, then re-broadcast through the codes. Categories that
+    collapse to the same value after func are merged.
+    """
+    cats = pd.Series(s.cat.categories.astype(str))
+    new_values = func(cats).to_numpy()
+    new_cats = pd.Index(pd.unique(new_values))
+    remap = new_cats.get_indexer(new_values)
+    codes = s.cat.codes.to_numpy()
+    new_codes = np.where(codes >= 0, remap[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(new_codes, categories=new_cats), index=s.index, name=s.name)
+
+
+def categorical_ne(a: pd.Series, b: pd.Series) -> np.ndarray:
+    """Element-wise a != b for two categoricals, compared on shared category codes."""
+    cats = a.cat.categories.union(b.cat.categories)
+    a_map = cats.get_indexer(a.cat.categories)
+    b_map = cats.get_indexer(b.cat.categories)
+    a_codes = a.cat.codes.to_numpy()
+    b_codes = b.cat.codes.to_numpy()
+    a_codes = np.where(a_codes >= 0, a_map[a_codes], -1)
+    b_codes = np.where(b_codes >= 0, b_map[b_codes], -1)
+    return a_codes != b_codes
+
+
+def write_snapshot(df: pd.DataFrame, xlsx_path, metadata: dict = None) -> str:
+    """
+    Store the enriched frame as Feather next to the workbook. Categoricals are
+    kept as dictionary arrays, the row hash as uint64, dates as DATE_FORMAT strings;
+    everything else is stored as strings, the same way load_sheet reads the
+    workbook (dtype=str).
+    metadata (str -> str) goes into the file's schema metadata.
+    """
+    if not HAVE_ARROW:
+        print("pyarrow not installed, skipping columnar snapshot.")
+        return None
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    out = df.copy()
+    for c in out.columns:
+        if pd.api.types.is_datetime64_any_dtype(out[c]) or c in DATE_COLUMNS:
+            out[c] = date_text(out[c])
+        if not isinstance(out[c].dtype, pd.CategoricalDtype) and c != ROW_HASH_COL:
+            out[c] = out[c].where(out[c].isna(), out[c].astype(str))
+    table = pa.Table.from_pandas(out.reset_index(drop=True), preserve_index=False)
+    if metadata:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                               **{k.encode(): v.encode() for k, v in metadata.items()}})
+    path = snapshot_path(xlsx_path)
+    # Written under a temp name and renamed, so the snapshot is never seen half-written
+    feather.write_feather(table, f"{path}.tmp", compression=SNAPSHOT_COMPRESSION)
+    os.replace(f"{path}.tmp", path)
+    return path
+
+
+def snapshot_metadata(xlsx_path) -> dict:
+    """Custom schema metadata of a workbook's snapshot ({} if there is none); reads only the footer."""
+    path = snapshot_path(xlsx_path)
+    if not HAVE_ARROW or not os.path.exists(path):
+        return {}
+    import pyarrow as pa
+    with pa.memory_map(path) as source:
+        meta = pa.ipc.open_file(source).schema.metadata or {}
+    return {k.decode(): v.decode() for k, v in meta.items() if k != b"pandas"}
+
+
+def schema_fingerprint(schema) -> str:
+    """Short hash of a snapshot's column names and types (not its metadata)."""
+    spec = "|".join(f"{field.name}:{field.type}" for field in schema)
+    return hashlib.sha256(spec.encode()).hexdigest()[:16]
+
+
+def snapshot_summary(xlsx_path):
+    """
+    {"rows", "schema_fingerprint", "columns"} of a workbook's snapshot, from
+    the file footer and record batch headers only (None if there is none).
+    Raises if the file is truncated or not an Arrow file.
+    """
+    path = snapshot_path(xlsx_path)
+    if not HAVE_ARROW or not os.path.exists(path):
+        return None
+    import pyarrow as pa
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+        return {"rows": rows, "schema_fingerprint": schema_fingerprint(reader.schema),
+                "columns": reader.schema.names}
+
+
+def open_snapshot(xlsx_path, columns=None):
+    """
+    The workbook's snapshot as a pyarrow Table (None if there is none). The
+    whole table is materialised on open (read_all), but zero-copy: its buffers
+    point into the memory-mapped file, so an uncompressed snapshot is not decoded
+    or copied and the OS only pages in the columns that are actually touched.
+    """
+    path = snapshot_path(xlsx_path)
+    if not HAVE_ARROW or not os.path.exists(path):
+        return None
+    import pyarrow as pa
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    if columns is not None:
+        table = table.select([c for c in columns if c in table.column_names])
+    return table
+
+
+def table_to_frame(table) -> pd.DataFrame:
+    """pandas frame of a snapshot table (or a slice of one), categoricals as load_sheet returns them."""
+    return to_categorical(table.to_pandas())
+
+
+def read_snapshot(xlsx_path, columns=None):
+    """Load the Feather snapshot for a workbook, or None if it does not exist."""
+    table = open_snapshot(xlsx_path, columns)
+    return None if table is None else table_to_frame(table)
+
+
+class SnapshotWriter:
+    """
+    Incremental write_snapshot: appends DataFrame batches to the Feather (Arrow
+    IPC) file as record batches. Categorical columns keep one dictionary per
+    column that grows as new categories show up (written as dictionary deltas),
+    so the file reads back exactly like one written by write_snapshot.
+    """
+
+    def __init__(self, xlsx_path, categorical_columns=CATEGORICAL_COLUMNS, metadata: dict = None):
+        self.path = snapshot_path(xlsx_path)
+        # written here and renamed to path by close()
+        self.tmp_path = f"{self.path}.tmp"
+        self.categorical_columns = categorical_columns
+        # schema metadata, fixed when the first batch opens the file
+        self.metadata = dict(metadata or {})
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+        self._categories = {}   # column -> {category: code}
+
+    def _open(self, df):
+        import pyarrow as pa
+        def field_type(c):
+            if c in self.categorical_columns:
+                return pa.dictionary(pa.int32(), pa.string())
+            return pa.uint64() if c == ROW_HASH_COL else pa.string()
+        self._schema = pa.schema([pa.field(c, field_type(c)) for c in df.columns],
+                                 metadata=self.metadata or None)
+        self._categories = {c: {} for c in df.columns if c in self.categorical_columns}
+        options = pa.ipc.IpcWriteOptions(
+            compression=None if SNAPSHOT_COMPRESSION == "uncompressed" else SNAPSHOT_COMPRESSION,
+            emit_dictionary_deltas=True,
+        )
+        self._writer = pa.ipc.new_file(self.tmp_path, self._schema, options=options)
+
+    def _dictionary_array(self, column, s):
+        import pyarrow as pa
+        if not isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.astype("category")
+        lookup = self._categories[column]
+        for cat in s.cat.categories:
+            lookup.setdefault(str(cat), len(lookup))
+        remap = np.array([lookup[str(cat)] for cat in s.cat.categories], dtype=np.int32)
+        codes = s.cat.codes.to_numpy()
+        codes = np.where(codes >= 0, remap[codes] if len(remap) else -1, -1).astype(np.int32)
+        return pa.DictionaryArray.from_arrays(pa.array(codes, mask=codes < 0), pa.array(list(lookup), pa.string()))
+
+    def append(self, df: pd.DataFrame):
+        if not HAVE_ARROW:
+            return
+        import pyarrow as pa
+        if self._writer is None:
+            self._open(df)
+        arrays = []
+        for field in self._schema:
+            s = df[field.name]
+            if field.name in self._categories:
+                arrays.append(self._dictionary_array(field.name, s))
+            elif field.name == ROW_HASH_COL:
+                arrays.append(pa.array(s.to_numpy(dtype=np.uint64), type=pa.uint64()))
+            else:
+                if pd.api.types.is_datetime64_any_dtype(s) or field.name in DATE_COLUMNS:
+                    s = date_text(s)
+                values = s.where(s.isna(), s.astype(str)).to_numpy(dtype=object)
+                arrays.append(pa.array(values, type=pa.string(), from_pandas=True))
+        self._writer.write_batch(pa.record_batch(arrays, schema=self._schema))
+        self.rows += len(df)
+
+    def close(self, commit=True):
+        """Finish the file and move it into place (commit=False drops it instead)."""
+        if not HAVE_ARROW:
+            print("pyarrow not installed, skipping columnar snapshot.")
+            return None
+        if self._writer is None:
+            return None
+        self._writer.close()
+        self._writer = None
+        if not commit:
+            os.remove(self.tmp_path)
+            return None
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close(commit=exc_type is None)
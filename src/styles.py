@@ -2,7 +2,9 @@ from openpyxl import load_workbook
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
 from openpyxl.utils import get_column_letter
+from profiling import timed
 
+@timed("apply_styles")
 def apply_styles(output_file, worksheet):
 
     wb = load_workbook(output_file)
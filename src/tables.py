@@ -0,0 +1,91 @@
+"""
+Registry of the ISCC wpDataTables listings the scraper can read.
+
+A TableDescriptor holds what differs between listings: the admin-ajax URL
+(table id), the page carrying the nonce and the nonce input's id, and the
+column schema. Columns of other listings are mapped onto the main table's
+COLUMNS (via column_map), so every listing goes through the same enrichment.
+
+Only the main certificate database (table 2) is built in. Other listings
+(e.g. ISCC PLUS or CORSIA pages) are added from a JSON file, one object per
+table, with the values read from the listing's page source:
+
+    [{"name": "corsia", "table_id": 7,
+      "main_page": "https://www.iscc-system.org/.../corsia-certificates/",
+      "columns": ["cert_number", "cert_owner", ...],
+      "column_map": {"cert_holder": "cert_owner"}}]
+"""
+import json
+
+ISCC_AJAX_URL = "https://www.iscc-system.org/wp-admin/admin-ajax.php"
+
+# Column names (from table) of the main certificate database; other tables are mapped onto these
+COLUMNS = [
+    "cert_ikon","cert_number","cert_owner","cert_scope","cert_processingunittype","cert_in_put","cert_add_on",
+    "cert_products","cert_valid_from","cert_valid_until","cert_suspended_date",
+    "cert_issuer","cert_map","cert_file","cert_audit","cert_status"
+]
+
+
+def wdtable_url(table_id, ajax_url=ISCC_AJAX_URL) -> str:
+    return f"{ajax_url}?action=get_wdtable&table_id={table_id}"
+
+
+class TableDescriptor:
+    """One wpDataTables listing: where to fetch it, where its nonce is, and its columns."""
+
+    def __init__(self, name, url, main_page, columns, nonce_element=None, column_map=None, table_id=None):
+        self.name = name
+        self.url = url
+        self.main_page = main_page
+        self.columns = list(columns)
+        self.nonce_element = nonce_element or f"wdtNonceFrontendEdit_{table_id}"
+        # this table's column name -> name in COLUMNS (same name when not listed)
+        self.column_map = dict(column_map or {})
+        canonical = [self.column_map.get(c, c) for c in self.columns]
+        self._positions = [canonical.index(c) if c in canonical else None for c in COLUMNS]
+
+    @classmethod
+    def from_dict(cls, spec: dict):
+        spec = dict(spec)
+        table_id = spec.pop("table_id")
+        url = spec.pop("url", None) or wdtable_url(table_id, spec.pop("ajax_url", ISCC_AJAX_URL))
+        return cls(url=url, table_id=table_id, **spec)
+
+    def to_canonical(self, rows):
+        """Parsed rows of this table as rows in COLUMNS order ("" where the table has no such column)."""
+        if self.columns == COLUMNS:
+            return rows
+        positions = self._positions
+        return [["" if p is None else row[p] for p in positions] for row in rows]
+
+    def __repr__(self):
+        return f"TableDescriptor({self.name!r}, {self.url!r})"
+
+
+TABLES = {
+    "eu": TableDescriptor(
+        "eu", wdtable_url(2),
+        "https://www.iscc-system.org/certification/certificate-database/all-certificates/",
+        COLUMNS, table_id=2,
+    ),
+}
+
+
+def register_table(table: TableDescriptor):
+    TABLES[table.name] = table
+    return table
+
+
+def load_tables(path):
+    """Register every table described in a JSON file; returns their names."""
+    with open(path, encoding="utf-8") as f:
+        specs = json.load(f)
+    return [register_table(TableDescriptor.from_dict(spec)).name for spec in specs]
+
+
+def get_table(name) -> TableDescriptor:
+    try:
+        return TABLES[name]
+    except KeyError:
+        raise KeyError(f"Unknown table '{name}' (known: {', '.join(TABLES)})") from None
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The modules import each other as flat names (python src/main.py), as do the bench helpers
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("src", "bench"):
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,75 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from atomic import (write_manifest, validate_manifest, commit_outputs, discard_outputs, partial_path,
+                    manifest_path)
+from snapshot import write_snapshot, snapshot_path
+
+
+@pytest.fixture
+def run(tmp_path):
+    """A committed run: workbook, snapshot and manifest under their final names."""
+    final = str(tmp_path / "ISCC_Certificates_01.01.2026_06.00.xlsx")
+    partial = partial_path(final)
+    df = pd.DataFrame({"Certificate_ID": [f"EU-{i}" for i in range(5)], "Status": ["Valid"] * 5})
+    df.to_excel(partial, index=False)
+    write_snapshot(df, partial)
+    manifest = write_manifest(partial, final)
+    commit_outputs(partial, final)
+    assert manifest["rows"] == 5
+    return final
+
+
+def test_committed_run_validates(run):
+    assert validate_manifest(run, deep=True) == []
+    assert not os.path.exists(partial_path(run))
+    assert not os.path.exists(manifest_path(partial_path(run)))
+
+
+def test_missing_or_resized_files_are_reported(run):
+    with open(snapshot_path(run), "ab") as f:
+        f.write(b"\0")
+    assert any("bytes" in p for p in validate_manifest(run))
+
+    os.remove(run)
+    assert any("missing" in p for p in validate_manifest(run))
+
+
+def test_deep_check_catches_same_size_edits(run):
+    with open(run, "r+b") as f:
+        f.seek(100)
+        byte = f.read(1)
+        f.seek(100)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    assert validate_manifest(run) == []
+    assert validate_manifest(run, deep=True) == [f"{run} content differs from its manifest (sha256)"]
+
+
+def test_snapshot_row_count_must_match(run):
+    path = manifest_path(run)
+    with open(path) as f:
+        manifest = json.load(f)
+    manifest["rows"] = 6
+    with open(path, "w") as f:
+        json.dump(manifest, f)
+    assert validate_manifest(run) == ["snapshot has 5 rows, manifest says 6"]
+
+
+def test_runs_without_manifest(tmp_path):
+    old = tmp_path / "old.xlsx"
+    assert validate_manifest(str(old)) == [f"{old} is missing"]
+    pd.DataFrame({"a": [1]}).to_excel(old, index=False)
+    assert validate_manifest(str(old)) == []
+
+
+def test_discard_outputs_removes_partial_files(tmp_path):
+    partial = partial_path(str(tmp_path / "run.xlsx"))
+    df = pd.DataFrame({"Certificate_ID": ["EU-1"]})
+    df.to_excel(partial, index=False)
+    write_snapshot(df, partial)
+    write_manifest(partial)
+    discard_outputs(partial)
+    assert list(tmp_path.iterdir()) == []
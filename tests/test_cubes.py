@@ -0,0 +1,54 @@
+import pandas as pd
+
+from cubes import CUBES, MEASURE, build_cubes, cube_mismatches, dimension_frame, update_cubes
+
+
+def _certificates():
+    return pd.DataFrame({
+        "Region": ["Europe", "Europe", "Asia Pacific", "Americas"],
+        "Sub_Region": ["NW Europe", "NW Europe", "South Asia", "North America"],
+        "Status": ["Valid", "Expired", "Valid", "Valid"],
+        "Facility_Grouping": ["Trading Companies", "Electricity Assets", "Trading Companies", ""],
+        "Certificate_Type": ["Mandated", "Voluntary", "Mandated", "Mandated"],
+        "Valid_From": ["2025-01-10", "2024-02-01", "2025-01-31", None],
+        "Valid_Until": ["2026-01-09", "2025-01-31", "2026-01-30", "not a date"],
+    })
+
+
+def test_fresh_cubes_match_their_rows():
+    dims = dimension_frame(_certificates())
+    cubes = build_cubes(None, dims)
+    assert set(cubes) == set(CUBES)
+    assert cube_mismatches(cubes, dims) == []
+    assert cubes["expiry_month"][MEASURE].sum() == 4
+
+
+def test_moved_certificate_is_caught_although_the_total_holds():
+    dims = dimension_frame(_certificates())
+    cubes = build_cubes(None, dims)
+    cube = cubes["type_status"]
+    # one Mandated/Valid certificate counted as Voluntary/Valid instead
+    cube.loc[(cube["Certificate_Type"] == "Mandated") & (cube["Status"] == "Valid"), MEASURE] -= 1
+    cubes["type_status"] = pd.concat([cube, pd.DataFrame(
+        {"Certificate_Type": ["Voluntary"], "Status": ["Valid"], MEASURE: [1]})], ignore_index=True)
+    assert cubes["type_status"][MEASURE].sum() == len(dims)
+    assert cube_mismatches(cubes, dims) == ["type_status.Certificate_Type"]
+
+
+def test_incremental_update_equals_rebuild():
+    before = _certificates()
+    after = before.drop(index=[3]).copy()
+    after.loc[1, "Status"] = "Valid"
+    after = pd.concat([after, pd.DataFrame({
+        "Region": ["Europe"], "Sub_Region": ["S Europe"], "Status": ["Valid"], "Facility_Grouping": [""],
+        "Certificate_Type": ["Voluntary"], "Valid_From": ["2025-06-01"], "Valid_Until": ["2026-05-31"],
+    })], ignore_index=True)
+
+    dims_before, dims_after = dimension_frame(before), dimension_frame(after)
+    updated = update_cubes(build_cubes(None, dims_before), added=after.iloc[[3]], removed=before.iloc[[3]],
+                           changed_new=after.iloc[[1]], changed_old=before.iloc[[1]])
+    assert cube_mismatches(updated, dims_after) == []
+    rebuilt = build_cubes(None, dims_after)
+    for name in CUBES:
+        pd.testing.assert_frame_equal(updated[name].reset_index(drop=True), rebuilt[name].reset_index(drop=True),
+                                      check_dtype=False)
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from jsonstream import JSONArrayStream
+
+PAYLOAD = {
+    "draw": 1,
+    "recordsTotal": "3",
+    "data": [["EU-1", "Café Öl", 12.5e3], ["EU-2", "", -7], ["EU-3", "x, \"y\"", None]],
+    "recordsFiltered": "3",
+}
+
+
+def _chunks(data: bytes, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 1 << 16])
+def test_items_and_meta_survive_any_chunking(size):
+    raw = json.dumps(PAYLOAD, ensure_ascii=False).encode("utf-8")
+    stream = JSONArrayStream(_chunks(raw, size))
+    assert stream.read_meta() == {"draw": 1, "recordsTotal": "3"}
+    assert list(stream) == PAYLOAD["data"]
+    # members after the array are picked up once it has been read
+    assert stream.meta["recordsFiltered"] == "3"
+    assert stream.bytes_read == len(raw)
+
+
+def test_batches():
+    raw = json.dumps({"data": [[i] for i in range(5)]}).encode()
+    assert [len(b) for b in JSONArrayStream(_chunks(raw, 3)).batches(2)] == [2, 2, 1]
+
+
+def test_empty_array_and_missing_key():
+    assert list(JSONArrayStream([b'{"recordsTotal": 0, "data": []}'])) == []
+    stream = JSONArrayStream([b'{"error": "bad nonce"}'])
+    assert list(stream) == []
+    assert stream.meta == {"error": "bad nonce"}
+
+
+def test_truncated_stream_raises():
+    with pytest.raises(ValueError):
+        list(JSONArrayStream([b'{"data": [[1, 2], [3']))
@@ -0,0 +1,52 @@
+import json
+from datetime import datetime
+
+import pytest
+
+import scrape
+from atomic import validate_manifest
+from fixture_server import FixtureServer
+from main import run_once, output_paths
+from synthetic import table_rows, gst_assets_frame, gst_geo_frame
+
+
+@pytest.fixture
+def gst_options(tmp_path):
+    """Fake GST workbooks, passed to scrape_all as options (no module settings touched)."""
+    assets, geo = tmp_path / "gst" / "gst_assets.xlsx", tmp_path / "gst" / "gst_geo.xlsx"
+    assets.parent.mkdir()
+    gst_assets_frame(300).to_excel(assets, sheet_name=scrape.GST_ASSETS_SHEET, index=False)
+    gst_geo_frame().to_excel(geo, sheet_name=scrape.GST_GEO_SHEET, index=False)
+    return {"gst_assets_path": str(assets), "gst_geo_path": str(geo),
+            "asset_index_cache": str(tmp_path / "gst" / "asset_index.pkl")}
+
+
+def test_second_run_reports_added_removed_and_changed(tmp_path, monkeypatch, gst_options):
+    monkeypatch.chdir(tmp_path)
+    rows = table_rows(305)
+    served = rows[:300]
+    kwargs = dict(delay=0, page_size=100, utils_file="utils.json", change_log_dir="out/change_log",
+                  cube_dir="out/cubes", scrape_options=gst_options)
+
+    with FixtureServer(served) as server:
+        monkeypatch.setattr(scrape, "BASE_URL", server.ajax_url)
+        monkeypatch.setattr(scrape, "MAIN_PAGE", server.main_page_url)
+
+        first = run_once(*output_paths(datetime(2026, 1, 1, 6, 0)), **kwargs)
+        assert first["status"] == "ok" and first["rows"] == 300
+        assert "added" not in first
+
+        del served[:20]                   # removed
+        for row in served[:12]:           # changed (last column)
+            row[-1] = "5" if row[-1] != "5" else "1"
+        served.extend(rows[300:])         # added
+
+        second = run_once(*output_paths(datetime(2026, 1, 2, 6, 0)), **kwargs)
+
+    assert second["status"] == "ok"
+    assert second["prev_file_name"] == first["output_file"]
+    assert (second["rows"], second["added"], second["removed"], second["changed"]) == (285, 5, 20, 12)
+    assert second["cubes"] == "incremental"
+    assert validate_manifest(second["output_file"], deep=True) == []
+    with open("utils.json") as f:
+        assert json.load(f)["prev_file_name"] == second["output_file"]
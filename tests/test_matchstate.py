@@ -0,0 +1,69 @@
+import pandas as pd
+from thefuzz import fuzz
+
+from matchstate import MatchState
+from resolve import AssetIndex, company_key
+
+GST_COLUMNS = ["Company/Producer", "Company/Producer Short Name", "City", "Asset Identifier"]
+
+GST_BEFORE = [
+    ["Acme Renewablez GmbH", "Acme Z", "Hamburg", "Acme Z Hamburg"],
+    ["Borealis Fuels Ltd", "Borealis", "Oslo", "Borealis Oslo"],
+    ["Cobalt Chemicals BV", "Cobalt", "Rotterdam", "Cobalt Rotterdam"],
+    ["Delta Oils Inc", "Delta", "Houston", "Delta Houston"],
+]
+
+CERTS = pd.DataFrame({
+    "Certificate_ID": [f"EU-ISCC-Cert-{i:03d}" for i in range(7)],
+    "Company_Name": ["Acme Renewables", "Borealis Fuels", "Cobalt Chemical", "Delta Oil Inc",
+                     "Echo Biogas", "Borealis Fuel Ltd", "Unknown Trader"],
+    "City": ["Hamburg", "Oslo", "Rotterdam", "Houston", "Lyon", "Oslo", "Paris"],
+})
+
+
+def _index(rows):
+    return AssetIndex.build(pd.DataFrame(rows, columns=GST_COLUMNS))
+
+
+def _match(index, path, fresh):
+    state = MatchState(index, str(path), fresh=fresh)
+    out = state.match(CERTS.copy())
+    state.save()
+    return out
+
+
+def test_incremental_matches_fresh_after_gst_changes(tmp_path):
+    state_file = tmp_path / "match_state.pkl"
+    _match(_index(GST_BEFORE), state_file, fresh=False)
+
+    after = [row[:] for row in GST_BEFORE]
+    after[1][1] = "Borealis AS"                                          # edit: short name changes
+    del after[3]                                                         # remove: Delta goes away
+    after.append(["Echo Biogas SA", "Echo", "Lyon", "Echo Lyon"])        # add: new company and asset
+    after.append(["Acme Renewablea", "Acme A", "Hamburg", "Acme A Hamburg"])  # add: ties Acme Z
+    index = _index(after)
+
+    # The added key scores exactly as well as the stored fuzzy match and sorts first,
+    # so a fresh match picks it: only a rematch of the tie gives the same answer
+    raw = company_key("Acme Renewables")
+    assert fuzz.ratio(raw, company_key("Acme Renewablea")) == fuzz.ratio(raw, company_key("Acme Renewablez")) < 100
+
+    incremental = _match(index, state_file, fresh=False)
+    fresh = _match(index, tmp_path / "fresh.pkl", fresh=True)
+
+    pd.testing.assert_frame_equal(incremental, fresh)
+    assert incremental.loc[0, "Company_Name"] == "Acme A"
+    assert incremental.loc[1, "Company_Name"] == "Borealis AS"
+    assert incremental.loc[4, "Match_Found"] == 1
+
+
+def test_unchanged_gst_reuses_every_certificate(tmp_path):
+    state_file = tmp_path / "match_state.pkl"
+    index = _index(GST_BEFORE)
+    first = _match(index, state_file, fresh=False)
+
+    state = MatchState(index, str(state_file))
+    again = state.match(CERTS.copy())
+
+    pd.testing.assert_frame_equal(again, first)
+    assert state.stats["reused"] == len(CERTS)
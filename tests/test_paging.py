@@ -0,0 +1,50 @@
+from paging import AdaptivePager
+
+
+def test_cheap_pages_grow_slow_or_big_pages_shrink():
+    pager = AdaptivePager(initial=10000, min_size=1000, max_size=20000, target_seconds=10, max_bytes=1000)
+    pager.record_page(0, 10000, seconds=1, nbytes=100)
+    assert pager.size == 15000
+    pager.record_page(10000, 15000, seconds=6, nbytes=100)
+    assert pager.size == 15000
+    pager.record_page(25000, 15000, seconds=11, nbytes=100)
+    assert pager.size == 7500
+    pager.record_page(32500, 7500, seconds=1, nbytes=2000)
+    assert pager.size == 3750
+    assert [s["action"] for s in pager.schedule] == ["grow", "keep", "shrink", "shrink"]
+    assert pager.schedule[0]["length"] == 10000 and pager.schedule[0]["next_length"] == 15000
+
+
+def test_size_stays_within_bounds():
+    pager = AdaptivePager(initial=90000, min_size=1000, max_size=20000)
+    assert pager.size == 20000
+    for _ in range(3):
+        pager.record_page(0, 1, seconds=0, nbytes=0)
+    assert pager.size == 20000
+    for _ in range(10):
+        pager.record_page(0, 1, seconds=1000, nbytes=0)
+    assert pager.size == 1000
+
+
+def test_fixed_pager_never_resizes():
+    pager = AdaptivePager.fixed(5000)
+    pager.record_page(0, 5000, seconds=0, nbytes=0)
+    pager.record_error(5000, TimeoutError("slow"))
+    assert pager.size == 5000
+
+
+def test_errors_back_off_exponentially_then_give_up():
+    pager = AdaptivePager(initial=8000, min_size=1000, max_retries=2, backoff=5.0)
+    assert pager.record_error(0, TimeoutError("1")) == 5.0
+    assert pager.record_error(0, TimeoutError("2")) == 10.0
+    assert pager.record_error(0, TimeoutError("3")) is None
+    assert pager.size == 1000
+    assert [s["action"] for s in pager.schedule] == ["backoff", "backoff", "give_up"]
+    assert pager.schedule[-1]["error"] == "TimeoutError: 3"
+
+
+def test_success_resets_the_retry_budget():
+    pager = AdaptivePager(max_retries=1, backoff=1.0)
+    assert pager.record_error(0, OSError()) == 1.0
+    pager.record_page(0, 10, seconds=1, nbytes=0)
+    assert pager.record_error(10, OSError()) == 1.0
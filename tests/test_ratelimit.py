@@ -0,0 +1,62 @@
+import threading
+import time
+
+from ratelimit import TokenBucket, retry_after_seconds, MAX_RETRY_AFTER
+
+
+def test_burst_is_free_then_requests_are_paced():
+    bucket = TokenBucket(rate=50, burst=3, max_concurrency=None)
+    assert sum(bucket.wait() for _ in range(3)) == 0
+    t0 = time.monotonic()
+    bucket.wait()
+    assert time.monotonic() - t0 >= 0.015
+    stats = bucket.stats()
+    assert stats["requests"] == 4 and stats["throttled_seconds"] > 0
+
+
+def test_rate_zero_disables_pacing():
+    bucket = TokenBucket(rate=0, burst=1, max_concurrency=None)
+    assert sum(bucket.wait() for _ in range(20)) == 0
+
+
+def test_slot_caps_requests_in_flight():
+    bucket = TokenBucket(rate=0, max_concurrency=1)
+    release = bucket.acquire()
+    entered = threading.Event()
+
+    def second():
+        with bucket.slot():
+            entered.set()
+
+    worker = threading.Thread(target=second)
+    worker.start()
+    assert not entered.wait(0.1)
+    release()
+    release()  # idempotent: must not free a second slot
+    assert entered.wait(1)
+    worker.join()
+    assert bucket._slots.acquire(blocking=False)
+    assert not bucket._slots.acquire(blocking=False)
+
+
+def test_pause_holds_every_request():
+    bucket = TokenBucket(rate=0, max_concurrency=None)
+    bucket.pause(0.05)
+    assert bucket.wait() >= 0.04
+    assert bucket.stats()["rate_limited"] == 1
+
+
+def test_configure_changes_only_the_given_limits():
+    bucket = TokenBucket(rate=2, burst=4, max_concurrency=4)
+    bucket.configure(rate=10)
+    assert (bucket.rate, bucket.burst, bucket.max_concurrency) == (10, 4, 4)
+    bucket.configure(max_concurrency=0)
+    assert bucket.max_concurrency is None
+
+
+def test_retry_after_values():
+    assert retry_after_seconds("12") == 12.0
+    assert retry_after_seconds(None, default=3.0) == 3.0
+    assert retry_after_seconds("soon", default=3.0) == 3.0
+    assert retry_after_seconds("100000") == MAX_RETRY_AFTER
+    assert retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
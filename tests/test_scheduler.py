@@ -0,0 +1,48 @@
+from datetime import datetime
+
+import pytest
+
+from scheduler import CronSchedule
+
+
+def test_next_after_is_strictly_later():
+    schedule = CronSchedule("0 6 * * *")
+    assert schedule.next_after(datetime(2026, 3, 2, 5, 59, 30)) == datetime(2026, 3, 2, 6, 0)
+    assert schedule.next_after(datetime(2026, 3, 2, 6, 0)) == datetime(2026, 3, 3, 6, 0)
+
+
+def test_weekday_range_skips_the_weekend():
+    schedule = CronSchedule("0 6 * * 1-5")
+    # Friday 2026-03-06 after 06:00 -> Monday 2026-03-09
+    assert schedule.next_after(datetime(2026, 3, 6, 7, 0)) == datetime(2026, 3, 9, 6, 0)
+
+
+def test_steps_lists_and_aliases():
+    assert sorted(CronSchedule("*/15 * * * *").minutes) == [0, 15, 30, 45]
+    assert sorted(CronSchedule("0 8-18/5 * * *").hours) == [8, 13, 18]
+    assert sorted(CronSchedule("0 6,18 * * *").hours) == [6, 18]
+    assert CronSchedule("@weekly").spec == "0 6 * * 1"
+
+
+def test_sunday_is_zero_or_seven():
+    assert CronSchedule("0 6 * * 7").weekdays == CronSchedule("0 6 * * 0").weekdays == {0}
+    # 2026-03-08 is a Sunday
+    assert CronSchedule("0 6 * * 7").next_after(datetime(2026, 3, 4)) == datetime(2026, 3, 8, 6, 0)
+
+
+def test_restricted_day_fields_match_either():
+    # 1st of the month or any Monday, like cron
+    schedule = CronSchedule("0 6 1 * 1")
+    assert schedule.next_after(datetime(2026, 3, 2, 7, 0)) == datetime(2026, 3, 9, 6, 0)
+    assert schedule.next_after(datetime(2026, 3, 30, 7, 0)) == datetime(2026, 4, 1, 6, 0)
+
+
+@pytest.mark.parametrize("spec", ["0 6 * *", "60 * * * *", "0 6 0 * *", "5-1 * * * *", "*/0 * * * *"])
+def test_invalid_specs_raise(spec):
+    with pytest.raises(ValueError):
+        CronSchedule(spec)
+
+
+def test_impossible_date_never_matches():
+    with pytest.raises(ValueError):
+        CronSchedule("0 6 31 2 *").next_after(datetime(2026, 1, 1))